@@ -0,0 +1,163 @@
+"""
+Regresiones de planes de consulta: EXPLAIN de cada consulta de cada ruta.
+
+Genera un conjunto de datos grande con api.seed (como suite.py), hace cada
+petición de suite.routes() capturando las SELECT que llegan a la base y
+ejecuta EXPLAIN sobre cada una con sus mismos parámetros. Falla (código de
+salida 1) si alguna recorre entera una tabla (Seq Scan en PostgreSQL, SCAN
+<tabla> sin índice en SQLite) salvo las excepciones de ALLOWED_SCANS.
+
+    python benchmarks/explain.py --size 50000
+    BENCHMARK_DATABASE_URL=postgresql://.../bench python benchmarks/explain.py --size 200000
+
+En PostgreSQL el planificador elige según las estadísticas: con pocas filas
+siempre prefiere el Seq Scan, por eso el tamaño por defecto es grande.
+"""
+import argparse
+import json
+import re
+import sys
+
+from suite import app, db, limiter, event, build_database, _fixtures, routes  # noqa: E402
+
+# Tablas de unas pocas filas (y el catálogo de SQLite): recorrerlas es lo correcto
+SMALL_TABLES = {'rol', 'catalog_version', 'sqlite_master'}
+
+# (ruta, tabla, motor o None) -> motivo. Lecturas completas por diseño
+ALLOWED_SCANS = {
+    ('product.products.all', 'product', None): 'listado completo sin ?limit (compatibilidad)',
+    ('user.users', 'user', None): 'listado completo de usuarios',
+    # Leen casi todos los productos activos: PostgreSQL elige bien el Seq Scan
+    ('product.catalog', 'product', 'postgresql'): 'total y facetas del catálogo sin filtros',
+    ('technical_details.anime_series', 'product', 'postgresql'): 'DISTINCT de series sobre todo el catálogo',
+}
+
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+
+
+def _sqlite_scans(connection, statement, parameters):
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+    plan = [row[-1] for row in rows]
+    # "SCAN t USING INDEX ix" o "SEARCH t USING ..." usan índice; "SCAN t" a secas no
+    scans = [match.group(1) for match in map(SQLITE_SCAN.match, plan) if match]
+    return scans, plan
+
+
+def _postgresql_scans(connection, statement, parameters):
+    (plan,) = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters).one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = []
+
+    def walk(node):
+        if node['Node Type'] == 'Seq Scan':
+            scans.append(node['Relation Name'])
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return scans, plan
+
+
+EXPLAINERS = {'sqlite': _sqlite_scans, 'postgresql': _postgresql_scans}
+
+
+class StatementRecorder:
+    """ Guarda las SELECT que ejecuta la aplicación mientras está activo """
+
+    def __init__(self, engine):
+        self.statements = []
+        self.active = False
+        event.listen(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active and not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            self.statements.append((statement, parameters))
+
+
+def _is_allowed(route, table, dialect):
+    if table in SMALL_TABLES:
+        return True
+    return (route, table, None) in ALLOWED_SCANS or (route, table, dialect) in ALLOWED_SCANS
+
+
+def explain_routes(only=None):
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+        dialect = engine.dialect.name
+        recorder = StatementRecorder(engine)
+    if dialect not in EXPLAINERS:
+        raise SystemExit(f'Motor no soportado: {dialect}')
+    explain = EXPLAINERS[dialect]
+    fx = _fixtures()
+
+    report = []
+    for name, method, url, headers, body in routes(fx):
+        if only and not any(pattern in name for pattern in only):
+            continue
+
+        recorder.statements = []
+        recorder.active = True
+        response = client.open(url, method=method, headers=headers, json=body)
+        response.get_data()
+        recorder.active = False
+
+        with engine.connect() as connection:
+            for statement, parameters in recorder.statements:
+                scans, plan = explain(connection, statement, parameters)
+                report.append({
+                    'route': name,
+                    'status': response.status_code,
+                    'statement': ' '.join(statement.split()),
+                    'scans': scans,
+                    'violations': [table for table in scans if not _is_allowed(name, table, dialect)],
+                    'plan': plan,
+                })
+    return dialect, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=50000, help='Número de productos del conjunto de datos')
+    parser.add_argument('--reuse', action='store_true', help='No regenerar la base (ya sembrada con este script)')
+    parser.add_argument('--only', help='Solo las rutas cuyo nombre contenga alguno de estos textos (separados por comas)')
+    parser.add_argument('--output', help='Guarda todas las consultas con su plan en JSON')
+    parser.add_argument('--verbose', action='store_true', help='Muestra el plan de cada consulta')
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    if not args.reuse:
+        print(f'Generando {args.size} productos...', file=sys.stderr)
+        build_database(args.size)
+
+    dialect, report = explain_routes(args.only.split(',') if args.only else None)
+
+    # Una misma consulta repetida (p. ej. una por fila) se informa una sola vez
+    failures = set()
+    for entry in report:
+        if entry['violations']:
+            if (entry['route'], entry['statement']) in failures:
+                continue
+            failures.add((entry['route'], entry['statement']))
+            print(f"SEQ SCAN {entry['route']:<32} {', '.join(entry['violations'])}\n    {entry['statement']}",
+                  file=sys.stderr)
+        elif args.verbose:
+            print(f"ok       {entry['route']:<32} {entry['statement']}", file=sys.stderr)
+        if args.verbose:
+            print(f"    {json.dumps(entry['plan'], ensure_ascii=False)}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'dialect': dialect, 'size': args.size, 'queries': report}, output_file, indent=2,
+                      ensure_ascii=False)
+
+    routes_checked = len({entry['route'] for entry in report})
+    print(f'{dialect}: {len(report)} consultas de {routes_checked} rutas, {len(failures)} con recorridos completos',
+          file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
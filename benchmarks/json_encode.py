@@ -0,0 +1,111 @@
+"""
+Micro-benchmark del proveedor JSON (api.json_provider) con una respuesta
+realista: 10.000 productos serializados como Product.serialize() (vendedor
+con rol y direcciones, detalles técnicos y fechas sin convertir).
+
+    python benchmarks/json_encode.py [--products 10000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from flask import Flask  # noqa: E402
+from api.json_provider import FastJSONProvider, orjson  # noqa: E402
+
+SERIES = ['NARUTO', 'ONE PIECE', 'EVANGELION', 'DRAGON BALL', 'STEINS;GATE']
+
+
+def build_payload(count):
+    now = datetime.utcnow()
+    sellers = [
+        {
+            'id': i,
+            'user_name': f'vendedor{i}',
+            'first_name': 'Okabe',
+            'last_name': 'Rintarō',
+            'email': f'vendedor{i}@kurisu.shop',
+            'rol_id': 2,
+            'rol': {'id': 2, 'type': 'seller'},
+            'img': None,
+            'addresses': [{
+                'id': i, 'user_id': i, 'street': 'Calle Akihabara', 'number': str(i),
+                'city': 'Madrid', 'province': 'Madrid', 'postal_code': '28001', 'is_default': True,
+            }],
+        }
+        for i in range(1, 21)
+    ]
+    return [
+        {
+            'id': i,
+            'name': f'FIGURA {i} {SERIES[i % len(SERIES)]}',
+            'description': 'Figura de colección con base y accesorios intercambiables. ' * 3,
+            'images': [f'https://res.cloudinary.com/kurisu/image/upload/v1/p{i}_{n}.jpg' for n in range(3)],
+            'price': 19.95 + i % 100,
+            'original_price': 29.95 if i % 4 == 0 else None,
+            'on_sale': i % 4 == 0,
+            'review': None,
+            'user_id': sellers[i % len(sellers)]['id'],
+            'user': sellers[i % len(sellers)],
+            'status': True,
+            'created_at': now - timedelta(days=i % 60),
+            'updated_at': now,
+            'sale_updated_at': now if i % 4 == 0 else None,
+            'technical_details': {
+                'id': i, 'product_id': i, 'manufacturer': 'GOOD SMILE', 'collection': 'NENDOROID',
+                'anime_series': SERIES[i % len(SERIES)], 'character': f'PERSONAJE {i % 40}',
+            },
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payload = build_payload(args.products)
+    backends = ['stdlib'] + (['orjson'] if orjson is not None else [])
+
+    print(f'{args.products} productos, mejor de {args.repeat} repeticiones')
+    print(f"{'backend':<8} {'operación':<10} {'ms':>9} {'MB/s':>9} {'productos/s':>13}")
+    results = {}
+    for backend in backends:
+        os.environ['JSON_BACKEND'] = backend
+        app = Flask(__name__)
+        app.json = FastJSONProvider(app)
+
+        with app.app_context():
+            operations = {
+                'dumps': lambda: len(app.json.dumps(payload)),
+                'response': lambda: len(app.json.response(payload).get_data()),
+            }
+            for name, fn in operations.items():
+                seconds, size = measure(fn, args.repeat)
+                results[(backend, name)] = seconds
+                print(f'{backend:<8} {name:<10} {seconds * 1000:>9.1f} '
+                      f'{size / seconds / 1e6:>9.1f} {args.products / seconds:>13,.0f}')
+
+    if orjson is not None:
+        speedup = results[('stdlib', 'response')] / results[('orjson', 'response')]
+        print(f'response: orjson es {speedup:.1f}x más rápido que stdlib')
+    else:
+        print('orjson no está instalado: solo se ha medido la librería estándar')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,489 @@
+"""
+Generador de carga de extremo a extremo.
+
+Lanza una mezcla realista de tráfico (catálogo, ficha de producto, búsqueda,
+login, CRUD de direcciones, edición de productos...) con varios hilos o
+procesos y muestra p50/p95/p99 y peticiones por segundo de cada endpoint.
+
+Por defecto ejecuta la aplicación WSGI de src/wsgi.py dentro del propio
+proceso; con --target http://host:puerto ataca un despliegue real (p. ej.
+gunicorn) sin más dependencias que la librería estándar. Con varias etapas de
+concurrencia (--workers 1,2,4,8,16) se ve dónde deja de crecer el throughput.
+
+Necesita datos y usuarios generados con la misma semilla:
+
+    flask insert-test-data --users 200 --products 10000
+    python benchmarks/loadgen.py --duration 30 --workers 1,4,8
+    python benchmarks/loadgen.py --target http://localhost:8000 --mode process --workers 16
+    python benchmarks/loadgen.py --duration 60 --record trafico.jsonl
+    python benchmarks/loadgen.py --replay trafico.jsonl --speed 2
+
+La traza guarda escenarios con sus parámetros (no peticiones sueltas), así
+que al reproducirla los ids creados durante la prueba (direcciones) son los
+de la nueva ejecución.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit, quote
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from api.seed import PASSWORD, SERIES  # noqa: E402
+
+SORTS = ['relevance', 'price-asc', 'price-desc', 'newest']
+
+
+# --- transporte ----------------------------------------------------------
+
+class InProcessTransport:
+    """ Llama a la aplicación WSGI directamente (un cliente por hilo) """
+
+    def __init__(self):
+        from werkzeug.test import Client
+        from wsgi import application
+        from api.limiter import limiter
+        # Los límites por IP (login: 5 por minuto) cortarían la prueba: con
+        # --target se aplican los del servidor
+        limiter.enabled = False
+        self._client_class = Client
+        self._application = application
+        self._local = threading.local()
+
+    def request(self, method, path, headers=None, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._client_class(self._application, use_cookies=False)
+        response = client.open(path, method=method, headers=headers, json=body)
+        data = response.get_data()
+        return response.status_code, data
+
+
+class HTTPTransport:
+    """ HTTP/1.1 con keep-alive, una conexión por hilo """
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self._local = threading.local()
+
+    def request(self, method, path, headers=None, body=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        for attempt in (1, 2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = self.connection_class(self.netloc, timeout=30)
+            try:
+                connection.request(method, self.prefix + path, body=payload, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # El servidor puede cerrar conexiones keep-alive: se reintenta una vez
+                connection.close()
+                self._local.connection = None
+                if attempt == 2:
+                    raise
+
+
+def make_transport(target):
+    return HTTPTransport(target) if target else InProcessTransport()
+
+
+# --- datos de la prueba --------------------------------------------------
+
+class Account:
+
+    def __init__(self, email, token, user_id):
+        self.email = email
+        self.token = token
+        self.user_id = user_id
+
+    @property
+    def headers(self):
+        return {'Authorization': f'Bearer {self.token}'}
+
+
+def login(transport, email, password):
+    status, body = transport.request('POST', '/api/user/login', body={'email': email, 'password': password})
+    if status != 200:
+        return None
+    data = json.loads(body)
+    return Account(email, data['token'], data['user']['id'])
+
+
+def discover(transport, args):
+    """ Cuentas y productos reales del despliegue, obtenidos por la propia API """
+    accounts = []
+    for n in range(args.accounts):
+        account = login(transport, args.email_template.format(n=n), args.password)
+        if account is not None:
+            accounts.append(account)
+    if not accounts:
+        raise SystemExit(f'No se ha podido hacer login con {args.email_template.format(n=0)}: '
+                         'genera los datos con flask insert-test-data')
+
+    products, after = [], 0
+    while len(products) < args.product_sample:
+        status, body = transport.request('GET', f'/api/product/products/actives?fields=id,user_id&limit=200&after={after}')
+        page = json.loads(body) if status == 200 else {}
+        products += page.get('products', [])
+        if not page.get('next_cursor'):
+            break
+        after = page['next_cursor']
+    if not products:
+        raise SystemExit('No hay productos activos: genera los datos con flask insert-test-data')
+
+    # Solo los vendedores con productos en la muestra pueden editar
+    account_ids = {account.user_id for account in accounts}
+    by_seller = defaultdict(list)
+    for product in products:
+        if product['user_id'] in account_ids:
+            by_seller[product['user_id']].append(product['id'])
+
+    return {
+        'accounts': {account.email: account for account in accounts},
+        'product_ids': [product['id'] for product in products],
+        'products_by_seller': dict(by_seller),
+        'series': [series for series, _, _ in SERIES],
+        'terms': [term for series, _, characters in SERIES for term in (series, *characters)],
+    }
+
+
+# --- escenarios ----------------------------------------------------------
+# Cada escenario tiene un generador de parámetros (lo que se guarda en la
+# traza) y una función que ejecuta sus peticiones con esos parámetros.
+
+def _browse_params(rng, data):
+    return {'series': rng.choice(data['series']), 'sort': rng.choice(SORTS), 'page': rng.randint(1, 3)}
+
+
+def _browse(session, params):
+    session.call('catalog', 'GET', f"/api/product/catalog?view=card&series={quote(params['series'])}"
+                                   f"&sort={params['sort']}&page={params['page']}")
+
+
+def _detail_params(rng, data):
+    return {'product_id': rng.choice(data['product_ids'])}
+
+
+def _detail(session, params):
+    session.call('product_detail', 'GET', f"/api/product/products/{params['product_id']}")
+
+
+def _search_params(rng, data):
+    term = rng.choice(data['terms']).split()[0].lower()
+    return {'q': term, 'prefix': term[:rng.randint(2, max(2, len(term)))]}
+
+
+def _search(session, params):
+    session.call('suggest', 'GET', f"/api/product/suggest?q={quote(params['prefix'])}")
+    session.call('search', 'GET', f"/api/product/search?q={quote(params['q'])}")
+
+
+def _cart_params(rng, data):
+    return {'ids': rng.sample(data['product_ids'], min(len(data['product_ids']), rng.randint(1, 8)))}
+
+
+def _cart(session, params):
+    session.call('cart_batch', 'GET', f"/api/product/products/batch?view=card&ids={','.join(map(str, params['ids']))}")
+
+
+def _login_params(rng, data):
+    return {'account': rng.choice(list(data['accounts']))}
+
+
+def _login(session, params):
+    session.call('login', 'POST', '/api/user/login', body={'email': params['account'], 'password': session.password})
+
+
+def _address_params(rng, data):
+    return {'account': rng.choice(list(data['accounts'])), 'number': str(rng.randint(1, 300))}
+
+
+def _address_crud(session, params):
+    headers = session.data['accounts'][params['account']].headers
+    session.call('address_list', 'GET', '/api/address/addresses', headers=headers)
+    status, body = session.call('address_create', 'POST', '/api/address/addresses', headers=headers, body={
+        'street': 'Calle de la Carga', 'number': params['number'], 'city': 'Madrid',
+        'province': 'Madrid', 'postal_code': '28001',
+    })
+    if status != 201:
+        return
+    address_id = json.loads(body)['address']['id']
+    session.call('address_update', 'PUT', f'/api/address/addresses/{address_id}', headers=headers,
+                 body={'apartment': '2º B'})
+    session.call('address_delete', 'DELETE', f'/api/address/addresses/{address_id}', headers=headers)
+
+
+def _edit_params(rng, data):
+    sellers = [email for email, account in data['accounts'].items()
+               if data['products_by_seller'].get(account.user_id)]
+    if not sellers:
+        return None
+    account = rng.choice(sellers)
+    product_id = rng.choice(data['products_by_seller'][data['accounts'][account].user_id])
+    return {'account': account, 'product_id': product_id, 'price': round(rng.uniform(5, 150), 2)}
+
+
+def _edit(session, params):
+    headers = session.data['accounts'][params['account']].headers
+    path = f"/api/product/selectproducttomodify/{params['product_id']}"
+    session.call('product_edit_get', 'GET', path, headers=headers)
+    session.call('product_edit_put', 'PUT', path, headers=headers, body={'price': params['price']})
+
+
+SCENARIOS = {
+    'browse': (_browse_params, _browse),
+    'detail': (_detail_params, _detail),
+    'search': (_search_params, _search),
+    'cart': (_cart_params, _cart),
+    'login': (_login_params, _login),
+    'address': (_address_params, _address_crud),
+    'edit': (_edit_params, _edit),
+}
+
+DEFAULT_MIX = 'browse=35,detail=25,search=15,cart=10,login=5,address=5,edit=5'
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f"Escenario desconocido: {name} (opciones: {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# --- ejecución -----------------------------------------------------------
+
+class Session:
+    """ Ejecuta escenarios y anota (endpoint, latencia, estado) de cada petición """
+
+    def __init__(self, transport, data, password):
+        self.transport = transport
+        self.data = data
+        self.password = password
+        self.samples = []
+
+    def call(self, name, method, path, headers=None, body=None):
+        start = time.perf_counter()
+        try:
+            status, response = self.transport.request(method, path, headers=headers, body=body)
+        except Exception:
+            status, response = 0, b''
+        self.samples.append((name, (time.perf_counter() - start) * 1000, status))
+        return status, response
+
+
+def _worker(transport, data, password, plan, deadline, seed, start_time, trace):
+    """
+    plan=None: mezcla aleatoria hasta deadline. plan=[eventos]: reproduce la
+    traza respetando los instantes (ya escalados) de cada evento.
+    """
+    session = Session(transport, data, password)
+    rng = random.Random(seed)
+
+    if plan is None:
+        mix = data['mix']
+        names, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights=weights)[0]
+            make_params, run = SCENARIOS[name]
+            params = make_params(rng, data)
+            if params is None:
+                continue
+            if trace is not None:
+                trace.append({'t': round(time.perf_counter() - start_time, 4), 'scenario': name, 'params': params})
+            run(session, params)
+    else:
+        for event in plan:
+            delay = start_time + event['t'] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            SCENARIOS[event['scenario']][1](session, event['params'])
+
+    return session.samples
+
+
+def _process_entry(job):
+    target, args_dict, plan, duration, seed = job
+    args = argparse.Namespace(**args_dict)
+    transport = make_transport(target)
+    data = discover(transport, args)
+    data['mix'] = parse_mix(args.mix)
+    trace = [] if args.record and plan is None else None
+    start = time.perf_counter()
+    samples = _worker(transport, data, args.password, plan, start + duration, seed, start, trace)
+    return samples, trace or [], time.perf_counter() - start
+
+
+def run_stage(args, workers, data, transport, plan_chunks=None):
+    """ Devuelve (muestras, traza, segundos) de una etapa con `workers` hilos o procesos """
+    duration = args.duration
+    if plan_chunks is not None:
+        duration = max((event['t'] for chunk in plan_chunks for event in chunk), default=0)
+
+    if args.mode == 'process':
+        jobs = [
+            (args.target, vars(args), plan_chunks[i] if plan_chunks else None, duration, args.seed + i)
+            for i in range(workers)
+        ]
+        with multiprocessing.get_context('spawn').Pool(workers) as pool:
+            results = pool.map(_process_entry, jobs)
+        # Sin contar el arranque de cada proceso (importar la app, login...)
+        elapsed = max(worker_elapsed for _, _, worker_elapsed in results)
+        samples = [sample for worker_samples, _, _ in results for sample in worker_samples]
+        trace = sorted((event for _, worker_trace, _ in results for event in worker_trace), key=lambda e: e['t'])
+        return samples, trace, elapsed
+
+    trace = [] if args.record and plan_chunks is None else None
+    results = [None] * workers
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def target(i):
+        plan = plan_chunks[i] if plan_chunks else None
+        results[i] = _worker(transport, data, args.password, plan, deadline, args.seed + i, start, trace)
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    samples = [sample for worker_samples in results for sample in worker_samples]
+    return samples, sorted(trace or [], key=lambda event: event['t']), elapsed
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(samples, elapsed):
+    by_endpoint = defaultdict(list)
+    errors = defaultdict(int)
+    for name, latency, status in samples:
+        by_endpoint[name].append(latency)
+        if status == 0 or status >= 400:
+            errors[name] += 1
+
+    def stats(latencies, error_count):
+        ordered = sorted(latencies)
+        return {
+            'requests': len(ordered),
+            'errors': error_count,
+            'rps': round(len(ordered) / elapsed, 2) if elapsed else None,
+            'p50_ms': round(_percentile(ordered, 0.50), 2),
+            'p95_ms': round(_percentile(ordered, 0.95), 2),
+            'p99_ms': round(_percentile(ordered, 0.99), 2),
+        }
+
+    endpoints = {name: stats(latencies, errors[name]) for name, latencies in sorted(by_endpoint.items())}
+    total = stats([latency for _, latency, _ in samples], sum(errors.values())) if samples else None
+    return {'seconds': round(elapsed, 2), 'total': total, 'endpoints': endpoints}
+
+
+def print_summary(workers, summary):
+    print(f"\n== {workers} workers, {summary['seconds']}s", file=sys.stderr)
+    print(f"{'endpoint':<18} {'peticiones':>10} {'errores':>8} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8}",
+          file=sys.stderr)
+    rows = list(summary['endpoints'].items())
+    if summary['total']:
+        rows.append(('TOTAL', summary['total']))
+    for name, stats in rows:
+        print(f"{name:<18} {stats['requests']:>10} {stats['errors']:>8} {stats['rps']:>9.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}", file=sys.stderr)
+
+
+def load_trace(path, speed):
+    with open(path) as trace_file:
+        events = [json.loads(line) for line in trace_file if line.strip()]
+    if speed:
+        for event in events:
+            event['t'] = event['t'] / speed
+    else:
+        for event in events:
+            event['t'] = 0
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', help='URL base de un servidor; por defecto, src/wsgi.py en este proceso')
+    parser.add_argument('--workers', default='4', help='Concurrencia; varias etapas separadas por comas (1,2,4,8)')
+    parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--duration', type=float, default=10, help='Segundos por etapa')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Pesos de los escenarios (por defecto {DEFAULT_MIX})')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--accounts', type=int, default=20, help='Cuentas con las que hacer login')
+    parser.add_argument('--email-template', default='seed42_user{n}@example.com')
+    parser.add_argument('--password', default=PASSWORD)
+    parser.add_argument('--product-sample', type=int, default=1000, help='Productos sobre los que repartir las visitas')
+    parser.add_argument('--record', help='Guarda la traza de escenarios en este fichero JSONL')
+    parser.add_argument('--replay', help='Reproduce una traza grabada con --record')
+    parser.add_argument('--speed', type=float, default=1.0, help='Velocidad de reproducción (0 = sin esperas)')
+    parser.add_argument('--output', help='Guarda los resultados en JSON')
+    args = parser.parse_args()
+
+    stages = [int(workers) for workers in args.workers.split(',')]
+    parse_mix(args.mix)
+
+    transport = None
+    data = None
+    if args.mode == 'thread':
+        transport = make_transport(args.target)
+        data = discover(transport, args)
+        data['mix'] = parse_mix(args.mix)
+
+    plan = load_trace(args.replay, args.speed) if args.replay else None
+
+    results = []
+    recorded = []
+    for workers in stages:
+        plan_chunks = None
+        if plan is not None:
+            # Reparto por turnos: cada worker reproduce los eventos que le tocan en su instante
+            plan_chunks = [plan[i::workers] for i in range(workers)]
+        samples, trace, elapsed = run_stage(args, workers, data, transport, plan_chunks)
+        summary = summarize(samples, elapsed)
+        print_summary(workers, summary)
+        results.append({'workers': workers, **summary})
+        # Las etapas se graban una detrás de otra
+        offset = recorded[-1]['t'] if recorded else 0
+        recorded += [{**event, 't': round(event['t'] + offset, 4)} for event in trace]
+
+    if args.record:
+        with open(args.record, 'w') as trace_file:
+            for event in recorded:
+                trace_file.write(json.dumps(event) + '\n')
+        print(f'\nTraza guardada en {args.record} ({len(recorded)} escenarios)', file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'target': args.target or 'in-process', 'mode': args.mode, 'mix': parse_mix(args.mix),
+                       'stages': results}, output_file, indent=2)
+
+    best = max(results, key=lambda stage: stage['total']['rps'] if stage['total'] else 0)
+    if len(results) > 1 and best['total']:
+        print(f"\nMáximo throughput: {best['total']['rps']} req/s con {best['workers']} workers", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""
+Benchmarks de serializadores y rutas de lectura contra una base SQLite sembrada.
+
+Para cada tamaño de catálogo se regenera la base con el generador de
+api.seed (misma semilla, mismos datos) y se mide:
+
+- serialize() de cada modelo (objetos ya cargados, sin contar consultas),
+- cada ruta GET de product.py, productTechnicalDetails.py, address.py y
+  user.py a través del test client, con el número de consultas SQL por petición.
+
+La caché de respuestas y el rate limiting se desactivan para medir el trabajo
+real de cada ruta. Las rutas que escriben (create, PUT, PATCH...) no se miden.
+
+    python benchmarks/suite.py --sizes 1000,10000 --output resultados.json
+    python benchmarks/suite.py --compare resultados.json   # muestra diferencias
+
+Por defecto usa una base SQLite temporal; BENCHMARK_DATABASE_URL permite
+medir contra otro motor (p. ej. una base PostgreSQL desechable).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DB_PATH = os.path.join(tempfile.gettempdir(), 'kurisu_benchmarks.sqlite3')
+
+# Nunca la base de la aplicación: se borra y se vuelve a generar en cada tamaño
+os.environ['DATABASE_URL'] = os.environ.get('BENCHMARK_DATABASE_URL', f'sqlite:///{DB_PATH}')
+os.environ.setdefault('JWT_SECRET_KEY', 'benchmarks')
+os.environ.setdefault('FLASK_APP_KEY', 'benchmarks')
+os.environ['RESPONSE_CACHE_BACKEND'] = 'none'
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from sqlalchemy import event  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+from app import app  # noqa: E402
+from api.database.db import db  # noqa: E402
+from api.limiter import limiter  # noqa: E402
+from api.models import Rol, User, Product, Review, StripePay  # noqa: E402
+from api.models.Address import Address  # noqa: E402
+from api.models.ProductTechnicalDetails import ProductTechnicalDetails  # noqa: E402
+from api.search import create_search_schema, rebuild_index  # noqa: E402
+from api.suggest import suggest_index  # noqa: E402
+from api.seed import DatasetGenerator, PASSWORD  # noqa: E402
+
+SEED = 42
+REFERENCE_DATE = datetime(2026, 1, 1)
+
+MODELS = [Product, User, Address, ProductTechnicalDetails, Review, StripePay, Rol]
+
+
+def _dataset(size):
+    """ Tamaños del resto de tablas en proporción al número de productos """
+    return {
+        'products': size,
+        'users': max(50, size // 10),
+        'payments': max(50, size // 2),
+        'reviews': max(20, size // 5),
+    }
+
+
+def build_database(size):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # drop_all() no conoce el índice de texto completo: se vacía a mano
+        create_search_schema(db.session.connection())
+        rebuild_index(db.session.connection())
+        db.session.commit()
+        DatasetGenerator(seed=SEED, reference_date=REFERENCE_DATE, log=lambda message: None).run(**_dataset(size))
+        suggest_index.rebuild()
+
+
+def _fixtures():
+    """ Ids y tokens reales del conjunto de datos para construir las URLs """
+    with app.app_context():
+        product = Product.query.filter_by(status=True).order_by(Product.id).first()
+        seller = db.session.get(User, product.user_id)
+        client = User.query.join(StripePay, StripePay.user_id == User.id).order_by(User.id).first()
+        address = Address.query.filter_by(user_id=client.id).first()
+        ids = [str(product_id) for (product_id,) in Product.query.with_entities(Product.id).limit(30)]
+        return {
+            'product_id': product.id,
+            'series': product.technical_details.anime_series,
+            'address_id': address.id,
+            'batch_ids': ','.join(ids),
+            'client_email': client.email,
+            'client_headers': {'Authorization': f'Bearer {create_access_token(identity=str(client.id))}'},
+            'seller_headers': {'Authorization': f'Bearer {create_access_token(identity=str(seller.id))}'},
+        }
+
+
+def routes(fx):
+    """ (nombre, método, url, cabeceras, cuerpo JSON) """
+    product, client, seller = fx['product_id'], fx['client_headers'], fx['seller_headers']
+    return [
+        ('product.products', 'GET', '/api/product/products?limit=50', None, None),
+        ('product.products.card', 'GET', '/api/product/products?limit=50&view=card', None, None),
+        ('product.products.all', 'GET', '/api/product/products', None, None),
+        ('product.actives', 'GET', '/api/product/products/actives?limit=50', None, None),
+        ('product.catalog', 'GET', f"/api/product/catalog?series={fx['series']}&sort=price-asc", None, None),
+        ('product.search', 'GET', '/api/product/search?q=figura naruto', None, None),
+        ('product.suggest', 'GET', '/api/product/suggest?q=narut', None, None),
+        ('product.batch', 'GET', f"/api/product/products/batch?ids={fx['batch_ids']}", None, None),
+        ('product.detail', 'GET', f'/api/product/products/{product}', None, None),
+        ('product.new', 'GET', '/api/product/products/new', None, None),
+        ('product.recently_updated', 'GET', '/api/product/products/recently-updated', None, None),
+        ('product.manage', 'GET', f'/api/product/selectproducttomodify/{product}', seller, None),
+        ('technical_details.detail', 'GET', f'/api/product_technical_details/product/{product}/technical-details', None, None),
+        ('technical_details.search', 'GET', f"/api/product_technical_details/technical-details/search?anime_series={fx['series']}", None, None),
+        ('technical_details.anime_series', 'GET', '/api/product_technical_details/anime-series', None, None),
+        ('address.list', 'GET', '/api/address/addresses', client, None),
+        ('address.detail', 'GET', f"/api/address/addresses/{fx['address_id']}", client, None),
+        ('address.default', 'GET', '/api/address/addresses/default', client, None),
+        ('user.users', 'GET', '/api/user/users', None, None),
+        ('user.current', 'GET', '/api/user/update_user', client, None),
+        ('user.payments', 'GET', '/api/user/payments', client, None),
+        ('user.login', 'POST', '/api/user/login', None, {'email': fx['client_email'], 'password': PASSWORD}),
+    ]
+
+
+class QueryCounter:
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def _timings(fn, iterations, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _summary(timings):
+    ordered = sorted(timings)
+    return {
+        'iterations': len(timings),
+        'mean_ms': round(statistics.fmean(timings), 4),
+        'p50_ms': round(ordered[len(ordered) // 2], 4),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        'min_ms': round(ordered[0], 4),
+    }
+
+
+def bench_serializers(size, iterations):
+    results = []
+    with app.app_context():
+        for model in MODELS:
+            loader_options = getattr(model, 'serialize_loader_options', None)
+            query = model.query.order_by(model.id).limit(500)
+            if loader_options is not None:
+                query = query.options(*loader_options())
+            objects = query.all()
+            if not objects:
+                continue
+            # Se fuerza la carga de relaciones perezosas antes de medir
+            for obj in objects:
+                obj.serialize()
+
+            timings = _timings(lambda: [obj.serialize() for obj in objects], iterations)
+            per_object = [timing / len(objects) * 1000 for timing in timings]
+            results.append({
+                'size': size, 'kind': 'serialize', 'name': model.__name__, 'objects': len(objects),
+                **_summary(timings),
+                'per_object_us': round(statistics.fmean(per_object), 3),
+            })
+    return results
+
+
+def bench_routes(size, iterations, only=None):
+    client = app.test_client()
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+    fx = _fixtures()
+
+    results = []
+    for name, method, url, headers, body in routes(fx):
+        if only and not any(pattern in name for pattern in only):
+            continue
+
+        def request():
+            response = client.open(url, method=method, headers=headers, json=body)
+            response.get_data()
+            return response
+
+        response = request()
+        counter.count = 0
+        request()
+        queries = counter.count
+
+        timings = _timings(request, iterations, warmup=0)
+        results.append({
+            'size': size, 'kind': 'route', 'name': name, 'method': method, 'url': url,
+            'status': response.status_code, 'bytes': len(response.get_data()), 'queries': queries,
+            **_summary(timings),
+        })
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path, threshold):
+    """ Imprime las medidas que han empeorado (o mejorado) más que threshold respecto a otra ejecución """
+    with open(baseline_path) as baseline_file:
+        baseline = {(r['size'], r['kind'], r['name']): r for r in json.load(baseline_file)['results']}
+
+    for result in current['results']:
+        before = baseline.get((result['size'], result['kind'], result['name']))
+        if before is None:
+            continue
+        ratio = result['p50_ms'] / before['p50_ms'] if before['p50_ms'] else 1
+        queries = '' if result.get('queries') == before.get('queries') else \
+            f" consultas {before.get('queries')} -> {result.get('queries')}"
+        if abs(ratio - 1) >= threshold or queries:
+            label = 'PEOR ' if ratio > 1 else 'MEJOR'
+            print(f"{label} {result['size']:>7} {result['name']:<32} "
+                  f"{before['p50_ms']:.2f} -> {result['p50_ms']:.2f} ms ({ratio:.2f}x){queries}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000', help='Número de productos, separados por comas')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--only', help='Solo las rutas cuyo nombre contenga alguno de estos textos (separados por comas)')
+    parser.add_argument('--output', help='Fichero JSON de salida (por defecto, stdout)')
+    parser.add_argument('--compare', help='JSON de una ejecución anterior con la que comparar')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Cambio relativo a partir del cual se informa')
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    sizes = [int(size) for size in args.sizes.split(',')]
+    only = args.only.split(',') if args.only else None
+
+    results = []
+    for size in sizes:
+        print(f'Generando {size} productos...', file=sys.stderr)
+        build_database(size)
+        print(f'Midiendo con {size} productos...', file=sys.stderr)
+        results += bench_serializers(size, args.iterations)
+        results += bench_routes(size, args.iterations, only)
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'json_backend': app.json.backend,
+            'sizes': sizes,
+            'iterations': args.iterations,
+            'seed': SEED,
+            'dataset': {size: _dataset(size) for size in sizes},
+        },
+        'results': results,
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        compare(report, args.compare, args.threshold)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Subida de imágenes: secuencial frente al pool de api.storage.
+
+Usa el backend local con una latencia simulada por imagen (la de Cloudinary
+ronda los cientos de ms) y mide el tiempo de pared de upload_many() para
+distintos tamaños de pool. Con --route mide además POST /api/product/create
+de principio a fin con el test client.
+
+Con --memory compara el pico de memoria (tracemalloc) de POST
+/api/product/create con las imágenes como data URI base64 en JSON y como
+ficheros en multipart/form-data. El cuerpo de la petición se genera antes de
+empezar a medir: solo cuenta lo que reserva la aplicación.
+
+    python benchmarks/uploads.py --images 5 --latency-ms 300 --workers 1,2,4,8
+    python benchmarks/uploads.py --route --output uploads.json
+    python benchmarks/uploads.py --memory --images 5 --image-kb 4096
+"""
+import argparse
+import base64
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+MEDIA_PATH = os.path.join(tempfile.gettempdir(), 'kurisu_benchmarks_media')
+
+os.environ['IMAGE_STORAGE_BACKEND'] = 'local'
+os.environ['IMAGE_STORAGE_PATH'] = MEDIA_PATH
+# Se suben las mismas imágenes en cada iteración: sin deduplicar para medir las subidas
+os.environ['IMAGE_DEDUP'] = '0'
+# Todas las peticiones de la prueba pasan del umbral de peticiones lentas
+os.environ.setdefault('SLOW_REQUEST_MS', '60000')
+
+from werkzeug.test import EnvironBuilder  # noqa: E402
+from suite import app, limiter, build_database, _fixtures  # noqa: E402
+from api.storage import image_storage, LocalStorage, PRODUCT_IMAGES_FOLDER  # noqa: E402
+
+
+# Cabecera JFIF: python-magic la reconoce como image/jpeg
+JPEG_HEADER = b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00'
+PRODUCT_FIELDS = {'name': 'figura benchmark', 'description': 'subida de imágenes', 'price': 10}
+
+
+def _jpeg(size):
+    return JPEG_HEADER + os.urandom(size - len(JPEG_HEADER))
+
+
+def _data_uri(size):
+    return 'data:image/jpeg;base64,' + base64.b64encode(_jpeg(size)).decode()
+
+
+def _set_pool(workers, latency):
+    if image_storage._executor is not None:
+        image_storage._executor.shutdown()
+    image_storage.backend = LocalStorage(MEDIA_PATH, '/media', latency)
+    image_storage.workers = workers
+    image_storage._executor = None
+
+
+def measure_pipeline(images, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        image_storage.upload_many(images, PRODUCT_IMAGES_FOLDER)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def measure_route(images, iterations):
+    client = app.test_client()
+    fx = _fixtures()
+    body = {**PRODUCT_FIELDS, 'images': images}
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = client.post('/api/product/create', headers=fx['seller_headers'], json=body)
+        timings.append(time.perf_counter() - start)
+        if response.status_code != 201:
+            raise SystemExit(f'create_product: {response.status_code} {response.get_data(as_text=True)}')
+    return timings
+
+
+def _request_peak(client, headers, **body):
+    """ Pico de memoria de una petición; el entorno WSGI (con el cuerpo) se crea antes de medir """
+    environ = EnvironBuilder(path='/api/product/create', method='POST', headers=headers, **body).get_environ()
+    tracemalloc.start()
+    try:
+        response = client.open(environ)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if response.status_code != 201:
+        raise SystemExit(f'create_product: {response.status_code} {response.get_data(as_text=True)}')
+    return peak
+
+
+def measure_memory(count, size, iterations):
+    client = app.test_client()
+    headers = _fixtures()['seller_headers']
+    images = [_jpeg(size) for _ in range(count)]
+    json_body = {**PRODUCT_FIELDS, 'images': [
+        'data:image/jpeg;base64,' + base64.b64encode(image).decode() for image in images]}
+    results = {}
+    for path, body in (('json_base64', lambda: {'json': json_body}),
+                       ('multipart', lambda: {'data': {**PRODUCT_FIELDS, 'images': [
+                           (BytesIO(image), f'{index}.jpg') for index, image in enumerate(images)]}})):
+        peaks = [_request_peak(client, headers, **body()) for _ in range(iterations)]
+        results[path] = statistics.median(peaks) / (1024 * 1024)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=5, help='Imágenes por producto')
+    parser.add_argument('--image-kb', type=int, default=200, help='Tamaño de cada imagen')
+    parser.add_argument('--latency-ms', type=int, default=300, help='Latencia simulada por subida')
+    parser.add_argument('--workers', default='1,2,4,8', help='Tamaños de pool a comparar (1 = secuencial)')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--route', action='store_true', help='Medir también POST /api/product/create')
+    parser.add_argument('--memory', action='store_true', help='Pico de memoria de JSON base64 frente a multipart')
+    parser.add_argument('--output', help='Guarda los resultados en JSON')
+    args = parser.parse_args()
+
+    limiter.enabled = False
+    if args.route or args.memory:
+        build_database(100)
+
+    if args.memory:
+        _set_pool(image_storage.workers, 0)
+        peaks = measure_memory(args.images, args.image_kb * 1024, args.iterations)
+        payload_mb = args.images * args.image_kb / 1024
+        for path, peak in peaks.items():
+            print(f'{path:<12} pico {peak:8.1f} MB  ({peak / payload_mb:.2f}x las imágenes)', file=sys.stderr)
+        shutil.rmtree(MEDIA_PATH, ignore_errors=True)
+        if args.output:
+            with open(args.output, 'w') as output_file:
+                json.dump({'images': args.images, 'image_kb': args.image_kb, 'peak_mb': peaks}, output_file, indent=2)
+        return
+
+    images = [_data_uri(args.image_kb * 1024) for _ in range(args.images)]
+    results = []
+    for workers in [int(value) for value in args.workers.split(',')]:
+        _set_pool(workers, args.latency_ms / 1000)
+        entry = {'workers': workers, 'pipeline_ms': statistics.median(measure_pipeline(images, args.iterations)) * 1000}
+        if args.route:
+            entry['route_ms'] = statistics.median(measure_route(images, args.iterations)) * 1000
+        results.append(entry)
+
+        baseline = results[0]['pipeline_ms']
+        route = f"  create_product {entry['route_ms']:8.1f} ms" if args.route else ''
+        print(f"workers={workers:<3} upload_many {entry['pipeline_ms']:8.1f} ms  (x{baseline / entry['pipeline_ms']:.2f}){route}",
+              file=sys.stderr)
+
+    shutil.rmtree(MEDIA_PATH, ignore_errors=True)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'images': args.images, 'image_kb': args.image_kb, 'latency_ms': args.latency_ms,
+                       'results': results}, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""
+Configuración de gunicorn (la carga sola al arrancar desde la raíz del repo,
+como en el Procfile).
+
+Las métricas de Prometheus (src/api/metrics.py) de todos los workers se
+agregan a través de PROMETHEUS_MULTIPROC_DIR: el master lo vacía al arrancar
+y borra los valores "vivos" de cada worker que termina.
+"""
+import os
+import shutil
+import tempfile
+
+
+def on_starting(server):
+    path = os.environ.setdefault(
+        'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'kurisu_prometheus'))
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
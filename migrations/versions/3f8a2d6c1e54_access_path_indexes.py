@@ -0,0 +1,78 @@
+"""indexes for the listing, address and review access paths
+
+Revision ID: 3f8a2d6c1e54
+Revises: 9c4d1e6f2b87
+Create Date: 2026-10-18 16:05:47.229814
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8a2d6c1e54'
+down_revision = '9c4d1e6f2b87'
+branch_labels = None
+depends_on = None
+
+
+# Índices parciales sobre productos activos: la condición tiene que coincidir
+# con la que genera `Product.status == True` en cada motor
+ACTIVE = {'postgresql_where': sa.text('status'), 'sqlite_where': sa.text('status = 1')}
+ACTIVE_ON_SALE = {'postgresql_where': sa.text('status AND on_sale'),
+                  'sqlite_where': sa.text('status = 1 AND on_sale = 1')}
+
+INDEXES = [
+    ('ix_product_user_id', 'product', ['user_id'], {}),
+    ('ix_product_active_created_at', 'product', ['created_at', 'id'], ACTIVE),
+    ('ix_product_active_sale_updated_at', 'product', ['sale_updated_at'], ACTIVE_ON_SALE),
+    ('ix_product_active_price', 'product', ['price', 'id'], ACTIVE),
+    ('ix_product_active_name', 'product', ['name', 'id'], ACTIVE),
+    ('ix_address_user_id_is_default', 'address', ['user_id', 'is_default'], {}),
+    ('ix_review_product_id', 'review', ['product_id'], {}),
+    ('ix_stripe_pay_user_id_created_at', 'stripe_pay', ['user_id', 'created_at'], {}),
+    ('ix_product_technical_details_anime_series', 'product_technical_details', ['anime_series'], {}),
+    ('ix_product_technical_details_character', 'product_technical_details', ['character'], {}),
+    ('ix_product_technical_details_manufacturer', 'product_technical_details', ['manufacturer'], {}),
+    ('ix_product_technical_details_collection', 'product_technical_details', ['collection'], {}),
+]
+
+# Búsqueda por detalles técnicos con ILIKE '%...%': solo PostgreSQL (pg_trgm)
+TRIGRAM_COLUMNS = ['anime_series', 'character', 'manufacturer', 'collection']
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    for name, table, columns, options in INDEXES:
+        op.create_index(name, table, columns, **options)
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in TRIGRAM_COLUMNS:
+            op.create_index(f'ix_product_technical_details_{column}_trgm', 'product_technical_details',
+                            [column], postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+    # La contraseña es un hash con sal: la restricción única solo encarecía
+    # cada INSERT/UPDATE de usuario sin evitar nada
+    if dialect == 'postgresql':
+        op.drop_constraint('user_password_key', 'user', type_='unique')
+    else:
+        naming_convention = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+        with op.batch_alter_table('user', naming_convention=naming_convention) as batch_op:
+            batch_op.drop_constraint('uq_user_password', type_='unique')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.create_unique_constraint('user_password_key', 'user', ['password'])
+        for column in TRIGRAM_COLUMNS:
+            op.drop_index(f'ix_product_technical_details_{column}_trgm', table_name='product_technical_details')
+    else:
+        with op.batch_alter_table('user') as batch_op:
+            batch_op.create_unique_constraint('uq_user_password', ['password'])
+
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
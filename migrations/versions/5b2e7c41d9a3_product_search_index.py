@@ -0,0 +1,67 @@
+"""product full-text search index
+
+Revision ID: 5b2e7c41d9a3
+Revises: 81a44a0d9838
+Create Date: 2026-10-18 10:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e7c41d9a3'
+down_revision = '81a44a0d9838'
+branch_labels = None
+depends_on = None
+
+
+PG_DOCUMENT = """
+    setweight(to_tsvector('spanish', coalesce(p.name, '')), 'A') ||
+    setweight(to_tsvector('spanish', concat_ws(' ', d.anime_series, d.character)), 'A') ||
+    setweight(to_tsvector('spanish', concat_ws(' ', d.manufacturer, d.collection)), 'B') ||
+    setweight(to_tsvector('spanish', coalesce(p.description, '')), 'C')
+"""
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.create_table('product_search',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('document', sa.dialects.postgresql.TSVECTOR(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['product.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('product_id')
+        )
+        op.create_index('ix_product_search_document', 'product_search',
+                        ['document'], postgresql_using='gin')
+        op.execute(f"""
+            INSERT INTO product_search (product_id, document)
+            SELECT p.id, {PG_DOCUMENT}
+            FROM product p LEFT JOIN product_technical_details d ON d.product_id = p.id
+        """)
+
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE product_fts USING fts5(
+                name, description, anime_series, character, manufacturer, collection,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        op.execute("""
+            INSERT INTO product_fts (rowid, name, description, anime_series, character, manufacturer, collection)
+            SELECT p.id, p.name, p.description, coalesce(d.anime_series, ''), coalesce(d.character, ''),
+                   coalesce(d.manufacturer, ''), coalesce(d.collection, '')
+            FROM product p LEFT JOIN product_technical_details d ON d.product_id = p.id
+        """)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.drop_index('ix_product_search_document', table_name='product_search')
+        op.drop_table('product_search')
+    elif dialect == 'sqlite':
+        op.execute("DROP TABLE product_fts")
@@ -0,0 +1,55 @@
+"""job queue table and image processing state
+
+Revision ID: 7d2b9e4a6c13
+Revises: 3f8a2d6c1e54
+Create Date: 2026-10-18 17:20:11.482907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2b9e4a6c13'
+down_revision = '3f8a2d6c1e54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_status_run_at', 'job', ['status', 'run_at'])
+    op.create_index('ix_job_key', 'job', ['key'])
+
+    with op.batch_alter_table('product') as batch_op:
+        batch_op.add_column(sa.Column('images_status', sa.String(length=20), nullable=False, server_default='ready'))
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('img_status', sa.String(length=20), nullable=False, server_default='ready'))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('img_status')
+    with op.batch_alter_table('product') as batch_op:
+        batch_op.drop_column('images_status')
+
+    op.drop_index('ix_job_key', table_name='job')
+    op.drop_index('ix_job_status_run_at', table_name='job')
+    op.drop_table('job')
@@ -0,0 +1,33 @@
+"""catalog version counter for conditional GETs
+
+Revision ID: 9c4d1e6f2b87
+Revises: 5b2e7c41d9a3
+Create Date: 2026-10-18 11:40:05.118342
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4d1e6f2b87'
+down_revision = '5b2e7c41d9a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    catalog_version = op.create_table('catalog_version',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(catalog_version, [
+        {'name': 'catalog', 'version': 1, 'updated_at': datetime.utcnow()}
+    ])
+
+
+def downgrade():
+    op.drop_table('catalog_version')
@@ -0,0 +1,35 @@
+"""content-addressed image registry
+
+Revision ID: b6f1c8e2a4d7
+Revises: 7d2b9e4a6c13
+Create Date: 2026-10-18 18:05:37.214590
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f1c8e2a4d7'
+down_revision = '7d2b9e4a6c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_asset',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('public_id', sa.String(length=255), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=True),
+    sa.Column('height', sa.Integer(), nullable=True),
+    sa.Column('size', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_index('ix_image_asset_public_id', 'image_asset', ['public_id'])
+
+
+def downgrade():
+    op.drop_index('ix_image_asset_public_id', table_name='image_asset')
+    op.drop_table('image_asset')
@@ -8,6 +8,8 @@ from api.models.Rol import Rol
 from api.models.Address import Address
 from api.models.StripePay import StripePay
 from api.models.ProductTechnicalDetails import ProductTechnicalDetails
+from api.models.Job import Job
+from api.search import match_condition
 from flask_admin.contrib.sqla import ModelView
 
 
@@ -51,6 +53,15 @@ class ProductView(ModelView):
     column_searchable_list = ['name', 'description']
     column_filters = ['user_id', 'status', 'price']
 
+    def _apply_search(self, query, count_query, joins, count_joins, search):
+        # Con índice de texto completo se busca en él en lugar de con ILIKE '%...%'
+        condition = match_condition(Product.id, search, columns=self.column_searchable_list)
+        if condition is None:
+            return super()._apply_search(query, count_query, joins, count_joins, search)
+        if count_query is not None:
+            count_query = count_query.filter(condition)
+        return query.filter(condition), count_query, joins, count_joins
+
     # Formatear el precio con símbolo de moneda
     column_formatters = {
         'price': lambda v, c, m, p: f'{m.price:.2f}€'
@@ -74,6 +85,24 @@ class ProductTechnicalDetailsView(ModelView):
     column_filters = ['product_id', 'manufacturer', 'anime_series']
 
 
+class JobView(ModelView):
+    # El payload puede llevar imágenes en base64
+    column_list = ['id', 'kind', 'key', 'status', 'attempts', 'max_attempts',
+                   'run_at', 'created_at', 'finished_at', 'last_error']
+    column_exclude_list = ['payload']
+    form_excluded_columns = ['payload']
+
+    column_labels = {
+        'kind': 'Tipo',
+        'status': 'Estado',
+        'attempts': 'Intentos',
+        'last_error': 'Último error'
+    }
+
+    column_filters = ['kind', 'status']
+    column_default_sort = ('id', True)
+
+
 def setup_admin(app):
     app.secret_key = os.environ.get('FLASK_APP_KEY')
     if not app.secret_key:
@@ -88,6 +117,7 @@ def setup_admin(app):
     admin.add_view(ModelView(Address, db.session))
     admin.add_view(ProductTechnicalDetailsView(
         ProductTechnicalDetails, db.session, name='Detalles Técnicos'))
+    admin.add_view(JobView(Job, db.session, name='Tareas'))
 
     # You can duplicate that line to add mew models
     # admin.add_view(ModelView(YourModelName, db.session))
\ No newline at end of file
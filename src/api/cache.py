@@ -0,0 +1,274 @@
+"""
+Caché de respuestas para los GET públicos del catálogo.
+
+Backends disponibles (RESPONSE_CACHE_BACKEND):
+- memory: LRU con TTL en memoria del proceso (por defecto).
+- sqlite: fichero SQLite compartido por todos los workers de gunicorn
+  (RESPONSE_CACHE_PATH), así una escritura invalida la caché de todos.
+- none: desactivada.
+
+Las claves incluyen la ruta, los parámetros de la query y la "generación" del
+espacio de nombres; invalidar es incrementar la generación, de modo que las
+entradas viejas dejan de encontrarse y acaban saliendo por LRU/TTL.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import g, request, make_response
+from api.changes import on_tables_committed, CATALOG_TABLES
+from api.streaming import wants_stream
+
+# Espacio de nombres -> tablas cuyos cambios lo invalidan
+NAMESPACE_TABLES = {
+    'catalog': CATALOG_TABLES,
+}
+
+
+class NullCache:
+    name = 'none'
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        return 0
+
+    def get_generation(self, namespace):
+        return 0
+
+    def bump_generation(self, namespace):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class MemoryCache:
+    """ LRU con caducidad por entrada. set() devuelve cuántas entradas ha desalojado. """
+    name = 'memory'
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def get_generation(self, namespace):
+        return self._generations.get(namespace, 0)
+
+    def bump_generation(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Caché compartida entre procesos en un fichero SQLite (modo WAL).
+    Al superar max_entries se desalojan primero las caducadas y después las más antiguas.
+    """
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "stored_at REAL NOT NULL, expires_at REAL NOT NULL)")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_response_cache_stored_at ON response_cache (stored_at)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_generation ("
+                "namespace TEXT PRIMARY KEY, generation INTEGER NOT NULL)")
+
+    def _connection(self):
+        # sqlite3 no permite compartir conexiones entre hilos: una por hilo
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < time.time():
+            self._connection().execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            return None
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO response_cache (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now, now + ttl))
+
+        count = connection.execute("SELECT count(*) FROM response_cache").fetchone()[0]
+        if count <= self.max_entries:
+            return 0
+        evicted = connection.execute(
+            "DELETE FROM response_cache WHERE expires_at < ?", (now,)).rowcount
+        if count - evicted > self.max_entries:
+            evicted += connection.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM response_cache ORDER BY stored_at LIMIT ?)",
+                (count - evicted - self.max_entries,)).rowcount
+        return evicted
+
+    def get_generation(self, namespace):
+        row = self._connection().execute(
+            "SELECT generation FROM cache_generation WHERE namespace = ?", (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_generation(self, namespace):
+        self._connection().execute(
+            "INSERT INTO cache_generation (namespace, generation) VALUES (?, 1) "
+            "ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1", (namespace,))
+
+    def clear(self):
+        self._connection().execute("DELETE FROM response_cache")
+
+    def __len__(self):
+        return self._connection().execute("SELECT count(*) FROM response_cache").fetchone()[0]
+
+
+class ResponseCache:
+
+    def __init__(self):
+        self.backend = NullCache()
+        self.ttl = 300
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        backend = app.config.setdefault(
+            'RESPONSE_CACHE_BACKEND', os.getenv('RESPONSE_CACHE_BACKEND', 'memory'))
+        self.ttl = app.config.setdefault(
+            'RESPONSE_CACHE_TTL', int(os.getenv('RESPONSE_CACHE_TTL', 300)))
+        max_entries = app.config.setdefault(
+            'RESPONSE_CACHE_MAX_ENTRIES', int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024)))
+
+        if backend == 'memory':
+            self.backend = MemoryCache(max_entries)
+        elif backend == 'sqlite':
+            path = app.config.setdefault(
+                'RESPONSE_CACHE_PATH', os.getenv('RESPONSE_CACHE_PATH', '/tmp/kurisu_response_cache.sqlite3'))
+            self.backend = SQLiteCache(path, max_entries)
+        elif backend == 'none':
+            self.backend = NullCache()
+        else:
+            raise RuntimeError(f"RESPONSE_CACHE_BACKEND no válido: {backend}")
+
+    def _count(self, hits=0, misses=0, evictions=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def _key(self, namespace):
+        generation = self.backend.get_generation(namespace)
+        # Codificados otra vez: con los valores tal cual, ?q=a%26b%3Dc y ?q=a&b=c darían la misma clave
+        args = urlencode(sorted(request.args.items(multi=True)))
+        # Versión leída por @conditional (si lo hay) de la misma base que servirá los datos
+        version = g.get('validator_version', '')
+        return f'{namespace}:{generation}:{version}:{request.path}?{args}'
+
+    def cached(self, namespace='catalog'):
+        """ Decorador para vistas GET públicas: solo se guardan las respuestas 200 """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # Las exportaciones en streaming no se guardan (ni se sirven) desde la caché
+                if isinstance(self.backend, NullCache) or request.method != 'GET' or wants_stream():
+                    return view(*args, **kwargs)
+
+                key = self._key(namespace)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self._count(hits=1)
+                    body, status, content_type = entry
+                    response = make_response(body, status)
+                    response.content_type = content_type
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._count(misses=1)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    evicted = self.backend.set(
+                        key, (response.get_data(), response.status_code, response.content_type), self.ttl)
+                    self._count(evictions=evicted)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, namespace):
+        self.backend.bump_generation(namespace)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend.name,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+response_cache = ResponseCache()
+
+
+@on_tables_committed
+def _invalidate_changed_namespaces(tables):
+    for namespace, namespace_tables in NAMESPACE_TABLES.items():
+        if tables & namespace_tables:
+            response_cache.invalidate(namespace)
@@ -0,0 +1,148 @@
+"""
+Búsqueda facetada del catálogo: filtra, ordena y pagina en el servidor y
+calcula los contadores de cada faceta con consultas agregadas (GROUP BY).
+"""
+from sqlalchemy import func, or_
+from api.database.db import db
+from api.models.Product import Product
+from api.models.ProductTechnicalDetails import ProductTechnicalDetails
+from api.utils import APIException, parse_page_args
+from api.search import match_condition
+from api.projections import parse_fields, project
+
+# Nombre del parámetro / faceta -> columna de ProductTechnicalDetails
+FACETS = {
+    'series': ProductTechnicalDetails.anime_series,
+    'character': ProductTechnicalDetails.character,
+    'manufacturer': ProductTechnicalDetails.manufacturer,
+    'collection': ProductTechnicalDetails.collection,
+}
+
+SORTS = {
+    'relevance': (Product.id.asc(),),
+    'price-asc': (Product.price.asc(), Product.id.asc()),
+    'price-desc': (Product.price.desc(), Product.id.asc()),
+    'name-asc': (Product.name.asc(), Product.id.asc()),
+    'name-desc': (Product.name.desc(), Product.id.asc()),
+    'newest': (Product.created_at.desc(), Product.id.desc()),
+}
+
+DEFAULT_CATALOG_LIMIT = 24
+MAX_CATALOG_LIMIT = 100
+
+
+def _parse_float(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise APIException(f'El parámetro {name} debe ser numérico', 400)
+
+
+def parse_catalog_args(args):
+    sort = args.get('sort', 'relevance')
+    if sort not in SORTS:
+        raise APIException(f'Orden no válido: {sort}', 400)
+
+    # Las facetas admiten varios valores repitiendo el parámetro (?series=A&series=B)
+    facets = {}
+    for name in FACETS:
+        values = [value.strip().upper() for value in args.getlist(name) if value.strip()]
+        if values:
+            facets[name] = values
+
+    page, limit = parse_page_args(args, DEFAULT_CATALOG_LIMIT, MAX_CATALOG_LIMIT)
+
+    return {
+        'q': args.get('q', '').strip(),
+        'facets': facets,
+        'min_price': _parse_float(args, 'min_price'),
+        'max_price': _parse_float(args, 'max_price'),
+        'on_sale': args.get('on_sale') in ('1', 'true'),
+        'sort': sort,
+        'page': page,
+        'limit': limit,
+        'fields': parse_fields(args, Product),
+    }
+
+
+def _text_condition(q):
+    # Con índice de texto completo se usa; si no (p. ej. sin migrar), ILIKE
+    condition = match_condition(Product.id, q)
+    if condition is not None:
+        return condition
+
+    term = f'%{q}%'
+    return or_(
+        Product.name.ilike(term),
+        Product.description.ilike(term),
+        ProductTechnicalDetails.anime_series.ilike(term),
+        ProductTechnicalDetails.character.ilike(term),
+        ProductTechnicalDetails.manufacturer.ilike(term),
+        ProductTechnicalDetails.collection.ilike(term),
+    )
+
+
+def _base_conditions(params):
+    conditions = [Product.status == True]
+    if params['q']:
+        conditions.append(_text_condition(params['q']))
+    if params['min_price'] is not None:
+        conditions.append(Product.price >= params['min_price'])
+    if params['max_price'] is not None:
+        conditions.append(Product.price <= params['max_price'])
+    if params['on_sale']:
+        conditions.append(Product.on_sale == True)
+    return conditions
+
+
+def _facet_conditions(params, exclude=None):
+    return [
+        FACETS[name].in_(values)
+        for name, values in params['facets'].items()
+        if name != exclude
+    ]
+
+
+def _facet_counts(params, base_conditions):
+    # Cada faceta se cuenta con los filtros de las demás pero no con los suyos,
+    # para que el usuario pueda seguir ampliando la selección (OR dentro de la faceta)
+    facets = {}
+    for name, column in FACETS.items():
+        rows = db.session.query(column, func.count(Product.id))\
+            .select_from(Product)\
+            .outerjoin(ProductTechnicalDetails)\
+            .filter(*base_conditions, *_facet_conditions(params, exclude=name))\
+            .filter(column != None, column != '')\
+            .group_by(column)\
+            .order_by(column)\
+            .all()
+        facets[name] = [{'value': value, 'count': count} for value, count in rows]
+    return facets
+
+
+def search_catalog(params):
+    base_conditions = _base_conditions(params)
+
+    query = Product.query\
+        .outerjoin(ProductTechnicalDetails)\
+        .filter(*base_conditions, *_facet_conditions(params))
+
+    total = query.with_entities(func.count(Product.id)).scalar()
+
+    products_query, serialize = project(query, Product, params['fields'])
+    products = products_query\
+        .order_by(*SORTS[params['sort']])\
+        .offset((params['page'] - 1) * params['limit'])\
+        .limit(params['limit'])\
+        .all()
+
+    return {
+        'products': [serialize(product) for product in products],
+        'total': total,
+        'page': params['page'],
+        'limit': params['limit'],
+        'facets': _facet_counts(params, base_conditions),
+    }
@@ -0,0 +1,128 @@
+"""
+Seguimiento de cambios del catálogo.
+
+Cada vez que la sesión hace flush de productos o detalles técnicos se avisa a
+los "flush listeners" (dentro de la misma transacción, con la conexión de la
+sesión) y, cuando la transacción se confirma, a los "commit listeners".
+Los índices y cachés derivados del catálogo se registran aquí en vez de
+engancharse cada uno a los eventos de SQLAlchemy por su cuenta.
+
+Además se anotan las tablas modificadas en la transacción (incluidos los
+UPDATE/DELETE masivos con Query.update()) para quien necesite invalidar por
+tabla, p. ej. la caché de respuestas.
+"""
+from sqlalchemy import event
+from api.database.db import db
+from api.models.Product import Product
+from api.models.ProductTechnicalDetails import ProductTechnicalDetails
+
+# Tablas cuyo contenido aparece en las respuestas del catálogo
+# (Product.serialize() incluye vendedor, rol, direcciones y detalles técnicos)
+CATALOG_TABLES = {'product', 'product_technical_details', 'user', 'address', 'rol'}
+
+_flush_listeners = []
+_commit_listeners = []
+_tables_flush_listeners = []
+_tables_listeners = []
+
+_PENDING_KEY = 'changed_product_ids'
+_TABLES_KEY = 'changed_tables'
+
+
+def on_products_flushed(fn):
+    """ fn(session, product_ids): se ejecuta dentro de la transacción """
+    _flush_listeners.append(fn)
+    return fn
+
+
+def on_products_committed(fn):
+    """ fn(product_ids): se ejecuta después de un commit correcto """
+    _commit_listeners.append(fn)
+    return fn
+
+
+def on_tables_flushed(fn):
+    """ fn(session, table_names): se ejecuta dentro de la transacción """
+    _tables_flush_listeners.append(fn)
+    return fn
+
+
+def on_tables_committed(fn):
+    """ fn(table_names): se ejecuta después de un commit que modificó esas tablas """
+    _tables_listeners.append(fn)
+    return fn
+
+
+def mark_products_changed(session, product_ids):
+    """
+    Para escrituras que no pasan por la unidad de trabajo del ORM
+    (inserciones masivas, UPDATE directos): notifica los cambios a mano.
+    """
+    if _notify_products(session, product_ids):
+        _notify_tables(session, {Product.__tablename__, ProductTechnicalDetails.__tablename__})
+
+
+def _notify_products(session, product_ids):
+    product_ids = {product_id for product_id in product_ids if product_id is not None}
+    if not product_ids:
+        return False
+    for fn in _flush_listeners:
+        fn(session, product_ids)
+    session.info.setdefault(_PENDING_KEY, set()).update(product_ids)
+    return True
+
+
+def _notify_tables(session, tables):
+    for fn in _tables_flush_listeners:
+        fn(session, tables)
+    session.info.setdefault(_TABLES_KEY, set()).update(tables)
+
+
+def _changed_product_ids(session):
+    product_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Product):
+            product_ids.add(obj.id)
+        elif isinstance(obj, ProductTechnicalDetails):
+            product_ids.add(obj.product_id)
+    product_ids.discard(None)
+    return product_ids
+
+
+@event.listens_for(db.session, 'after_flush')
+def _after_flush(session, flush_context):
+    tables = {
+        obj.__tablename__
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+    }
+    if tables:
+        _notify_tables(session, tables)
+    _notify_products(session, _changed_product_ids(session))
+
+
+# Query.update() / Query.delete() no pasan por el flush. No se usa do_orm_execute
+# porque cualquier listener de ese evento rompe yield_per + selectinload
+# (api.streaming); a cambio, los update()/delete() estilo 2.0 ejecutados con
+# session.execute() no se detectan y hay que avisar con mark_products_changed().
+@event.listens_for(db.session, 'after_bulk_update')
+@event.listens_for(db.session, 'after_bulk_delete')
+def _after_bulk_statement(bulk_context):
+    _notify_tables(bulk_context.session, {bulk_context.mapper.local_table.name})
+
+
+@event.listens_for(db.session, 'after_commit')
+def _after_commit(session):
+    product_ids = session.info.pop(_PENDING_KEY, None)
+    tables = session.info.pop(_TABLES_KEY, None)
+    if product_ids:
+        for fn in _commit_listeners:
+            fn(product_ids)
+    if tables:
+        for fn in _tables_listeners:
+            fn(tables)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_TABLES_KEY, None)
@@ -1,7 +1,18 @@
 
 import click
+import multiprocessing
+import signal
+import threading
+from datetime import timedelta
 from api.database.db import db
 from api.models.User import User
+from api.search import create_search_schema, rebuild_index
+from api.importer import import_products
+from api.seed import DatasetGenerator
+from api.database.replica import REPLICA, sync_sqlite_replica
+from api.jobs import job_queue
+from api.image_gc import collect_orphans, GC_FOLDERS
+from api.storage import DESTROY_BATCH_SIZE
 
 """
 In this file, you can add as many commands as you want using the @app.cli.command decorator
@@ -31,5 +42,125 @@ def setup_commands(app):
         print("All test users created")
 
     @app.cli.command("insert-test-data")
-    def insert_test_data():
-        pass
\ No newline at end of file
+    @click.option("--users", default=1000, show_default=True)
+    @click.option("--products", default=10000, show_default=True)
+    @click.option("--payments", default=5000, show_default=True)
+    @click.option("--reviews", default=2000, show_default=True)
+    @click.option("--seed", default=42, show_default=True, help="Misma semilla, mismos datos")
+    @click.option("--batch-size", default=5000, show_default=True)
+    @click.option("--reference-date", type=click.DateTime(formats=["%Y-%m-%d"]),
+                  help="Fecha a partir de la que se calculan las fechas (por defecto, hoy)")
+    def insert_test_data(users, products, payments, reviews, seed, batch_size, reference_date):
+        """ Genera un conjunto de datos sintético y reproducible para pruebas de carga """
+        generator = DatasetGenerator(seed=seed, batch_size=batch_size, reference_date=reference_date)
+        try:
+            generator.run(users=users, products=products, payments=payments, reviews=reviews)
+        except Exception as e:
+            db.session.rollback()
+            raise click.ClickException(f"Error generando datos: {str(e)}")
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index():
+        """ Crea (si falta) y reconstruye el índice de búsqueda de texto completo """
+        connection = db.session.connection()
+        create_search_schema(connection)
+        rebuild_index(connection)
+        db.session.commit()
+        print("Search index rebuilt")
+
+    @app.cli.command("sync-replica")
+    def sync_replica():
+        """ Copia la base principal en la réplica de lectura (solo SQLite, para probar en local) """
+        if REPLICA not in db.engines:
+            raise click.ClickException("DATABASE_REPLICA_URL no está configurada")
+        try:
+            sync_sqlite_replica(db.engine, db.engines[REPLICA])
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        print("Réplica actualizada")
+
+    @app.cli.command("import-products")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--seller", "seller_id", type=int, required=True, help="Id del vendedor dueño de los productos")
+    @click.option("--batch-size", default=500, show_default=True, help="Filas por lote (una transacción por lote)")
+    @click.option("--format", "file_format", type=click.Choice(["csv", "jsonl"]), help="Por defecto, según la extensión")
+    @click.option("--restart", is_flag=True, help="Ignora el checkpoint y empieza desde la primera fila")
+    def import_products_command(path, seller_id, batch_size, file_format, restart):
+        """ Importa productos con sus detalles técnicos desde un CSV o JSONL """
+        seller = User.query.get(seller_id)
+        if not seller or seller.rol_id != 2:
+            raise click.ClickException(f"El usuario {seller_id} no existe o no es vendedor")
+
+        try:
+            summary = import_products(path, seller_id, batch_size=batch_size,
+                                      file_format=file_format, resume=not restart)
+        except Exception as e:
+            raise click.ClickException(f"Importación interrumpida: {str(e)}")
+
+        for error in summary["invalid"]:
+            print(error)
+        rate = summary["rows"] / summary["seconds"] if summary["seconds"] else 0
+        print(f"{summary['inserted']} productos creados, {summary['updated']} actualizados, "
+              f"{len(summary['invalid'])} filas inválidas en {summary['seconds']:.1f}s ({rate:,.0f} filas/s)")
+
+    @app.cli.command("worker")
+    @click.option("--processes", default=1, show_default=True, help="Procesos worker")
+    @click.option("--poll-interval", default=1.0, show_default=True, help="Segundos entre consultas con la cola vacía")
+    @click.option("--burst", is_flag=True, help="Termina cuando no quedan tareas listas")
+    def worker(processes, poll_interval, burst):
+        """ Procesa la cola de tareas en segundo plano (api.jobs) """
+        def run(stop):
+            # SIGTERM/SIGINT: termina la tarea en curso y sale
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *args: stop.set())
+            processed = job_queue.work(poll_interval=poll_interval, burst=burst, stop=stop)
+            print(f"Worker terminado: {processed} tareas procesadas")
+
+        if processes == 1:
+            run(threading.Event())
+            return
+
+        def child():
+            # Las conexiones heredadas del padre no se comparten entre procesos
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+            run(threading.Event())
+
+        context = multiprocessing.get_context("fork")
+        children = [context.Process(target=child, name=f"worker-{n}") for n in range(processes)]
+        for process in children:
+            process.start()
+
+        def terminate(*args):
+            for process in children:
+                process.terminate()
+        signal.signal(signal.SIGTERM, terminate)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C ya llega a todo el grupo de procesos
+        for process in children:
+            process.join()
+
+    @app.cli.command("requeue-dead-jobs")
+    @click.option("--kind", help="Solo las tareas de este tipo")
+    def requeue_dead_jobs(kind):
+        """ Vuelve a poner en cola las tareas descartadas (dead) """
+        count = job_queue.requeue_dead(kind)
+        print(f"{count} tareas en cola de nuevo")
+
+    @app.cli.command("gc-images")
+    @click.option("--folder", "folders", multiple=True, type=click.Choice(GC_FOLDERS), help="Por defecto, todas")
+    @click.option("--min-age-hours", default=24.0, show_default=True, help="Solo imágenes subidas hace más de estas horas")
+    @click.option("--batch-size", default=DESTROY_BATCH_SIZE, show_default=True,
+                  type=click.IntRange(1, DESTROY_BATCH_SIZE), help="Imágenes por llamada de borrado")
+    @click.option("--pause", default=1.0, show_default=True, help="Segundos entre lotes de borrado")
+    @click.option("--dry-run", is_flag=True, help="Solo lista las imágenes huérfanas")
+    def gc_images(folders, min_age_hours, batch_size, pause, dry_run):
+        """ Borra del almacenamiento las imágenes que no usa ningún producto ni usuario """
+        summary = collect_orphans(folders or GC_FOLDERS, timedelta(hours=min_age_hours), batch_size,
+                                  pause, dry_run, log=print)
+        print(f"{summary['listed']} imágenes en el almacenamiento, {summary['orphans']} huérfanas")
+        if dry_run:
+            print(f"Nada borrado (--dry-run); {summary['stale_registry']} filas de image_asset sin imagen")
+            return
+        print(f"{summary['deleted']} borradas, {summary['failed']} sin borrar, "
+              f"{summary['reused']} reutilizadas durante el proceso, "
+              f"{summary['stale_registry']} filas de image_asset sin imagen eliminadas")
@@ -0,0 +1,116 @@
+"""
+GET condicionales (ETag / Last-Modified) para los endpoints de lectura del catálogo.
+
+La versión del catálogo es un contador en la tabla catalog_version que se
+incrementa dentro de la misma transacción de cualquier escritura sobre las
+tablas del catálogo, así que es coherente entre todos los workers. Comprobar
+If-None-Match / If-Modified-Since solo cuesta leer esa fila: si el cliente ya
+tiene la versión actual se responde 304 sin cargar ni serializar productos.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import g, request, make_response, current_app
+from sqlalchemy import select, update, insert, func
+from api.database.db import db
+from api.models.CatalogVersion import CatalogVersion
+from api.changes import on_tables_flushed, CATALOG_TABLES
+from api.streaming import wants_stream, NDJSON_MIMETYPE
+
+CATALOG = 'catalog'
+
+_versions = CatalogVersion.__table__
+
+
+def catalog_version():
+    """ Devuelve (versión, fecha de la última escritura) del catálogo """
+    row = db.session.execute(
+        select(_versions.c.version, _versions.c.updated_at).where(_versions.c.name == CATALOG)
+    ).first()
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
+
+
+def catalog_validator():
+    return catalog_version()
+
+
+def window_validator(query):
+    """
+    Para listados con ventana temporal (p. ej. novedades de los últimos 30 días)
+    el resultado cambia sin escrituras cuando un producto sale de la ventana:
+    se añade el número de filas a la versión y no se emite Last-Modified.
+    """
+    version, _ = catalog_version()
+    count = query.with_entities(func.count()).scalar()
+    return f'{version}-{count}', None
+
+
+def _http_datetime(value):
+    return value.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return _http_datetime(last_modified) <= request.if_modified_since
+    return False
+
+
+def _add_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    response.vary.add('Accept')
+    if last_modified is not None:
+        response.last_modified = _http_datetime(last_modified)
+    # El navegador puede guardar la respuesta, pero debe revalidarla siempre
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional(validator=catalog_validator):
+    """
+    Decorador para vistas GET. validator() devuelve (versión, last_modified);
+    el ETag se deriva de la versión y de la URL completa (ruta + query).
+    Debe ir por encima de response_cache.cached() para cortar antes.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            version, last_modified = validator()
+            # La caché de respuestas la usa en la clave: con réplica, lo leído
+            # con retraso no se guarda bajo la versión nueva
+            g.validator_version = version
+            # JSON y NDJSON son representaciones distintas de la misma URL
+            representation = NDJSON_MIMETYPE if wants_stream() else 'application/json'
+            etag = hashlib.sha1(f'{version}|{request.full_path}|{representation}'.encode()).hexdigest()
+
+            if _not_modified(etag, last_modified):
+                return _add_validators(current_app.response_class(status=304), etag, last_modified)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _add_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+@on_tables_flushed
+def _bump_catalog_version(session, tables):
+    if not tables & CATALOG_TABLES:
+        return
+
+    connection = session.connection()
+    now = datetime.utcnow()
+    result = connection.execute(
+        update(_versions)
+        .where(_versions.c.name == CATALOG)
+        .values(version=_versions.c.version + 1, updated_at=now)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(_versions).values(name=CATALOG, version=1, updated_at=now))
@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from api.database.replica import RoutingSession
 
 
-db = SQLAlchemy()
\ No newline at end of file
+# RoutingSession: lecturas opcionales en la réplica (api/database/replica.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
\ No newline at end of file
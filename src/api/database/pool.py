@@ -0,0 +1,265 @@
+"""
+Opciones del engine (SQLALCHEMY_ENGINE_OPTIONS) a partir de variables de
+entorno, y métricas del pool de conexiones.
+
+DB_POOL_MODE:
+- queue: pool propio en cada worker (por defecto). Con N workers de gunicorn
+  el máximo de conexiones es N * (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+- pgbouncer: PgBouncer en modo transacción hace el pool; la aplicación no
+  guarda conexiones (NullPool) y el statement_timeout se fija con SET LOCAL
+  en cada transacción, porque PgBouncer no admite el parámetro "options" y un
+  SET de sesión pasaría a otros clientes.
+
+El resto (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS, DB_CONNECT_TIMEOUT) solo se aplica
+a bases de datos servidor; SQLite se queda con los valores de SQLAlchemy.
+Las métricas se consultan en GET /api/ops/db/pool (con X-Ops-Token).
+
+Las métricas son de cada proceso: con varios workers, cada uno cuenta las suyas.
+"""
+import os
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, NullPool
+
+POOL_MODES = ('queue', 'pgbouncer')
+TRUE_VALUES = ('1', 'true', 'yes')
+
+# Límites (segundos) del histograma de espera al pedir una conexión
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Nombre del pool del engine principal; los binds usan su clave
+DEFAULT_POOL = 'default'
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise RuntimeError(f"{name} debe ser un número entero: {value}")
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in TRUE_VALUES
+
+
+class _PoolCounters:
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.checkout_wait_max = 0.0
+        self.checkout_wait_buckets = [0] * len(CHECKOUT_WAIT_BUCKETS)
+        self.overflow_connections = 0
+        self.timeouts = 0
+        self.connections_opened = 0
+        self.invalidations = 0
+
+
+class PoolMetrics:
+    """
+    Contadores de cada pool (por nombre: "default" y uno por bind, p. ej.
+    "replica"): espera al pedir conexión, desbordes, timeouts...
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.engines = {}
+        self.mode = None
+        self._counters = {}
+        self._checkout_listeners = []
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+
+    def _pool(self, name):
+        counters = self._counters.get(name)
+        if counters is None:
+            counters = self._counters[name] = _PoolCounters()
+        return counters
+
+    def on_checkout(self, listener):
+        """ listener(nombre_del_pool, segundos) tras cada checkout (p. ej. api.metrics) """
+        self._checkout_listeners.append(listener)
+
+    def observe_checkout(self, name, seconds, overflowed):
+        for listener in self._checkout_listeners:
+            listener(name, seconds)
+        with self._lock:
+            counters = self._pool(name)
+            counters.checkouts += 1
+            counters.checkout_wait_seconds += seconds
+            counters.checkout_wait_max = max(counters.checkout_wait_max, seconds)
+            for i, bound in enumerate(CHECKOUT_WAIT_BUCKETS):
+                if seconds <= bound:
+                    counters.checkout_wait_buckets[i] += 1
+                    break
+            if overflowed:
+                counters.overflow_connections += 1
+
+    def count_timeout(self, name):
+        with self._lock:
+            self._pool(name).timeouts += 1
+
+    def _listen(self, name, engine):
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self._pool(name).connections_opened += 1
+
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self._pool(name).invalidations += 1
+
+        event.listen(engine, 'connect', on_connect)
+        event.listen(engine, 'invalidate', on_invalidate)
+
+    def init_app(self, app, db):
+        """ Después de db.init_app() """
+        with app.app_context():
+            engines = dict(db.engines)
+        self.mode = app.config.get('DB_POOL_MODE', 'queue')
+        statement_timeout = app.config.get('DB_STATEMENT_TIMEOUT_MS')
+
+        for key, engine in engines.items():
+            name = key or DEFAULT_POOL
+            self.engines[name] = engine
+            self._listen(name, engine)
+            if self.mode == 'pgbouncer' and statement_timeout and engine.dialect.name == 'postgresql':
+                event.listen(engine, 'begin', _set_local_statement_timeout(statement_timeout))
+
+    def _pool_stats(self, name, engine):
+        pool = engine.pool
+        occupancy = {}
+        if isinstance(pool, QueuePool):
+            occupancy = {
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+            }
+            if isinstance(pool, InstrumentedQueuePool):
+                occupancy['max_overflow'] = pool.overflow_limit
+        counters = self._pool(name)
+        return {
+            'pool': type(pool).__name__,
+            **occupancy,
+            'checkouts': counters.checkouts,
+            'checkout_wait_seconds_total': round(counters.checkout_wait_seconds, 6),
+            'checkout_wait_seconds_max': round(counters.checkout_wait_max, 6),
+            'checkout_wait_buckets': [
+                {'le': bound, 'count': count}
+                for bound, count in zip(CHECKOUT_WAIT_BUCKETS, counters.checkout_wait_buckets)
+            ],
+            'overflow_connections': counters.overflow_connections,
+            'timeouts': counters.timeouts,
+            'connections_opened': counters.connections_opened,
+            'invalidations': counters.invalidations,
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'pools': {name: self._pool_stats(name, engine) for name, engine in self.engines.items()},
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool que mide cuánto espera cada checkout y si abre una conexión de
+    desborde. Cada pool usa la subclase de su nombre (instrumented_pool_class):
+    recreate(), p. ej. tras dispose(), crea el nuevo pool con la misma clase.
+    """
+    pool_name = DEFAULT_POOL
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kwargs):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kwargs)
+        self.overflow_limit = max_overflow
+
+    def _do_get(self):
+        # overflow() empieza en -pool_size y sube con cada conexión nueva: por
+        # encima de 0 son conexiones de desborde (max_overflow)
+        overflow = self.overflow()
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.count_timeout(self.pool_name)
+            raise
+        pool_metrics.observe_checkout(self.pool_name, time.perf_counter() - start, self.overflow() > max(overflow, 0))
+        return connection
+
+
+_pool_classes = {}
+
+
+def instrumented_pool_class(name):
+    """ Subclase de InstrumentedQueuePool para el pool `name` ("default", "replica"...) """
+    if name not in _pool_classes:
+        _pool_classes[name] = type(InstrumentedQueuePool.__name__, (InstrumentedQueuePool,), {'pool_name': name})
+    return _pool_classes[name]
+
+
+def _set_local_statement_timeout(timeout_ms):
+    def on_begin(connection):
+        connection.exec_driver_sql(f'SET LOCAL statement_timeout = {timeout_ms}')
+    return on_begin
+
+
+def engine_options(database_url, mode, statement_timeout, name=DEFAULT_POOL):
+    """ Opciones de create_engine() para la URL y el modo de pool """
+    url = make_url(database_url)
+    if url.get_backend_name() == 'sqlite':
+        # Mismos valores por defecto de SQLAlchemy, pero con métricas (no en memoria)
+        if url.database in (None, '', ':memory:'):
+            return {}
+        return {'poolclass': instrumented_pool_class(name), 'pool_logging_name': name}
+
+    connect_args = {}
+    connect_timeout = _env_int('DB_CONNECT_TIMEOUT', 10)
+    if connect_timeout and url.get_backend_name() == 'postgresql':
+        connect_args['connect_timeout'] = connect_timeout
+
+    if mode == 'pgbouncer':
+        if url.get_driver_name() == 'psycopg':
+            # Las sentencias preparadas del servidor no sobreviven al cambio de backend
+            connect_args['prepare_threshold'] = None
+        return {'poolclass': NullPool, 'pool_logging_name': name, 'connect_args': connect_args}
+
+    if statement_timeout and url.get_backend_name() == 'postgresql':
+        connect_args['options'] = f'-c statement_timeout={statement_timeout}'
+
+    return {
+        'poolclass': instrumented_pool_class(name),
+        'pool_logging_name': name,
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        'connect_args': connect_args,
+    }
+
+
+def configure_engine_options(app):
+    """ Antes de db.init_app(): rellena SQLALCHEMY_ENGINE_OPTIONS si no viene ya en la configuración """
+    mode = app.config.setdefault('DB_POOL_MODE', os.getenv('DB_POOL_MODE', 'queue'))
+    if mode not in POOL_MODES:
+        raise RuntimeError(f"DB_POOL_MODE no válido: {mode} (opciones: {', '.join(POOL_MODES)})")
+    statement_timeout = app.config.setdefault(
+        'DB_STATEMENT_TIMEOUT_MS', _env_int('DB_STATEMENT_TIMEOUT_MS', 0))
+    app.config.setdefault(
+        'SQLALCHEMY_ENGINE_OPTIONS',
+        engine_options(app.config['SQLALCHEMY_DATABASE_URI'], mode, statement_timeout))
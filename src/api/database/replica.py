@@ -0,0 +1,105 @@
+"""
+Lecturas en una réplica (DATABASE_REPLICA_URL), opcional.
+
+Las vistas GET marcadas con @replica_reads leen de la réplica; todo lo demás
+(escrituras, vistas sin marcar, comandos) sigue en la principal. Dentro de
+una petición, en cuanto la sesión escribe (flush, INSERT/UPDATE/DELETE) el
+resto de lecturas de esa petición vuelven a la principal, y la respuesta
+lleva una cookie (kurisu_primary) que durante DATABASE_REPLICA_STICKY_SECONDS
+manda también a la principal las siguientes peticiones de ese cliente, para
+que vea sus propios cambios aunque la réplica vaya con retraso. El front
+llama a la API desde otro origen: sus fetch van con credentials: "include"
+y, en las peticiones con Origin de otro sitio, la cookie es SameSite=None;
+Secure (con Lax el navegador no la mandaría).
+
+Sin DATABASE_REPLICA_URL no cambia nada. En local se puede probar con dos
+ficheros SQLite: la réplica se actualiza con `flask sync-replica`.
+"""
+import os
+import sqlite3
+from functools import wraps
+from flask import g, request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+from api.database.pool import engine_options
+
+REPLICA = 'replica'
+STICKY_COOKIE = 'kurisu_primary'
+_WROTE_KEY = 'wrote_to_primary'
+
+
+class RoutingSession(Session):
+    """ Sesión de Flask-SQLAlchemy que manda las SELECT de las vistas marcadas a la réplica """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, read_only=False, **kwargs):
+        # read_only: lectura que no es una Select (p. ej. text() de api.search), vía bind_arguments
+        if bind is None:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self._mark_write()
+            elif (read_only or isinstance(clause, Select)) and self._reads_from_replica():
+                return self._db.engines[REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _mark_write(self):
+        self.info[_WROTE_KEY] = True
+        if has_request_context():
+            g.wrote_to_primary = True
+
+    def _reads_from_replica(self):
+        if self.info.get(_WROTE_KEY) or not has_request_context():
+            return False
+        return g.get('replica_reads', False) and REPLICA in self._db.engines
+
+
+def read_connection(session):
+    """ Conexión de la sesión para consultas de solo lectura: la réplica donde toque """
+    return session.connection(bind_arguments={'read_only': True})
+
+
+def replica_reads(view):
+    """ Decorador para vistas GET cuyas lecturas pueden ir a la réplica """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method in ('GET', 'HEAD') and STICKY_COOKIE not in request.cookies:
+            g.replica_reads = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def configure_replica(app):
+    """ Antes de db.init_app(): añade el bind de la réplica si hay DATABASE_REPLICA_URL """
+    replica_url = app.config.setdefault('DATABASE_REPLICA_URL', os.getenv('DATABASE_REPLICA_URL'))
+    sticky_seconds = app.config.setdefault(
+        'DATABASE_REPLICA_STICKY_SECONDS', int(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', 10)))
+    if not replica_url:
+        return
+
+    replica_url = replica_url.replace("postgres://", "postgresql://")
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    binds.setdefault(REPLICA, {
+        'url': replica_url,
+        **engine_options(replica_url, app.config['DB_POOL_MODE'], app.config['DB_STATEMENT_TIMEOUT_MS'], REPLICA),
+    })
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if g.get('wrote_to_primary'):
+            cross_origin = request.origin is not None and request.origin.rstrip('/') != request.host_url.rstrip('/')
+            response.set_cookie(STICKY_COOKIE, '1', max_age=sticky_seconds, httponly=True,
+                                samesite='None' if cross_origin else 'Lax', secure=cross_origin)
+        return response
+
+
+def sync_sqlite_replica(primary, replica):
+    """ Copia la base principal en la réplica. Solo SQLite, para probar en local """
+    if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise ValueError('sync-replica solo copia bases SQLite; en producción replica el propio motor')
+    replica.dispose()
+    source = sqlite3.connect(primary.url.database)
+    target = sqlite3.connect(replica.url.database)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
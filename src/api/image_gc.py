@@ -0,0 +1,116 @@
+"""
+Recolector de imágenes huérfanas (flask gc-images).
+
+Al cambiar las imágenes de un producto o el avatar de un usuario las
+anteriores se quedan en el almacenamiento. El recolector lista las carpetas
+de imágenes (kurisushop_products, kurisushop_users), las compara por
+public_id con las URLs de Product.images y User.img y borra las que no usa
+nadie, en lotes de como mucho DESTROY_BATCH_SIZE con una pausa entre lotes
+(la Admin API de Cloudinary tiene un límite de llamadas por hora).
+
+- Solo se borran imágenes con más de min_age: las de una subida en curso
+  todavía no están en la base de datos.
+- Antes de borrar se quitan del registro de deduplicación (image_asset) y
+  se vuelven a leer las referencias: una petición puede haber reutilizado
+  alguna mientras tanto.
+- Las filas de image_asset de imágenes que ya no existen también se borran.
+
+Funciona igual con el backend local (IMAGE_STORAGE_BACKEND=local).
+"""
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+from api.database.db import db
+from api.models.Product import Product
+from api.models.User import User
+from api.models.ImageAsset import ImageAsset
+from api.storage import image_storage, PRODUCT_IMAGES_FOLDER, USER_IMAGES_FOLDER, DESTROY_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+GC_FOLDERS = (PRODUCT_IMAGES_FOLDER, USER_IMAGES_FOLDER)
+READ_BATCH_SIZE = 1000
+
+
+def public_id_from_url(url):
+    """ '.../upload/v1/kurisushop_products/abc.jpg' o '/media/kurisushop_products/abc.jpg' -> 'kurisushop_products/abc' """
+    path = urlparse(url).path
+    for folder in GC_FOLDERS:
+        position = path.find(f'/{folder}/')
+        if position != -1:
+            return os.path.splitext(path[position + 1:])[0]
+    return None
+
+
+def referenced_public_ids():
+    referenced = set()
+    for (images,) in db.session.query(Product.images).yield_per(READ_BATCH_SIZE):
+        referenced.update(public_id_from_url(url) for url in images or [])
+    for (img,) in db.session.query(User.img).filter(User.img.isnot(None)).yield_per(READ_BATCH_SIZE):
+        referenced.add(public_id_from_url(img))
+    referenced.discard(None)
+    return referenced
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _forget(public_ids, batch_size):
+    """ Quita del registro de deduplicación las imágenes dadas """
+    for chunk in _chunks(list(public_ids), batch_size):
+        ImageAsset.query.filter(ImageAsset.public_id.in_(chunk)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def collect_orphans(folders=GC_FOLDERS, min_age=timedelta(hours=24), batch_size=DESTROY_BATCH_SIZE,
+                    pause=1.0, dry_run=False, log=logger.info):
+    """ Borra (o con dry_run solo lista) las imágenes sin referencias; devuelve el resumen """
+    summary = {'listed': 0, 'orphans': 0, 'deleted': 0, 'failed': 0, 'reused': 0, 'stale_registry': 0}
+    limit = datetime.utcnow() - min_age
+    referenced = referenced_public_ids()
+
+    orphans, listed = [], set()
+    for folder in folders:
+        for image in image_storage.list_images(folder):
+            listed.add(image['public_id'])
+            if image['public_id'] not in referenced and image['created_at'] < limit:
+                orphans.append(image)
+    summary['listed'] = len(listed)
+    summary['orphans'] = len(orphans)
+
+    # Filas del registro cuya imagen ya no está en el almacenamiento
+    stale = [
+        public_id for (public_id,) in db.session.query(ImageAsset.public_id).filter(ImageAsset.created_at < limit)
+        if public_id.split('/', 1)[0] in folders and public_id not in listed
+    ]
+    summary['stale_registry'] = len(stale)
+
+    if dry_run:
+        for image in orphans:
+            log(f"Huérfana: {image['public_id']} ({image['url']}, {image['created_at']:%Y-%m-%d %H:%M})")
+        return summary
+
+    _forget(stale, batch_size)
+    _forget([image['public_id'] for image in orphans], batch_size)
+    # Las que se han reutilizado desde la primera lectura se quedan
+    referenced = referenced_public_ids()
+    public_ids = [image['public_id'] for image in orphans if image['public_id'] not in referenced]
+    summary['reused'] = len(orphans) - len(public_ids)
+
+    for number, batch in enumerate(_chunks(public_ids, batch_size)):
+        if number:
+            time.sleep(pause)
+        try:
+            deleted = image_storage.destroy_many(batch)
+        except Exception as exc:
+            summary['failed'] += len(batch)
+            logger.warning('No se pudo borrar un lote de %s imágenes: %s', len(batch), exc)
+            continue
+        summary['deleted'] += len(deleted)
+        summary['failed'] += len(batch) - len(deleted)
+        log(f'Lote {number + 1}: {len(deleted)}/{len(batch)} imágenes borradas')
+    return summary
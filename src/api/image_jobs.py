@@ -0,0 +1,105 @@
+"""
+Subida de imágenes en segundo plano (IMAGE_UPLOAD_MODE=async).
+
+La petición guarda el producto o el usuario con el estado de sus imágenes en
+"processing" y encola una tarea (api.jobs) con las imágenes en base64; el
+worker las sube, las asigna y deja el estado en "ready", o en "failed" si la
+tarea se descarta tras agotar los reintentos. Mientras tanto el producto
+conserva las URLs que ya tenía y el usuario su avatar anterior.
+
+Los ficheros subidos en multipart (ImageFile) se guardan en el payload como
+data URI: la base de datos es lo único que comparten la web y los workers.
+
+Cuando una petición escribe las imágenes directamente (modo sync, o solo
+URLs ya subidas) se cancelan las tareas de la misma key que haya en cola o
+en marcha, para que una subida anterior no las pise al terminar.
+"""
+from api.database.db import db
+from api.jobs import job_queue, job_handler
+from api.models.Product import Product
+from api.models.User import User
+from api.storage import image_storage, is_new_image, is_image_url, ImageFile, PRODUCT_IMAGES_FOLDER, USER_IMAGES_FOLDER
+
+PRODUCT_IMAGES_JOB = 'product_images'
+USER_IMAGE_JOB = 'user_image'
+
+READY = 'ready'
+PROCESSING = 'processing'
+FAILED = 'failed'
+
+
+def kept_images(images, uploaded):
+    """ Las URLs existentes y las imágenes subidas, en el orden original; lo demás se descarta """
+    return [url for url, image in zip(uploaded, images) if is_new_image(image) or is_image_url(image)]
+
+
+def product_job_key(product_id):
+    return f'product:{product_id}'
+
+
+def user_job_key(user_id):
+    return f'user:{user_id}'
+
+
+def set_product_images(product, images):
+    """ Imágenes escritas por la propia petición: las tareas anteriores ya no se aplican """
+    product.images = images
+    product.images_status = READY
+    job_queue.cancel(product_job_key(product.id))
+
+
+def set_user_image(user, url):
+    user.img = url
+    user.img_status = READY
+    job_queue.cancel(user_job_key(user.id))
+
+
+def _payload_image(image):
+    return image.to_data_uri() if isinstance(image, ImageFile) else image
+
+
+def enqueue_product_images(product, images, user_id):
+    """ product ya tiene id (flush) """
+    product.images = [image for image in images if is_image_url(image)]
+    product.images_status = PROCESSING
+    payload = {'product_id': product.id, 'images': [_payload_image(image) for image in images]}
+    return job_queue.enqueue(PRODUCT_IMAGES_JOB, payload,
+                             key=product_job_key(product.id), user_id=user_id)
+
+
+def enqueue_user_image(user, image):
+    user.img_status = PROCESSING
+    return job_queue.enqueue(USER_IMAGE_JOB, {'user_id': user.id, 'image': _payload_image(image)},
+                             key=user_job_key(user.id), user_id=user.id)
+
+
+def _product_images_failed(payload):
+    product = db.session.get(Product, payload['product_id'])
+    if product is not None:
+        product.images_status = FAILED
+
+
+def _user_image_failed(payload):
+    user = db.session.get(User, payload['user_id'])
+    if user is not None:
+        user.img_status = FAILED
+
+
+@job_handler(PRODUCT_IMAGES_JOB, on_dead=_product_images_failed)
+def process_product_images(payload):
+    product = db.session.get(Product, payload['product_id'])
+    if product is None:
+        return
+    # Si falla alguna imagen no queda ninguna subida y la tarea se reintenta
+    uploaded = image_storage.upload_many(payload['images'], PRODUCT_IMAGES_FOLDER)
+    product.images = kept_images(payload['images'], uploaded)
+    product.images_status = READY
+
+
+@job_handler(USER_IMAGE_JOB, on_dead=_user_image_failed)
+def process_user_image(payload):
+    user = db.session.get(User, payload['user_id'])
+    if user is None:
+        return
+    user.img = image_storage.upload(payload['image'], USER_IMAGES_FOLDER)['url']
+    user.img_status = READY
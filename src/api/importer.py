@@ -0,0 +1,281 @@
+"""
+Importación masiva de productos (flask import-products <fichero>).
+
+Lee CSV o JSONL fila a fila (sin cargar el fichero entero), valida cada fila y
+escribe por lotes: un INSERT/UPDATE masivo de productos y otro de detalles
+técnicos por lote, en una transacción por lote. Las filas con "id" actualizan
+ese producto (si es del vendedor; si no, la fila se da por inválida) y las
+demás se insertan.
+
+Después de cada lote confirmado se guarda un checkpoint (<fichero>.checkpoint)
+con el número de filas procesadas; si un lote falla, se deshace solo ese lote
+y al volver a lanzar el comando se continúa desde ahí.
+"""
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from itertools import islice
+from urllib.parse import urlparse
+from sqlalchemy import insert, update, select
+from api.database.db import db
+from api.models.Product import Product
+from api.models.ProductTechnicalDetails import ProductTechnicalDetails
+from api.changes import mark_products_changed
+
+DETAIL_FIELDS = ('manufacturer', 'collection', 'anime_series', 'character')
+TRUE_VALUES = ('1', 'true', 'si', 'sí', 'yes')
+
+
+class ImportRowError(Exception):
+
+    def __init__(self, row_number, message):
+        super().__init__(f'Fila {row_number}: {message}')
+        self.row_number = row_number
+
+
+def read_rows(path, file_format=None):
+    """ Genera diccionarios con las filas del fichero, en orden """
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+        elif file_format in ('jsonl', 'ndjson'):
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f'Formato no soportado: {file_format} (usa csv o jsonl)')
+
+
+def _text(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _float(row_number, row, field, required=False):
+    value = _text(row.get(field))
+    if value is None:
+        if required:
+            raise ImportRowError(row_number, f'el campo {field} es requerido')
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ImportRowError(row_number, f'{field} debe ser un número')
+    if number < 0:
+        raise ImportRowError(row_number, f'{field} no puede ser negativo')
+    return number
+
+
+def _bool(value, default):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _images(row_number, value, max_images):
+    # En CSV las URLs van separadas por "|"; en JSONL puede ser una lista
+    if value is None or value == '':
+        images = []
+    elif isinstance(value, list):
+        images = [str(image).strip() for image in value if str(image).strip()]
+    else:
+        images = [image.strip() for image in str(value).split('|') if image.strip()]
+
+    if not images:
+        raise ImportRowError(row_number, 'debe tener al menos una imagen')
+    if len(images) > max_images:
+        raise ImportRowError(row_number, f'máximo {max_images} imágenes permitidas')
+    # Solo URLs ya subidas: un data URI o una ruta se guardarían tal cual
+    for image in images:
+        url = urlparse(image)
+        if url.scheme not in ('http', 'https') or not url.netloc:
+            raise ImportRowError(row_number, f'las imágenes deben ser URLs http(s): {image[:80]}')
+    return images
+
+
+def validate_row(row_number, row, seller_id, max_images):
+    """ Devuelve (id o None, valores del producto, valores de los detalles técnicos) """
+    product_id = _text(row.get('id'))
+    if product_id is not None:
+        try:
+            product_id = int(product_id)
+        except ValueError:
+            raise ImportRowError(row_number, 'id debe ser un número entero')
+
+    name = _text(row.get('name'))
+    description = _text(row.get('description'))
+    if not name:
+        raise ImportRowError(row_number, 'el campo name es requerido')
+    if not description:
+        raise ImportRowError(row_number, 'el campo description es requerido')
+
+    on_sale = _bool(row.get('on_sale'), False)
+    now = datetime.utcnow()
+    product = {
+        'name': name.upper(),
+        'description': description,
+        'price': _float(row_number, row, 'price', required=True),
+        'images': _images(row_number, row.get('images'), max_images),
+        'original_price': _float(row_number, row, 'original_price'),
+        'on_sale': on_sale,
+        'status': _bool(row.get('status'), True),
+        'user_id': seller_id,
+        'updated_at': now,
+        'sale_updated_at': now if on_sale else None,
+    }
+
+    details = {
+        field: _text(row.get(field)).upper() if _text(row.get(field)) else None
+        for field in DETAIL_FIELDS
+    }
+    return product_id, product, details
+
+
+class Checkpoint:
+    """ Número de filas ya confirmadas, guardado junto al fichero importado """
+
+    def __init__(self, path):
+        self.path = f'{path}.checkpoint'
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path) as checkpoint:
+            return json.load(checkpoint)['rows_done']
+
+    def save(self, rows_done):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as checkpoint:
+            json.dump({'rows_done': rows_done, 'saved_at': datetime.utcnow().isoformat()}, checkpoint)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _own_products(session, batch, seller_id):
+    """
+    Separa del lote validado [(fila, id o None, producto, detalles)] las filas
+    con un id que no existe o es de otro vendedor. Devuelve (lote sin ellas,
+    sus ImportRowError).
+    """
+    update_ids = {product_id for _, product_id, _, _ in batch if product_id is not None}
+    existing = set(session.scalars(
+        select(Product.id).where(Product.id.in_(update_ids), Product.user_id == seller_id)
+    )) if update_ids else set()
+
+    owned, errors = [], []
+    for row_number, product_id, product, details in batch:
+        if product_id is not None and product_id not in existing:
+            errors.append(ImportRowError(row_number, f'el producto {product_id} no existe o es de otro vendedor'))
+        else:
+            owned.append((product_id, product, details))
+    return owned, errors
+
+
+def _write_batch(session, batch):
+    """ Escribe un lote validado de productos propios: [(id o None, producto, detalles)] """
+    existing = {product_id for product_id, _, _ in batch if product_id is not None}
+
+    new_rows = [(product, details) for product_id, product, details in batch if product_id is None]
+    updated_rows = [(product_id, product, details) for product_id, product, details in batch if product_id is not None]
+
+    new_ids = []
+    if new_rows:
+        now = datetime.utcnow()
+        new_ids = list(session.scalars(
+            insert(Product).returning(Product.id, sort_by_parameter_order=True),
+            [{**product, 'created_at': now} for product, _ in new_rows]
+        ))
+        session.execute(
+            insert(ProductTechnicalDetails),
+            [{**details, 'product_id': product_id} for product_id, (_, details) in zip(new_ids, new_rows)]
+        )
+
+    if updated_rows:
+        session.execute(update(Product), [{**product, 'id': product_id} for product_id, product, _ in updated_rows])
+
+        detail_ids = dict(session.execute(
+            select(ProductTechnicalDetails.product_id, ProductTechnicalDetails.id)
+            .where(ProductTechnicalDetails.product_id.in_(existing))
+        ).all())
+        detail_updates = [
+            {**details, 'id': detail_ids[product_id]}
+            for product_id, _, details in updated_rows if product_id in detail_ids
+        ]
+        detail_inserts = [
+            {**details, 'product_id': product_id}
+            for product_id, _, details in updated_rows if product_id not in detail_ids
+        ]
+        if detail_updates:
+            session.execute(update(ProductTechnicalDetails), detail_updates)
+        if detail_inserts:
+            session.execute(insert(ProductTechnicalDetails), detail_inserts)
+
+    # Las escrituras masivas no pasan por el flush del ORM: índice, caché y ETags
+    mark_products_changed(session, new_ids + list(existing))
+    return len(new_ids), len(updated_rows)
+
+
+def import_products(path, seller_id, batch_size=500, file_format=None, max_images=5, resume=True, log=print):
+    """
+    Importa el fichero y devuelve un resumen. Lanza la excepción del lote que
+    falle después de guardar el checkpoint del último lote correcto.
+    """
+    checkpoint = Checkpoint(path)
+    skip = checkpoint.load() if resume else 0
+    if skip:
+        log(f'Reanudando desde la fila {skip + 1}')
+
+    session = db.session
+    rows = (
+        (row_number, row)
+        for row_number, row in enumerate(read_rows(path, file_format), start=1)
+        if row_number > skip
+    )
+    summary = {'inserted': 0, 'updated': 0, 'invalid': [], 'rows': 0, 'seconds': 0.0}
+    start = time.perf_counter()
+
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+
+        batch, invalid = [], []
+        for row_number, row in chunk:
+            try:
+                batch.append((row_number, *validate_row(row_number, row, seller_id, max_images)))
+            except ImportRowError as error:
+                invalid.append(error)
+
+        try:
+            batch, errors = _own_products(session, batch, seller_id)
+            invalid += errors
+            inserted, updated = _write_batch(session, batch) if batch else (0, 0)
+            session.commit()
+        except Exception:
+            session.rollback()
+            log(f'Lote de las filas {chunk[0][0]}-{chunk[-1][0]} fallido; se reanudará desde la fila {chunk[0][0]}')
+            raise
+
+        summary['invalid'].extend(str(error) for error in sorted(invalid, key=lambda error: error.row_number))
+        rows_done = chunk[-1][0]
+        checkpoint.save(rows_done)
+        summary['inserted'] += inserted
+        summary['updated'] += updated
+        summary['rows'] += len(chunk)
+
+        elapsed = time.perf_counter() - start
+        log(f'{rows_done} filas ({summary["rows"] / elapsed:,.0f} filas/s)')
+
+    summary['seconds'] = time.perf_counter() - start
+    checkpoint.clear()
+    return summary
@@ -0,0 +1,267 @@
+"""
+Cola de tareas en segundo plano sobre la propia base de datos (tabla job),
+sin Redis ni broker: los workers se arrancan con `flask worker`.
+
+- enqueue() añade la tarea a la sesión: se guarda con el commit del llamador,
+  en la misma transacción que los datos que la originan.
+- Cada worker reclama la siguiente tarea pendiente con un UPDATE condicional
+  (en PostgreSQL además SELECT ... FOR UPDATE SKIP LOCKED), así varios
+  procesos pueden trabajar a la vez sin repartirse la misma tarea.
+- Si el handler falla, la tarea vuelve a pending con espera exponencial
+  (JOB_RETRY_BASE_SECONDS * 2^(intentos-1), hasta JOB_RETRY_MAX_SECONDS);
+  tras max_attempts intentos pasa a dead (dead letter) y se llama a su
+  on_dead. `flask requeue-dead-jobs` las vuelve a poner en cola.
+- Una tarea running cuyo worker desaparece (más de JOB_LOCK_TIMEOUT_SECONDS
+  sin terminar) cuenta como intento fallido.
+- Las tareas con la misma key (p. ej. "product:12") se sustituyen: al
+  encolar se cancelan las pendientes y una tarea con otra más nueva detrás
+  no aplica sus cambios. cancel(key) cancela también las que están en
+  marcha, para cuando la petición escribe el dato directamente.
+- Todo cambio de estado de una tarea running es un UPDATE condicional sobre
+  status y locked_at: si entre tanto la han cancelado, reencolado por
+  bloqueada u otro worker la ha vuelto a reclamar, se deshace lo hecho.
+
+El handler trabaja con db.session y la cola hace el commit junto con el
+estado de la tarea. El payload de las tareas terminadas se borra.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, and_
+from api.database.db import db
+from api.models.Job import Job
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+DEAD = 'dead'
+CANCELLED = 'cancelled'
+JOB_STATUSES = (PENDING, RUNNING, DONE, DEAD, CANCELLED)
+
+MAX_ERROR_LENGTH = 4000
+
+_handlers = {}
+
+
+def job_handler(kind, on_dead=None):
+    """
+    Registra el handler de un tipo de tarea: fn(payload). on_dead(payload)
+    se ejecuta (en la misma transacción) cuando la tarea se da por perdida.
+    """
+    def decorator(fn):
+        _handlers[kind] = (fn, on_dead)
+        return fn
+    return decorator
+
+
+class JobQueue:
+
+    def __init__(self):
+        self.max_attempts = 5
+        self.retry_base = 10
+        self.retry_max = 3600
+        self.lock_timeout = 600
+
+    def init_app(self, app):
+        self.max_attempts = app.config.setdefault(
+            'JOB_MAX_ATTEMPTS', int(os.getenv('JOB_MAX_ATTEMPTS', 5)))
+        self.retry_base = app.config.setdefault(
+            'JOB_RETRY_BASE_SECONDS', float(os.getenv('JOB_RETRY_BASE_SECONDS', 10)))
+        self.retry_max = app.config.setdefault(
+            'JOB_RETRY_MAX_SECONDS', float(os.getenv('JOB_RETRY_MAX_SECONDS', 3600)))
+        self.lock_timeout = app.config.setdefault(
+            'JOB_LOCK_TIMEOUT_SECONDS', int(os.getenv('JOB_LOCK_TIMEOUT_SECONDS', 600)))
+
+    def enqueue(self, kind, payload, key=None, user_id=None, max_attempts=None):
+        """ Añade la tarea a db.session; la guarda el commit del llamador """
+        if kind not in _handlers:
+            raise ValueError(f'Tipo de tarea desconocido: {kind}')
+        if key is not None:
+            Job.query.filter(Job.key == key, Job.status == PENDING).update(
+                {'status': CANCELLED, 'payload': None, 'finished_at': datetime.utcnow()},
+                synchronize_session=False)
+        job = Job(kind=kind, key=key, payload=payload, user_id=user_id, status=PENDING,
+                  attempts=0, max_attempts=max_attempts or self.max_attempts, run_at=datetime.utcnow())
+        db.session.add(job)
+        return job
+
+    def cancel(self, key):
+        """
+        Cancela las tareas pendientes o en marcha con esa key, en db.session
+        (la guarda el commit del llamador). Una en marcha no aplica sus cambios.
+        """
+        return Job.query.filter(Job.key == key, Job.status.in_((PENDING, RUNNING))).update(
+            {'status': CANCELLED, 'payload': None, 'locked_by': None, 'finished_at': datetime.utcnow()},
+            synchronize_session=False)
+
+    def retry_delay(self, attempts):
+        delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+        # Un poco de ruido para que los reintentos de varias tareas no coincidan
+        return delay * random.uniform(0.9, 1.1)
+
+    def claim(self, worker_id):
+        """ Marca como running la siguiente tarea pendiente y la devuelve (o None) """
+        now = datetime.utcnow()
+        candidate = db.session.query(Job.id).filter(
+            Job.status == PENDING, Job.run_at <= now).order_by(Job.run_at, Job.id).limit(1)
+        if db.session.get_bind().dialect.name == 'postgresql':
+            candidate = candidate.with_for_update(skip_locked=True)
+        job_id = candidate.scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+
+        claimed = Job.query.filter(Job.id == job_id, Job.status == PENDING).update(
+            {'status': RUNNING, 'locked_by': worker_id, 'locked_at': now, 'attempts': Job.attempts + 1},
+            synchronize_session=False)
+        db.session.commit()
+        # Otro worker se la ha llevado entre la SELECT y el UPDATE
+        if not claimed:
+            return None
+        return db.session.get(Job, job_id)
+
+    def _superseded(self, job):
+        """ Hay otra tarea más nueva con la misma key o han cancelado esta """
+        if job.key is None:
+            return False
+        return db.session.query(Job.id).filter(Job.key == job.key, or_(
+            and_(Job.id > job.id, Job.status != CANCELLED),
+            and_(Job.id == job.id, Job.status == CANCELLED),
+        )).first() is not None
+
+    def _transition(self, job, locked_at, values):
+        """
+        Cambia el estado de una tarea reclamada solo si sigue siendo de esta
+        ejecución (running con el locked_at que tenía). Devuelve si se ha cambiado.
+        """
+        return Job.query.filter(Job.id == job.id, Job.status == RUNNING, Job.locked_at == locked_at).update(
+            values, synchronize_session=False) == 1
+
+    def _finish(self, job, locked_at, status):
+        return self._transition(job, locked_at, {'status': status, 'payload': None, 'locked_by': None,
+                                                 'finished_at': datetime.utcnow()})
+
+    def run(self, job):
+        """ Ejecuta una tarea ya reclamada y guarda el resultado """
+        handler, _ = _handlers.get(job.kind, (None, None))
+        # Tras un rollback job se relee de la base de datos: el locked_at de esta ejecución se guarda antes
+        locked_at = job.locked_at
+        try:
+            if handler is None:
+                raise LookupError(f'Tipo de tarea desconocido: {job.kind}')
+            if not self._superseded(job):
+                handler(job.payload or {})
+            # La comprobación se repite: otra tarea más nueva puede haber terminado mientras tanto
+            if self._superseded(job):
+                db.session.rollback()
+                status = CANCELLED
+            else:
+                status = DONE
+            if not self._finish(job, locked_at, status):
+                db.session.rollback()
+                logger.info('Tarea %s (%s) cancelada o reasignada mientras se ejecutaba', job.id, job.kind)
+                return
+            db.session.commit()
+            logger.info('Tarea %s (%s) %s', job.id, job.kind, status)
+        except Exception:
+            error = traceback.format_exc()
+            db.session.rollback()
+            self._fail(job, locked_at, error)
+
+    def _fail(self, job, locked_at, error):
+        """ Reintenta o descarta la tarea; False si ya no era de esta ejecución """
+        values = {'locked_by': None, 'last_error': error[-MAX_ERROR_LENGTH:]}
+        dead = job.attempts >= job.max_attempts
+        if dead:
+            _, on_dead = _handlers.get(job.kind, (None, None))
+            if on_dead is not None:
+                try:
+                    on_dead(job.payload or {})
+                except Exception:
+                    db.session.rollback()
+                    logger.exception('Error en on_dead de la tarea %s', job.id)
+            values.update(status=DEAD, finished_at=datetime.utcnow())
+        else:
+            delay = self.retry_delay(job.attempts)
+            values.update(status=PENDING, run_at=datetime.utcnow() + timedelta(seconds=delay))
+
+        # Otro worker (p. ej. en requeue_stale) puede haberla reintentado o descartado ya
+        if not self._transition(job, locked_at, values):
+            db.session.rollback()
+            return False
+        db.session.commit()
+
+        if dead:
+            logger.error('Tarea %s (%s) descartada tras %s intentos', job.id, job.kind, job.attempts)
+        else:
+            logger.warning('Tarea %s (%s) fallida (intento %s/%s), se reintenta en %.0f s',
+                           job.id, job.kind, job.attempts, job.max_attempts, delay)
+        return True
+
+    def requeue_stale(self):
+        """ Reintenta (o descarta) las tareas running de workers que ya no responden """
+        limit = datetime.utcnow() - timedelta(seconds=self.lock_timeout)
+        stale = [
+            (job, job.locked_at, job.locked_by)
+            for job in Job.query.filter(Job.status == RUNNING, Job.locked_at < limit).all()
+        ]
+        return sum(
+            self._fail(job, locked_at, f'El worker {locked_by} no terminó la tarea en {self.lock_timeout} s')
+            for job, locked_at, locked_by in stale
+        )
+
+    def requeue_dead(self, kind=None):
+        query = Job.query.filter(Job.status == DEAD)
+        if kind is not None:
+            query = query.filter(Job.kind == kind)
+        count = query.update({'status': PENDING, 'attempts': 0, 'finished_at': None, 'run_at': datetime.utcnow()},
+                             synchronize_session=False)
+        db.session.commit()
+        return count
+
+    def work(self, worker_id=None, poll_interval=1.0, burst=False, stop=None):
+        """
+        Bucle del worker: procesa tareas hasta que se activa `stop`
+        (threading.Event) o, con burst, hasta que no queda ninguna lista
+        (los reintentos con espera se quedan para la próxima vez).
+        """
+        worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        stop = stop or threading.Event()
+        processed = 0
+        next_stale_check = datetime.min
+        logger.info('Worker %s esperando tareas', worker_id)
+        while not stop.is_set():
+            if datetime.utcnow() >= next_stale_check:
+                self.requeue_stale()
+                next_stale_check = datetime.utcnow() + timedelta(seconds=min(self.lock_timeout, 60))
+
+            job = self.claim(worker_id)
+            if job is None:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+                continue
+
+            self.run(job)
+            processed += 1
+            # Sesión limpia para cada tarea
+            db.session.remove()
+        return processed
+
+    def stats(self):
+        counts = dict(db.session.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+        oldest = db.session.query(func.min(Job.run_at)).filter(
+            Job.status == PENDING, Job.run_at <= datetime.utcnow()).scalar()
+        return {
+            'jobs': {status: counts.get(status, 0) for status in JOB_STATUSES},
+            'oldest_pending_seconds': round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else None,
+        }
+
+
+job_queue = JobQueue()
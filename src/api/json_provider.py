@@ -0,0 +1,87 @@
+"""
+Proveedor JSON de la app: orjson si está instalado y la librería estándar si no.
+
+orjson serializa datetime/date/UUID/dataclasses de forma nativa (ISO 8601), así
+que los serialize() de los modelos pueden devolver las fechas tal cual. Con la
+librería estándar se mantiene el mismo formato ISO en lugar del formato HTTP
+que usa Flask por defecto, para que la respuesta no dependa del backend.
+
+JSON_BACKEND=stdlib fuerza la librería estándar (p. ej. para comparar).
+"""
+import os
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+from api.timing import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    # Decimal, UUID, dataclasses, __html__...
+    return DefaultJSONProvider.default(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.backend = os.getenv('JSON_BACKEND', 'orjson' if orjson is not None else 'stdlib')
+        if self.backend == 'orjson' and orjson is None:
+            raise RuntimeError("JSON_BACKEND=orjson pero orjson no está instalado")
+        if self.backend not in ('orjson', 'stdlib'):
+            raise RuntimeError(f"JSON_BACKEND no válido: {self.backend}")
+
+    def _orjson_options(self, indent=False, sort_keys=None):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _orjson_dumps(self, obj, indent=False, sort_keys=None):
+        return orjson.dumps(obj, default=_default, option=self._orjson_options(indent, sort_keys))
+
+    def dumps(self, obj, **kwargs):
+        indent = kwargs.pop('indent', None)
+        sort_keys = kwargs.pop('sort_keys', None)
+        if self.backend == 'orjson' and not kwargs and indent in (None, 2):
+            try:
+                return self._orjson_dumps(obj, indent == 2, sort_keys).decode()
+            except TypeError:
+                # p. ej. enteros de más de 64 bits: la librería estándar sí los admite
+                pass
+
+        if indent is not None:
+            kwargs['indent'] = indent
+        if sort_keys is not None:
+            kwargs['sort_keys'] = sort_keys
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.backend == 'orjson' and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        with timed('json'):
+            return self._response(*args, **kwargs)
+
+    def _response(self, *args, **kwargs):
+        if self.backend != 'orjson':
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            # Directamente a bytes, sin pasar por str
+            body = self._orjson_dumps(obj, indent) + b'\n'
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
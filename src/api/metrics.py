@@ -0,0 +1,192 @@
+"""
+Métricas en formato Prometheus en GET /metrics.
+
+- Peticiones por endpoint (api/product.get_products...), método y código de
+  estado, histograma de latencia y excepciones no controladas.
+- Rechazos del rate limiter (respuestas 429) por endpoint.
+- Caché de respuestas: aciertos, fallos y desalojos. La tasa de aciertos se
+  calcula en Prometheus, p. ej.
+  rate(response_cache_hits_total[5m]) / (rate(response_cache_hits_total[5m]) + rate(response_cache_misses_total[5m]))
+- Pool de conexiones (api/database/pool.py): ocupación, checkouts, espera,
+  desbordes y timeouts por pool.
+
+Con varios workers de gunicorn cada proceso escribe sus valores en
+PROMETHEUS_MULTIPROC_DIR (lo prepara gunicorn.conf.py) y /metrics los suma
+todos, atienda el worker que atienda. Los contadores de la caché y del pool
+se llevan a Prometheus como mucho cada METRICS_SYNC_SECONDS, al terminar
+una petición, y al salir el proceso.
+
+Sin prometheus_client instalado (o con METRICS_ENABLED=0) no hay /metrics.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from flask import Response, g, request, got_request_exception
+from api.cache import response_cache
+from api.database.pool import pool_metrics
+from api.limiter import limiter
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover - prometheus_client es opcional
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+# Clave de pool_metrics.stats() -> (métrica, descripción)
+POOL_COUNTERS = {
+    'checkouts': ('db_pool_checkouts', 'Conexiones entregadas por el pool'),
+    'overflow_connections': ('db_pool_overflow_connections', 'Checkouts que abrieron una conexión de desborde'),
+    'timeouts': ('db_pool_timeouts', 'Checkouts que agotaron DB_POOL_TIMEOUT'),
+    'connections_opened': ('db_pool_connections_opened', 'Conexiones nuevas con la base de datos'),
+    'invalidations': ('db_pool_invalidations', 'Conexiones invalidadas'),
+}
+POOL_GAUGES = {
+    'size': ('db_pool_size', 'Tamaño del pool'),
+    'checked_out': ('db_pool_checked_out', 'Conexiones en uso'),
+    'checked_in': ('db_pool_checked_in', 'Conexiones libres en el pool'),
+    'overflow': ('db_pool_overflow', 'Conexiones de desborde abiertas'),
+}
+CACHE_COUNTERS = {
+    'hits': ('response_cache_hits', 'Aciertos de la caché de respuestas'),
+    'misses': ('response_cache_misses', 'Fallos de la caché de respuestas'),
+    'evictions': ('response_cache_evictions', 'Entradas desalojadas de la caché de respuestas'),
+}
+
+
+def multiprocess_mode():
+    return 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+
+class Metrics:
+
+    def __init__(self):
+        self.enabled = False
+        self.sync_seconds = 1.0
+        self._lock = threading.Lock()
+        self._last_sync = 0.0
+        self._seen = {}
+
+    def init_app(self, app):
+        """ Después de response_cache.init_app() y pool_metrics.init_app() """
+        self.enabled = app.config.setdefault('METRICS_ENABLED', os.getenv('METRICS_ENABLED', '1') == '1')
+        if not self.enabled:
+            return
+        if prometheus_client is None:
+            logger.warning('prometheus_client no está instalado: /metrics desactivado')
+            self.enabled = False
+            return
+        self.sync_seconds = app.config.setdefault(
+            'METRICS_SYNC_SECONDS', float(os.getenv('METRICS_SYNC_SECONDS', 1)))
+
+        self._create_metrics()
+        pool_metrics.on_checkout(self._observe_checkout)
+        # Lo pendiente desde la última sincronización no se pierde al parar el worker
+        atexit.register(self.sync)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        got_request_exception.connect(self._count_exception, app, weak=False)
+        app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
+
+    def _create_metrics(self):
+        if hasattr(self, 'requests'):
+            return
+        Counter, Gauge, Histogram = prometheus_client.Counter, prometheus_client.Gauge, prometheus_client.Histogram
+
+        self.requests = Counter(
+            'http_requests', 'Peticiones HTTP atendidas', ['endpoint', 'method', 'status'])
+        self.latency = Histogram(
+            'http_request_duration_seconds', 'Duración de las peticiones HTTP', ['endpoint', 'method'],
+            buckets=LATENCY_BUCKETS)
+        self.exceptions = Counter(
+            'http_request_exceptions', 'Excepciones no controladas en las vistas', ['endpoint', 'exception'])
+        self.rate_limited = Counter(
+            'rate_limit_rejections', 'Peticiones rechazadas por el rate limiter (429)', ['endpoint'])
+
+        self.pool_wait = Histogram(
+            'db_pool_checkout_wait_seconds', 'Espera hasta obtener una conexión del pool', ['pool'],
+            buckets=POOL_WAIT_BUCKETS)
+        self.pool_counters = {key: Counter(name, doc, ['pool']) for key, (name, doc) in POOL_COUNTERS.items()}
+        # Ocupación de cada worker: entre procesos se suma
+        self.pool_gauges = {
+            key: Gauge(name, doc, ['pool'], multiprocess_mode='livesum') for key, (name, doc) in POOL_GAUGES.items()
+        }
+
+        self.cache_counters = {key: Counter(name, doc) for key, (name, doc) in CACHE_COUNTERS.items()}
+        # La caché sqlite es compartida: sumar las entradas de cada worker las contaría varias veces
+        shared = response_cache.backend.name == 'sqlite'
+        self.cache_entries = Gauge(
+            'response_cache_entries', 'Entradas en la caché de respuestas',
+            multiprocess_mode='livemax' if shared else 'livesum')
+
+    def _start(self):
+        g._metrics_start = time.perf_counter()
+
+    def _finish(self, response):
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        self.requests.labels(endpoint, request.method, str(response.status_code)).inc()
+        # Los límites globales del limiter cortan antes de _start(): se cuenta pero sin latencia
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            self.latency.labels(endpoint, request.method).observe(time.perf_counter() - start)
+        if response.status_code == 429:
+            self.rate_limited.labels(endpoint).inc()
+        self.maybe_sync()
+        return response
+
+    def _count_exception(self, sender, exception, **extra):
+        self.exceptions.labels(request.endpoint or UNMATCHED_ENDPOINT, type(exception).__name__).inc()
+
+    def _observe_checkout(self, pool, seconds):
+        self.pool_wait.labels(pool).observe(seconds)
+
+    def maybe_sync(self):
+        if time.monotonic() - self._last_sync >= self.sync_seconds:
+            self.sync()
+
+    def sync(self):
+        """ Lleva a Prometheus los contadores de la caché y del pool de este proceso """
+        with self._lock:
+            self._last_sync = time.monotonic()
+
+            cache = response_cache.stats()
+            for key, counter in self.cache_counters.items():
+                self._inc_to(counter, (), cache[key])
+            self.cache_entries.set(cache['entries'])
+
+            for pool, stats in pool_metrics.stats()['pools'].items():
+                for key, counter in self.pool_counters.items():
+                    self._inc_to(counter, (pool,), stats[key])
+                for key, gauge in self.pool_gauges.items():
+                    if key in stats:
+                        gauge.labels(pool).set(stats[key])
+
+    def _inc_to(self, counter, labels, value):
+        """ Incrementa el contador hasta `value` (los contadores de origen pueden reiniciarse con reset()) """
+        key = (id(counter), labels)
+        last = self._seen.get(key, 0)
+        delta = value - last if value >= last else value
+        if delta:
+            (counter.labels(*labels) if labels else counter).inc(delta)
+        self._seen[key] = value
+
+
+metrics = Metrics()
+
+
+@limiter.exempt
+def metrics_view():
+    metrics.sync()
+    if multiprocess_mode():
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return Response(prometheus_client.generate_latest(registry), content_type=prometheus_client.CONTENT_TYPE_LATEST)
@@ -1,6 +1,6 @@
 from api.database.db import db
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, String, Boolean
+from sqlalchemy import ForeignKey, String, Boolean, Index
 
 
 class Address(db.Model):
@@ -20,6 +20,10 @@ class Address(db.Model):
     is_default: Mapped[bool] = mapped_column(
         Boolean, default=False)
 
+    __table_args__ = (
+        Index('ix_address_user_id_is_default', 'user_id', 'is_default'),
+    )
+
     user = relationship("User", back_populates="addresses")
 
     def serialize(self):
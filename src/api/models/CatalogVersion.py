@@ -0,0 +1,20 @@
+from api.database.db import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, DateTime
+from datetime import datetime
+
+
+class CatalogVersion(db.Model):
+    __tablename__ = "catalog_version"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.utcnow)
+
+    def serialize(self):
+        return {
+            "name": self.name,
+            "version": self.version,
+            "updated_at": self.updated_at,
+        }
@@ -0,0 +1,31 @@
+from api.database.db import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, DateTime, Index
+from datetime import datetime
+
+
+class ImageAsset(db.Model):
+    """ Imagen ya subida, por el SHA-256 de su contenido: las repetidas no se vuelven a subir """
+    __tablename__ = "image_asset"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    url: Mapped[str] = mapped_column(String(500), nullable=False)
+    public_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    width: Mapped[int] = mapped_column(Integer, nullable=True)
+    height: Mapped[int] = mapped_column(Integer, nullable=True)
+    size: Mapped[int] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_image_asset_public_id', 'public_id'),
+    )
+
+    def serialize(self):
+        return {
+            "sha256": self.sha256,
+            "url": self.url,
+            "width": self.width,
+            "height": self.height,
+            "size": self.size,
+            "created_at": self.created_at,
+        }
@@ -0,0 +1,45 @@
+from api.database.db import db
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Integer, Text, JSON, DateTime, ForeignKey, Index
+from datetime import datetime
+
+
+class Job(db.Model):
+    """ Tarea en segundo plano de la cola de api.jobs """
+    __tablename__ = "job"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    # Tareas sobre el mismo objeto (p. ej. "product:12"): la más nueva sustituye a las anteriores
+    key: Mapped[str] = mapped_column(String(100), nullable=True)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=5)
+    run_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_by: Mapped[str] = mapped_column(String(100), nullable=True)
+    locked_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("user.id", ondelete="SET NULL"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    # Los mismos índices crea la migración 7d2b9e4a6c13
+    __table_args__ = (
+        Index('ix_job_status_run_at', 'status', 'run_at'),
+        Index('ix_job_key', 'key'),
+    )
+
+    def serialize(self):
+        # El payload puede llevar las imágenes en base64: no se devuelve
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "run_at": self.run_at,
+            "last_error": self.last_error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
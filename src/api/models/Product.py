@@ -1,9 +1,22 @@
 from api.database.db import db
-from sqlalchemy import String, Float, ForeignKey, Boolean, Text, JSON, DateTime
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Float, ForeignKey, Boolean, Text, JSON, DateTime, Index, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship, selectinload
 from datetime import datetime
 
 
+def active_only(*conditions):
+    """
+    Condición de un índice parcial sobre productos activos. Tiene que coincidir
+    con lo que genera `Product.status == True` en cada motor (SQLite solo usa
+    el índice si la condición aparece tal cual en la consulta).
+    """
+    conditions = ('status', *conditions)
+    return {
+        'postgresql_where': text(' AND '.join(conditions)),
+        'sqlite_where': text(' AND '.join(f'{column} = 1' for column in conditions)),
+    }
+
+
 class Product(db.Model):
 
     __tablename__ = "product"
@@ -22,6 +35,17 @@ class Product(db.Model):
     original_price: Mapped[float] = mapped_column(Float, nullable=True, default=None)
     on_sale: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     sale_updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None)
+    # ready | processing (subida en segundo plano, api.image_jobs) | failed
+    images_status: Mapped[str] = mapped_column(String(20), nullable=False, default="ready", server_default="ready")
+
+    # Los mismos índices crea la migración 3f8a2d6c1e54
+    __table_args__ = (
+        Index('ix_product_user_id', 'user_id'),
+        Index('ix_product_active_created_at', 'created_at', 'id', **active_only()),
+        Index('ix_product_active_sale_updated_at', 'sale_updated_at', **active_only('on_sale')),
+        Index('ix_product_active_price', 'price', 'id', **active_only()),
+        Index('ix_product_active_name', 'name', 'id', **active_only()),
+    )
 
     user = relationship("User")
     reviews = relationship(
@@ -29,12 +53,53 @@ class Product(db.Model):
     technical_details = relationship(
         "ProductTechnicalDetails", back_populates="product", uselist=False, cascade="all, delete-orphan")
 
-    def serialize(self):
+    # Vistas reducidas para ?view=<nombre>; ?fields= admite cualquier campo de SERIALIZE_FIELDS
+    SERIALIZE_VIEWS = {
+        "card": ("id", "name", "price", "original_price", "on_sale", "images", "created_at"),
+    }
+    SERIALIZE_RELATIONS = ("user", "technical_details")
+    SERIALIZE_FIELDS = (
+        "id", "name", "description", "images", "price", "original_price", "on_sale",
+        "review", "user_id", "status", "created_at", "updated_at", "sale_updated_at", "images_status",
+    ) + SERIALIZE_RELATIONS
+
+    @classmethod
+    def serialize_loader_options(cls):
+        # Carga en bloque las relaciones que usa serialize() para que un
+        # listado haga un número constante de consultas
+        from api.models.User import User
+        return (
+            selectinload(cls.user).selectinload(User.rol),
+            selectinload(cls.user).selectinload(User.addresses),
+            selectinload(cls.technical_details),
+        )
+
+    @staticmethod
+    def serialize_value(field, value):
+        # Las fechas las serializa el proveedor JSON (api.json_provider)
+        if field == "images":
+            return value if value else []
+        return value
+
+    def serialize(self, fields=None):
+        if fields is not None:
+            # Proyección: las relaciones se incluyen en su vista "card"
+            data = {}
+            for field in fields:
+                if field == "user":
+                    data[field] = self.user.serialize(self.user.SERIALIZE_VIEWS["card"]) if self.user else None
+                elif field == "technical_details":
+                    data[field] = self.technical_details.serialize() if self.technical_details else None
+                else:
+                    data[field] = self.serialize_value(field, getattr(self, field))
+            return data
+
         return {
             "id": self.id,
             "name": self.name,
             "description": self.description,
             "images": self.images if self.images else [],
+            "images_status": self.images_status,
             "price": self.price,
             "original_price": self.original_price,
             "on_sale": self.on_sale,
@@ -43,7 +108,7 @@ class Product(db.Model):
             "user": self.user.serialize() if self.user else None,
             "technical_details": self.technical_details.serialize() if self.technical_details else None,
             "status": self.status,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-            "sale_updated_at": self.sale_updated_at.isoformat() if self.sale_updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "sale_updated_at": self.sale_updated_at,
         }
@@ -1,6 +1,6 @@
 from api.database.db import db
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import ForeignKey, String, Index
 
 
 class ProductTechnicalDetails(db.Model):
@@ -14,6 +14,15 @@ class ProductTechnicalDetails(db.Model):
     anime_series: Mapped[str] = mapped_column(String(200), nullable=True)
     character: Mapped[str] = mapped_column(String(120), nullable=True)
 
+    # Facetas del catálogo (IN / GROUP BY) y listado de series. Las búsquedas
+    # con ILIKE '%...%' usan los índices trigram que crea la migración en PostgreSQL
+    __table_args__ = (
+        Index('ix_product_technical_details_anime_series', 'anime_series'),
+        Index('ix_product_technical_details_character', 'character'),
+        Index('ix_product_technical_details_manufacturer', 'manufacturer'),
+        Index('ix_product_technical_details_collection', 'collection'),
+    )
+
     product = relationship("Product", back_populates="technical_details")
 
     def serialize(self):
@@ -1,6 +1,6 @@
 from api.database.db import db
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, Float, Text, DateTime
+from sqlalchemy import ForeignKey, Float, Text, DateTime, Index
 import datetime
 
 class Review(db.Model):
@@ -17,10 +17,37 @@ class Review(db.Model):
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.datetime.now)
 
+    __table_args__ = (
+        Index('ix_review_product_id', 'product_id'),
+    )
+
     client = relationship("User")
     product = relationship("Product", back_populates="reviews")
 
-    def serialize(self):
+    SERIALIZE_VIEWS = {
+        "card": ("id", "product_id", "client_id", "client_rate", "comment", "created_at"),
+    }
+    SERIALIZE_RELATIONS = ("client",)
+    SERIALIZE_FIELDS = (
+        "id", "stripe_id", "client_id", "product_id", "client_rate", "comment", "created_at",
+    ) + SERIALIZE_RELATIONS
+
+    @staticmethod
+    def serialize_value(field, value):
+        if field == "created_at":
+            return value.strftime("%d/%m/%Y") if value else None
+        return value
+
+    def serialize(self, fields=None):
+        if fields is not None:
+            data = {}
+            for field in fields:
+                if field == "client":
+                    data[field] = self.client.serialize(self.client.SERIALIZE_VIEWS["card"]) if self.client else None
+                else:
+                    data[field] = self.serialize_value(field, getattr(self, field))
+            return data
+
         return {
             "id": self.id,
             "stripe_id": self.stripe_id,
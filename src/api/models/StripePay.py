@@ -1,6 +1,6 @@
 from api.database.db import db
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Float, DateTime, ForeignKey
+from sqlalchemy import String, Float, DateTime, ForeignKey, Index
 import datetime
 
 
@@ -20,6 +20,10 @@ class StripePay(db.Model):
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.datetime.now)
 
+    __table_args__ = (
+        Index('ix_stripe_pay_user_id_created_at', 'user_id', 'created_at'),
+    )
+
     user = relationship("User")
     shipping_address = relationship("Address")
 
@@ -1,5 +1,5 @@
 from api.database.db import db
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, selectinload
 from sqlalchemy import ForeignKey, String
 
 
@@ -14,15 +14,49 @@ class User(db.Model):
     email: Mapped[str] = mapped_column(
         String(120), unique=True, nullable=False)
     password: Mapped[str] = mapped_column(
-        String(120), unique=True, nullable=False)
+        String(120), nullable=False)
     rol_id: Mapped[int] = mapped_column(ForeignKey("rol.id"))
     img: Mapped[str] = mapped_column(String(500),  nullable=True)
+    # ready | processing (subida en segundo plano, api.image_jobs) | failed
+    img_status: Mapped[str] = mapped_column(String(20), nullable=False, default="ready", server_default="ready")
 
     addresses = relationship(
         "Address", back_populates="user", cascade="all, delete-orphan")
     rol = relationship("Rol", back_populates="users")
 
-    def serialize(self):
+    SERIALIZE_VIEWS = {
+        "card": ("id", "user_name", "first_name", "last_name", "img"),
+    }
+    SERIALIZE_RELATIONS = ("rol", "addresses")
+    # La contraseña nunca se serializa
+    SERIALIZE_FIELDS = (
+        "id", "user_name", "first_name", "last_name", "email", "rol_id", "img", "img_status",
+    ) + SERIALIZE_RELATIONS
+
+    @staticmethod
+    def serialize_value(field, value):
+        return value
+
+    @classmethod
+    def serialize_loader_options(cls):
+        # Rol y direcciones en bloque: el listado de usuarios no hace una consulta por fila
+        return (
+            selectinload(cls.rol),
+            selectinload(cls.addresses),
+        )
+
+    def serialize(self, fields=None):
+        if fields is not None:
+            data = {}
+            for field in fields:
+                if field == "rol":
+                    data[field] = self.rol.serialize() if self.rol else None
+                elif field == "addresses":
+                    data[field] = [address.serialize() for address in self.addresses]
+                else:
+                    data[field] = getattr(self, field)
+            return data
+
         return {
             "id": self.id,
             "user_name": self.user_name,
@@ -32,6 +66,7 @@ class User(db.Model):
             "rol_id": self.rol_id,
             "rol": self.rol.serialize() if self.rol else None,
             "img": self.img,
+            "img_status": self.img_status,
             "addresses": [address.serialize() for address in self.addresses] if self.addresses else []
 
         }
@@ -4,5 +4,8 @@ from api.models.User import User
 from api.models.Product import Product
 from api.models.Review import Review
 from api.models.StripePay import StripePay
+from api.models.CatalogVersion import CatalogVersion
+from api.models.Job import Job
+from api.models.ImageAsset import ImageAsset
 
-__all__ = ["db", "Rol", "User", "Product", "Review", "StripePay"]
\ No newline at end of file
+__all__ = ["db", "Rol", "User", "Product", "Review", "StripePay", "CatalogVersion", "Job", "ImageAsset"]
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Proyecciones de las respuestas: ?fields=id,name,price o ?view=card|detail.
+
+Cada modelo declara los campos que se pueden pedir (SERIALIZE_FIELDS), cuáles
+son relaciones (SERIALIZE_RELATIONS) y sus vistas con nombre (SERIALIZE_VIEWS).
+Si todos los campos pedidos son columnas propias del modelo, la consulta
+selecciona solo esas columnas y se serializan las filas de Core directamente,
+sin construir objetos del ORM ni cargar relaciones.
+"""
+from sqlalchemy.orm import selectinload
+from api.utils import APIException
+from api.timing import timed_calls
+
+DETAIL_VIEW = 'detail'
+
+
+def parse_fields(args, model):
+    """ Devuelve la tupla de campos pedidos, o None para la serialización completa """
+    fields = args.get('fields')
+    view = args.get('view')
+
+    if fields and view:
+        raise APIException('Usa fields o view, no ambos', status_code=400)
+
+    if view:
+        if view == DETAIL_VIEW:
+            return None
+        if view not in model.SERIALIZE_VIEWS:
+            valid = ', '.join([*model.SERIALIZE_VIEWS, DETAIL_VIEW])
+            raise APIException(f'Vista no válida: {view}. Opciones: {valid}', status_code=400)
+        return model.SERIALIZE_VIEWS[view]
+
+    if fields is None:
+        return None
+
+    requested = []
+    for field in fields.split(','):
+        field = field.strip()
+        if field and field not in requested:
+            requested.append(field)
+
+    if not requested:
+        raise APIException('fields no puede estar vacío', status_code=400)
+
+    unknown = [field for field in requested if field not in model.SERIALIZE_FIELDS]
+    if unknown:
+        raise APIException(f"Campos no válidos: {', '.join(unknown)}", status_code=400)
+
+    return tuple(requested)
+
+
+def is_scalar(model, fields):
+    return fields is not None and not set(fields) & set(model.SERIALIZE_RELATIONS)
+
+
+def project(query, model, fields, extra=()):
+    """
+    Adapta la consulta a los campos pedidos y devuelve (query, serializer).
+    El serializer suma su tiempo a la fase "serialize" de la petición (api.timing).
+    La clave primaria (y las columnas de extra) se seleccionan siempre aunque no
+    se serialicen, p. ej. para la paginación por cursor.
+    """
+    if fields is None:
+        loader_options = getattr(model, 'serialize_loader_options', None)
+        if loader_options is not None:
+            query = query.options(*loader_options())
+        return query, timed_calls('serialize', lambda obj: obj.serialize())
+
+    if is_scalar(model, fields):
+        columns = [getattr(model, field).label(field) for field in fields]
+        for name in ('id', *extra):
+            if name not in fields:
+                columns.append(getattr(model, name).label(name))
+        query = query.with_entities(*columns)
+
+        def serialize_row(row):
+            values = row._mapping
+            return {field: model.serialize_value(field, values[field]) for field in fields}
+        return query, timed_calls('serialize', serialize_row)
+
+    relations = [field for field in fields if field in model.SERIALIZE_RELATIONS]
+    query = query.options(*[selectinload(getattr(model, relation)) for relation in relations])
+    return query, timed_calls('serialize', lambda obj: obj.serialize(fields))
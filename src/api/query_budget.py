@@ -0,0 +1,191 @@
+"""
+Detector de N+1 y presupuesto de consultas por petición, para desarrollo y
+tests.
+
+QUERY_BUDGET (off | warn | raise; por defecto warn en modo debug y off si no):
+- Cuenta las sentencias SQL de cada petición y las cargas perezosas de
+  relaciones (p. ej. Product.serialize() -> self.user sin selectinload).
+- Agrupa las sentencias por forma (sin valores, con los IN (...) plegados):
+  una misma forma repetida QUERY_BUDGET_MAX_REPEATED veces o más es un N+1.
+- Una petición que pasa de su presupuesto (@query_budget en la vista o, si
+  no, QUERY_BUDGET_DEFAULT) o que tiene un N+1 se registra como warning con
+  el informe en JSON; con raise, además, lanza QueryBudgetExceeded (los
+  tests con app.testing la reciben tal cual).
+
+    @api.route('/products/actives', methods=['GET'])
+    @query_budget(6)
+    def get_actives_products():
+
+Solo cuenta lo que se ejecuta antes de after_request: las respuestas en
+streaming (NDJSON) consultan después y quedan fuera.
+"""
+import json
+import logging
+import os
+import re
+import traceback
+from collections import Counter
+from functools import wraps
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_MODES = ('off', 'warn', 'raise')
+
+_G_KEY = '_query_log'
+_IN_LIST = re.compile(r'IN \([^()]*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+# Para señalar en el informe la línea de la aplicación que dispara el N+1
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class QueryBudgetExceeded(Exception):
+
+    def __init__(self, report):
+        super().__init__(f"Presupuesto de consultas superado en {report['endpoint']}: "
+                         f"{json.dumps(report, ensure_ascii=False)}")
+        self.report = report
+
+
+def statement_shape(statement):
+    return _IN_LIST.sub('IN (...)', _WHITESPACE.sub(' ', statement).strip())
+
+
+def _app_location():
+    """ Últimos marcos de la pila que son código de la aplicación (no librerías ni este módulo) """
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(_SRC_DIR) and frame.filename != __file__
+    ]
+    return [f'{os.path.relpath(frame.filename, _SRC_DIR)}:{frame.lineno} {frame.name}' for frame in frames[-3:]]
+
+
+def _lazy_load(context):
+    """ 'Padre -> Hijo' si la sentencia es la carga perezosa de una relación """
+    if context is None:
+        return None
+    load_options = context.execution_options.get('_sa_orm_load_options')
+    parent = getattr(load_options, '_lazy_loaded_from', None)
+    if parent is None:
+        return None
+    target = context.invoked_statement.column_descriptions[0].get('entity')
+    return f"{parent.class_.__name__} -> {getattr(target, '__name__', target)}"
+
+
+class QueryLog:
+    """ Sentencias de una petición """
+
+    def __init__(self, max_repeated):
+        self.max_repeated = max_repeated
+        self.budget = None
+        self.count = 0
+        self.shapes = Counter()
+        self.lazy_loads = Counter()
+        self.locations = {}
+
+    def add(self, statement, context):
+        self.count += 1
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == self.max_repeated:
+            self.locations[shape] = _app_location()
+        lazy_load = _lazy_load(context)
+        if lazy_load is not None:
+            self.lazy_loads[lazy_load] += 1
+
+    def repeated(self):
+        return [
+            {'count': count, 'statement': shape[:500], 'location': self.locations.get(shape, [])}
+            for shape, count in self.shapes.most_common() if count >= self.max_repeated
+        ]
+
+
+def current_log():
+    if not has_request_context():
+        return None
+    return g.get(_G_KEY)
+
+
+def query_budget(max_queries=None, max_repeated=None):
+    """
+    Decorador para declarar el presupuesto de una vista: como mucho
+    max_queries sentencias y ninguna forma repetida max_repeated veces.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            log = current_log()
+            if log is not None:
+                log.budget = max_queries
+                if max_repeated is not None:
+                    log.max_repeated = max_repeated
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class QueryBudget:
+
+    def __init__(self):
+        self.mode = 'off'
+        self.default_budget = None
+        self.max_repeated = 5
+
+    def init_app(self, app, db):
+        """ Después de db.init_app() """
+        self.mode = app.config.setdefault(
+            'QUERY_BUDGET', os.getenv('QUERY_BUDGET', 'warn' if app.debug else 'off'))
+        if self.mode not in QUERY_BUDGET_MODES:
+            raise RuntimeError(f"QUERY_BUDGET no válido: {self.mode} (opciones: {', '.join(QUERY_BUDGET_MODES)})")
+        default_budget = os.getenv('QUERY_BUDGET_DEFAULT')
+        self.default_budget = app.config.setdefault(
+            'QUERY_BUDGET_DEFAULT', int(default_budget) if default_budget else None)
+        self.max_repeated = app.config.setdefault(
+            'QUERY_BUDGET_MAX_REPEATED', int(os.getenv('QUERY_BUDGET_MAX_REPEATED', 5)))
+        if self.mode == 'off':
+            return
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        log = current_log()
+        if log is not None:
+            log.add(statement, context)
+
+    def _start(self):
+        setattr(g, _G_KEY, QueryLog(self.max_repeated))
+
+    def _finish(self, response):
+        log = g.pop(_G_KEY, None)
+        if log is None:
+            return response
+
+        budget = log.budget if log.budget is not None else self.default_budget
+        over_budget = budget is not None and log.count > budget
+        repeated = log.repeated()
+        if not over_budget and not repeated:
+            return response
+
+        report = {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'queries': log.count,
+            'budget': budget,
+            'lazy_loads': dict(log.lazy_loads.most_common()),
+            'repeated_statements': repeated,
+        }
+        logger.warning('query_budget %s', json.dumps(report, ensure_ascii=False))
+        if self.mode == 'raise':
+            raise QueryBudgetExceeded(report)
+        return response
+
+
+query_budget_checker = QueryBudget()
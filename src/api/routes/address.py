@@ -4,6 +4,7 @@ from flask import Blueprint, jsonify, request
 from api.database.db import db
 from api.models.Address import Address
 from api.models.User import User
+from api.database.replica import replica_reads
 
 logger = logging.getLogger(__name__)
 
@@ -173,6 +174,7 @@ def set_default_address(address_id):
 
 
 @api.route('/addresses/default', methods=['GET'])
+@replica_reads
 @jwt_required()
 def get_default_address():
 
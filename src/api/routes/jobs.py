@@ -0,0 +1,17 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from api.database.db import db
+from api.models.Job import Job
+
+api = Blueprint('api/jobs', __name__)
+
+
+@api.route('/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    current_user_id = int(get_jwt_identity())
+    job = db.session.get(Job, job_id)
+    # Cada usuario solo ve sus tareas; las ajenas no se distinguen de las que no existen
+    if not job or job.user_id != current_user_id:
+        return jsonify({'error': 'Tarea no encontrada'}), 404
+    return jsonify(job.serialize()), 200
@@ -0,0 +1,39 @@
+"""
+Estadísticas internas (caché de respuestas, pool de conexiones, cola de
+tareas). Solo con la cabecera X-Ops-Token igual a OPS_TOKEN; sin OPS_TOKEN
+configurado los endpoints no responden.
+
+    curl -H "X-Ops-Token: $OPS_TOKEN" .../api/ops/db/pool
+"""
+import hmac
+import os
+from flask import Blueprint, current_app, jsonify, request
+from api.cache import response_cache
+from api.database.pool import pool_metrics
+from api.jobs import job_queue
+
+api = Blueprint('api/ops', __name__)
+
+
+@api.before_request
+def require_ops_token():
+    token = current_app.config.get('OPS_TOKEN', os.getenv('OPS_TOKEN'))
+    if not token:
+        return jsonify({'error': 'Endpoints de operación desactivados (falta OPS_TOKEN)'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Ops-Token', '').encode(), token.encode()):
+        return jsonify({'error': 'Token de operación no válido'}), 401
+
+
+@api.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify(response_cache.stats()), 200
+
+
+@api.route('/db/pool', methods=['GET'])
+def get_db_pool_stats():
+    return jsonify(pool_metrics.stats()), 200
+
+
+@api.route('/jobs', methods=['GET'])
+def get_job_stats():
+    return jsonify(job_queue.stats()), 200
@@ -2,53 +2,227 @@ import logging
 from datetime import datetime, timedelta
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import Blueprint, jsonify, request
+from sqlalchemy import or_
 from api.database.db import db
 from api.models.Product import Product
 from api.models.User import User
-import cloudinary.uploader
-import cloudinary
-import os
+from api.utils import APIException, parse_keyset_args, keyset_paginate, parse_page_args, parse_id_list
+from api.catalog import parse_catalog_args, search_catalog
+from api.search import search_product_ids
+from api.suggest import suggest_index
+from api.cache import response_cache
+from api.conditional import conditional, window_validator
+from api.projections import parse_fields, project
+from api.streaming import wants_stream, ndjson_response
+from api.database.replica import replica_reads
+from api.query_budget import query_budget
+from api.storage import image_storage, is_new_image, ImageUploadError, PRODUCT_IMAGES_FOLDER
+from api.uploads import image_uploads, ImageRejected, form_bool, form_float
+from api.image_jobs import enqueue_product_images, kept_images, set_product_images
 
 logger = logging.getLogger(__name__)
 
 api = Blueprint('api/product', __name__)
 
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.getenv('CLOUDINARY_API_KEY'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET')
-)
-
 MAX_IMAGES = 5
+MAX_BATCH_IDS = 200
+# Validador de conditional() (1 consulta) + productos + las 4 relaciones de serialize() en bloque
+PRODUCT_LIST_QUERY_BUDGET = 6
+# Con window_validator el validador son 2 consultas: versión del catálogo y count() de la ventana
+PRODUCT_WINDOW_QUERY_BUDGET = 7
+# Tipos de los campos de texto de un producto enviado en multipart/form-data
+PRODUCT_FORM_FIELDS = {'price': form_float, 'original_price': form_float, 'status': form_bool, 'on_sale': form_bool}
+
+
+def _list_products(query):
+    # Sin ?after/?limit se mantiene la respuesta clásica (lista completa)
+    after, limit = parse_keyset_args(request.args)
+    query, serialize = project(query, Product, parse_fields(request.args, Product))
+
+    if wants_stream():
+        if after is not None:
+            query = query.filter(Product.id > after)
+        query = query.order_by(Product.id)
+        # parse_keyset_args da un limit por defecto con ?after: solo se corta si se pide
+        if 'limit' in request.args:
+            query = query.limit(limit)
+        return ndjson_response(query, serialize)
+
+    if limit is None:
+        return jsonify([serialize(product) for product in query.order_by(Product.id).all()]), 200
+
+    products, next_cursor = keyset_paginate(query, Product.id, after, limit)
+    return jsonify({
+        'products': [serialize(product) for product in products],
+        'next_cursor': next_cursor
+    }), 200
 
 
 @api.route('/products', methods=['GET'])
+@replica_reads
+@conditional()
+@response_cache.cached()
 def get_products():
     try:
-        all_products = Product.query.all()
-        return jsonify([product.serialize() for product in all_products]), 200
+        return _list_products(Product.query)
+    except APIException:
+        raise
     except Exception as e:
         logger.error(f"Error en get_products: {str(e)}")
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 
 @api.route('/products/actives', methods=['GET'])
+@replica_reads
+@conditional()
+@response_cache.cached()
 def get_actives_products():
     try:
-        active_products = Product.query.filter_by(status=True).all()
-        return jsonify([product.serialize() for product in active_products]), 200
+        return _list_products(Product.query.filter_by(status=True))
+    except APIException:
+        raise
     except Exception as e:
         logger.error(f"Error en get_actives_products: {str(e)}")
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 
+@api.route('/catalog', methods=['GET'])
+@replica_reads
+@conditional()
+@response_cache.cached()
+def get_catalog():
+    try:
+        params = parse_catalog_args(request.args)
+        return jsonify(search_catalog(params)), 200
+    except APIException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en get_catalog: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+
+@api.route('/search', methods=['GET'])
+@replica_reads
+@conditional()
+def search_products():
+    q = request.args.get('q', '').strip()
+    page, limit = parse_page_args(request.args)
+    fields = parse_fields(request.args, Product)
+
+    try:
+        if not q:
+            return jsonify({'products': [], 'page': page, 'limit': limit}), 200
+
+        offset = (page - 1) * limit
+        product_ids = search_product_ids(q, limit, offset)
+
+        if product_ids is None:
+            # Sin índice de texto completo: búsqueda simple por nombre y descripción
+            query, serialize = project(Product.query, Product, fields)
+            products = query\
+                .filter(Product.status == True)\
+                .filter(or_(Product.name.ilike(f'%{q}%'), Product.description.ilike(f'%{q}%')))\
+                .order_by(Product.id)\
+                .offset(offset)\
+                .limit(limit)\
+                .all()
+        else:
+            query, serialize = project(Product.query, Product, fields)
+            by_id = {
+                product.id: product
+                for product in query.filter(Product.id.in_(product_ids)).all()
+            }
+            # Mantener el orden de relevancia del índice
+            products = [by_id[product_id] for product_id in product_ids if product_id in by_id]
+
+        return jsonify({
+            'products': [serialize(product) for product in products],
+            'page': page,
+            'limit': limit
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error en search_products: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+
+@api.route('/suggest', methods=['GET'])
+def suggest():
+    q = request.args.get('q', '')
+    _, limit = parse_page_args(request.args, default_limit=8, max_limit=20)
+
+    try:
+        return jsonify(suggest_index.suggest(q, limit)), 200
+    except Exception as e:
+        logger.error(f"Error en suggest: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+
+def _batch_products(product_ids):
+    # Una sola consulta IN; los inactivos se cargan para poder distinguirlos de los inexistentes
+    fields = parse_fields(request.args, Product)
+    query, serialize = project(Product.query, Product, fields, extra=('status',))
+    by_id = {product.id: product for product in query.filter(Product.id.in_(product_ids)).all()}
+
+    products, missing, inactive = [], [], []
+    for product_id in product_ids:
+        product = by_id.get(product_id)
+        if product is None:
+            missing.append(product_id)
+        elif not product.status:
+            inactive.append(product_id)
+        else:
+            products.append(serialize(product))
+
+    return jsonify({'products': products, 'missing': missing, 'inactive': inactive}), 200
+
+
+@api.route('/products/batch', methods=['GET'])
+@replica_reads
+@query_budget(PRODUCT_LIST_QUERY_BUDGET)
+@conditional()
+@response_cache.cached()
+def get_products_batch():
+    product_ids = parse_id_list(request.args.get('ids', ''), MAX_BATCH_IDS)
+
+    try:
+        return _batch_products(product_ids)
+    except APIException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en get_products_batch: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+
+@api.route('/products/batch', methods=['POST'])
+def post_products_batch():
+    # Para listas largas que no caben cómodamente en la URL
+    body = request.get_json(silent=True) or {}
+    product_ids = parse_id_list(body.get('ids'), MAX_BATCH_IDS)
+
+    try:
+        return _batch_products(product_ids)
+    except APIException:
+        raise
+    except Exception as e:
+        logger.error(f"Error en post_products_batch: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+
 @api.route('/products/<int:product_id>', methods=['GET'])
+@replica_reads
+@query_budget(PRODUCT_LIST_QUERY_BUDGET)
+@conditional()
+@response_cache.cached()
 def get_product_by_id(product_id):
+    fields = parse_fields(request.args, Product)
+
     try:
-        product = Product.query.get(product_id)
+        query, serialize = project(Product.query, Product, fields)
+        product = query.filter(Product.id == product_id).first()
         if not product:
             return jsonify({'error': 'Producto no encontrado'}), 404
-        return jsonify(product.serialize()), 200
+        return jsonify(serialize(product)), 200
     except Exception as e:
         logger.error(f"Error en get_product_by_id: {str(e)}")
         return jsonify({'error': 'Error interno del servidor'}), 500
@@ -64,7 +238,11 @@ def create_product():
         if not user or user.rol.id != 2:
             return jsonify({'error': 'No tienes permisos para crear productos'}), 403
 
-        body = request.get_json()
+        try:
+            body = image_uploads.parse('images', MAX_IMAGES, PRODUCT_FORM_FIELDS)
+        except ImageRejected as rejected:
+            return jsonify({'error': str(rejected)}), rejected.status_code
+
         required_fields = ['name', 'description', 'price']
 
         for field in required_fields:
@@ -80,29 +258,13 @@ def create_product():
             return jsonify({'error': f'Máximo {MAX_IMAGES} imágenes permitidas'}), 400
 
         uploaded_images = []
-
-        for idx, img_data in enumerate(images_data):
-            if img_data.startswith('data:image'):
-                try:
-                    upload_result = cloudinary.uploader.upload(
-                        img_data,
-                        folder="kurisushop_products"
-                    )
-                    uploaded_images.append(upload_result.get('secure_url'))
-                except Exception as img_exc:
-                    logger.error(f'Error subiendo imagen {idx}: %s', img_exc)
-                    # Si falla alguna imagen, eliminar las ya subidas
-                    for uploaded_url in uploaded_images:
-                        try:
-                            public_id = uploaded_url.split(
-                                '/')[-1].split('.')[0]
-                            cloudinary.uploader.destroy(
-                                f"kurisushop_products/{public_id}")
-                        except:
-                            pass
-                    return jsonify({'error': f'Error al subir la imagen {idx + 1}'}), 500
-            else:
-                uploaded_images.append(img_data)
+        if not image_storage.async_uploads:
+            # En paralelo; si falla alguna, se eliminan las ya subidas
+            try:
+                uploaded_images = image_storage.upload_many(images_data, PRODUCT_IMAGES_FOLDER)
+            except ImageUploadError as img_exc:
+                logger.error(f'Error subiendo imagen {img_exc.index}: %s', img_exc.cause)
+                return jsonify({'error': f'Error al subir la imagen {img_exc.index + 1}'}), 500
 
         new_product = Product(
             name=body['name'].strip().upper(),
@@ -119,8 +281,21 @@ def create_product():
         )
 
         db.session.add(new_product)
+
+        job = None
+        if image_storage.async_uploads:
+            # Las imágenes las sube `flask worker`; el producto queda en "processing"
+            db.session.flush()
+            job = enqueue_product_images(new_product, images_data, current_user_id)
         db.session.commit()
 
+        if job is not None:
+            return jsonify({
+                'message': 'Producto creado, las imágenes se están procesando',
+                'product': new_product.serialize(),
+                'job_id': job.id
+            }), 202
+
         return jsonify({
             'message': 'Producto creado exitosamente',
             'product': new_product.serialize()
@@ -148,8 +323,11 @@ def manage_product(product_id):
         if request.method == 'GET':
             return jsonify(product.serialize()), 200
 
-        # PUT - Actualizar producto
-        body = request.get_json()
+        # PUT - Actualizar producto (JSON o multipart/form-data)
+        try:
+            body = image_uploads.parse('images', MAX_IMAGES, PRODUCT_FORM_FIELDS)
+        except ImageRejected as rejected:
+            return jsonify({'error': str(rejected)}), rejected.status_code
 
         # Detectar si el precio ha cambiado
         if "price" in body and body["price"] != product.price:
@@ -175,35 +353,33 @@ def manage_product(product_id):
         product.updated_at = datetime.utcnow()
 
         # Procesar imágenes si se envían
+        job = None
         if 'images' in body:
             images_data = body['images']
 
             if len(images_data) > MAX_IMAGES:
                 return jsonify({'error': f'Máximo {MAX_IMAGES} imágenes permitidas'}), 400
 
-            new_uploaded_images = []
-
-            for idx, img_data in enumerate(images_data):
-                # Si es una URL existente, mantenerla
-                if img_data.startswith('http'):
-                    new_uploaded_images.append(img_data)
-                # Si es base64, subirla
-                elif img_data.startswith('data:image'):
-                    try:
-                        upload_result = cloudinary.uploader.upload(
-                            img_data,
-                            folder="kurisushop_products"
-                        )
-                        new_uploaded_images.append(
-                            upload_result.get('secure_url'))
-                    except Exception as img_exc:
-                        logger.error(f'Error subiendo imagen {idx}: %s', img_exc)
-                        return jsonify({'error': f'Error al subir la imagen {idx + 1}'}), 500
-
-            product.images = new_uploaded_images
+            if image_storage.async_uploads and any(is_new_image(img) for img in images_data):
+                job = enqueue_product_images(product, images_data, current_user_id)
+            else:
+                # Las URLs existentes se mantienen y las nuevas se suben (en paralelo)
+                try:
+                    uploaded_images = image_storage.upload_many(images_data, PRODUCT_IMAGES_FOLDER)
+                except ImageUploadError as img_exc:
+                    logger.error(f'Error subiendo imagen {img_exc.index}: %s', img_exc.cause)
+                    return jsonify({'error': f'Error al subir la imagen {img_exc.index + 1}'}), 500
+                set_product_images(product, kept_images(images_data, uploaded_images))
 
         db.session.commit()
 
+        if job is not None:
+            return jsonify({
+                'message': 'Producto actualizado, las imágenes se están procesando',
+                'product': product.serialize(),
+                'job_id': job.id
+            }), 202
+
         return jsonify({
             'message': 'Producto actualizado exitosamente',
             'product': product.serialize()
@@ -274,22 +450,40 @@ def toggle_product_sale(product_id):
     return jsonify({"msg": "Oferta actualizada", "product": product.serialize()}), 200
 
 
-@api.route("/products/new", methods=["GET"])
-def get_new_products():
+def _new_products_query():
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    new_products = Product.query.filter(
+    return Product.query.filter(
         Product.created_at >= thirty_days_ago,
         Product.status == True
-    ).order_by(Product.created_at.desc()).all()
-    return jsonify([p.serialize() for p in new_products]), 200
+    )
 
 
-@api.route("/products/recently-updated", methods=["GET"])
-def get_recently_updated_products():
+def _recently_updated_products_query():
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    updated_products = Product.query.filter(
+    return Product.query.filter(
         Product.sale_updated_at >= thirty_days_ago,
         Product.status == True,
         Product.on_sale == True
-    ).order_by(Product.sale_updated_at.desc()).all()
-    return jsonify([p.serialize() for p in updated_products]), 200
\ No newline at end of file
+    )
+
+
+@api.route("/products/new", methods=["GET"])
+@replica_reads
+@query_budget(PRODUCT_WINDOW_QUERY_BUDGET)
+@conditional(lambda: window_validator(_new_products_query()))
+@response_cache.cached()
+def get_new_products():
+    query, serialize = project(_new_products_query(), Product, parse_fields(request.args, Product))
+    new_products = query.order_by(Product.created_at.desc()).all()
+    return jsonify([serialize(p) for p in new_products]), 200
+
+
+@api.route("/products/recently-updated", methods=["GET"])
+@replica_reads
+@query_budget(PRODUCT_WINDOW_QUERY_BUDGET)
+@conditional(lambda: window_validator(_recently_updated_products_query()))
+@response_cache.cached()
+def get_recently_updated_products():
+    query, serialize = project(_recently_updated_products_query(), Product, parse_fields(request.args, Product))
+    updated_products = query.order_by(Product.sale_updated_at.desc()).all()
+    return jsonify([serialize(p) for p in updated_products]), 200
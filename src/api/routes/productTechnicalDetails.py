@@ -5,6 +5,11 @@ from api.database.db import db
 from api.models.ProductTechnicalDetails import ProductTechnicalDetails
 from api.models.Product import Product
 from api.models.User import User
+from api.cache import response_cache
+from api.conditional import conditional
+from api.projections import parse_fields, project
+from api.database.replica import replica_reads
+from api.search import match_condition
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +17,8 @@ api = Blueprint('api/product_technical_details', __name__)
 
 
 @api.route('/product/<int:product_id>/technical-details', methods=['GET'])
+@replica_reads
+@conditional()
 def get_technical_details(product_id):
 
     try:
@@ -126,37 +133,35 @@ def update_technical_details(product_id):
         return jsonify({'error': 'Error interno del servidor'}), 500
 
 
+SEARCH_FIELDS = ('manufacturer', 'collection', 'anime_series', 'character')
+
+
+def _field_condition(field, value):
+    # Con índice de texto completo se busca en esa columna; si no, ILIKE
+    condition = match_condition(Product.id, value, columns=[field])
+    if condition is not None:
+        return condition
+    return getattr(ProductTechnicalDetails, field).ilike(f'%{value}%')
+
+
 @api.route('/technical-details/search', methods=['GET'])
+@replica_reads
+@conditional()
 def search_by_technical_details():
+    fields = parse_fields(request.args, Product)
 
     try:
-        manufacturer = request.args.get('manufacturer')
-        collection = request.args.get('collection')
-        anime_series = request.args.get('anime_series')
-        character = request.args.get('character')
-
-        query = db.session.query(Product).join(ProductTechnicalDetails)
-
-        if manufacturer:
-            query = query.filter(
-                ProductTechnicalDetails.manufacturer.ilike(f'%{manufacturer}%')
-            )
-        if collection:
-            query = query.filter(
-                ProductTechnicalDetails.collection.ilike(f'%{collection}%')
-            )
-        if anime_series:
-            query = query.filter(
-                ProductTechnicalDetails.anime_series.ilike(f'%{anime_series}%')
-            )
-        if character:
-            query = query.filter(
-                ProductTechnicalDetails.character.ilike(f'%{character}%')
-            )
+        query, serialize = project(
+            db.session.query(Product).join(ProductTechnicalDetails), Product, fields)
+
+        for field in SEARCH_FIELDS:
+            value = request.args.get(field)
+            if value:
+                query = query.filter(_field_condition(field, value))
 
         products = query.filter(Product.status == True).all()
 
-        return jsonify([product.serialize() for product in products]), 200
+        return jsonify([serialize(product) for product in products]), 200
 
     except Exception as e:
         logger.error(f"Error en search_by_technical_details: {str(e)}")
@@ -164,6 +169,9 @@ def search_by_technical_details():
 
 
 @api.route('/anime-series', methods=['GET'])
+@replica_reads
+@conditional()
+@response_cache.cached()
 def get_all_anime_series():
 
     try:
@@ -3,24 +3,23 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 import bcrypt
 from flask import Blueprint, jsonify, request
 import re
+from sqlalchemy.orm import selectinload
 from api.database.db import db
 from api.models import Rol
 from api.models.User import User
-import cloudinary.uploader
-import cloudinary
-import os
+from api.models.StripePay import StripePay
 from api.limiter import limiter
+from api.projections import parse_fields, project
+from api.streaming import wants_stream, ndjson_response
+from api.timing import timed
+from api.storage import image_storage, is_new_image, USER_IMAGES_FOLDER
+from api.uploads import image_uploads, ImageRejected
+from api.image_jobs import enqueue_user_image, set_user_image
 
 logger = logging.getLogger(__name__)
 
 api = Blueprint('api/user', __name__)
 
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.getenv('CLOUDINARY_API_KEY'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET')
-)
-
 
 def validate_email(email):
     pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
@@ -50,8 +49,11 @@ def get_rol_id_by_type(rol_type):
 
 @api.route('/users', methods=['GET'])
 def get_users():
-    all_users = User.query.all()
-    all_user_serialize = list(map(lambda user: user.serialize(), all_users))
+    query, serialize = project(User.query, User, parse_fields(request.args, User))
+    if wants_stream():
+        return ndjson_response(query.order_by(User.id), serialize)
+    all_users = query.all()
+    all_user_serialize = list(map(serialize, all_users))
     return jsonify(all_user_serialize), 200
 
 
@@ -83,7 +85,8 @@ def signup(rol_type):
         if existing_user:
             return jsonify({'error': 'El usuario ya existe'}), 400
 
-        new_pass = bcrypt.hashpw(body['password'].encode(), bcrypt.gensalt())
+        with timed('bcrypt'):
+            new_pass = bcrypt.hashpw(body['password'].encode(), bcrypt.gensalt())
 
         new_user = User()
         new_user.email = body['email']
@@ -119,7 +122,9 @@ def login():
         if not user:
             return jsonify({'error': 'Credenciales inválidas'}), 401
 
-        if not bcrypt.checkpw(body['password'].encode(), user.password.encode()):
+        with timed('bcrypt'):
+            password_ok = bcrypt.checkpw(body['password'].encode(), user.password.encode())
+        if not password_ok:
             return jsonify({'error': 'Credenciales inválidas'}), 401
 
         access_token = create_access_token(identity=str(user.id))
@@ -150,14 +155,19 @@ def update_user():
         if request.method == 'GET':
             return jsonify(user.serialize()), 200
 
-        body = request.get_json()
+        try:
+            body = image_uploads.parse('img', 1)
+        except ImageRejected as rejected:
+            return jsonify({'error': str(rejected)}), rejected.status_code
+        job = None
         for field in ['user_name', 'first_name', 'last_name', 'email', 'password', 'img']:
             if field in body and body[field]:
                 if field == 'password':
                     if not validate_password(body['password']):
                         return jsonify({'error': 'La contraseña debe tener al menos 8 caracteres, una mayúscula, una minúscula, un número y un carácter especial'}), 400
-                    user.password = bcrypt.hashpw(
-                        body['password'].encode(), bcrypt.gensalt()).decode()
+                    with timed('bcrypt'):
+                        user.password = bcrypt.hashpw(
+                            body['password'].encode(), bcrypt.gensalt()).decode()
                 elif field == 'email':
                     if not validate_email(body['email']):
                         return jsonify({'error': 'Formato de email inválido'}), 400
@@ -165,23 +175,45 @@ def update_user():
                 elif field == 'img':
                     img_value = body['img']
 
-                    if img_value.startswith('data:image'):
+                    if is_new_image(img_value) and image_storage.async_uploads:
+                        # La sube `flask worker`; mientras tanto se mantiene el avatar anterior
+                        job = enqueue_user_image(user, img_value)
+                    elif is_new_image(img_value):
                         try:
-                            upload_result = cloudinary.uploader.upload(
-                                img_value, folder="kurisushop_users")
-                            img_url = upload_result.get('secure_url')
-                            user.img = img_url
+                            set_user_image(user, image_storage.upload(img_value, USER_IMAGES_FOLDER)['url'])
                         except Exception as img_exc:
-                            logger.error('Error subiendo imagen a Cloudinary: %s', img_exc)
+                            logger.error('Error subiendo imagen de usuario: %s', img_exc)
                     else:
-                        user.img = img_value
+                        set_user_image(user, img_value)
                 else:
                     setattr(user, field, body[field])
 
         db.session.commit()
+        if job is not None:
+            return jsonify({'message': 'Usuario actualizado, la imagen se está procesando',
+                            'user': user.serialize(), 'job_id': job.id}), 202
         return jsonify({'message': 'Usuario actualizado', 'user': user.serialize()}), 200
 
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error en update_user: {str(e)}")
-        return jsonify({'error': 'Error interno del servidor'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
+
+@api.route('/payments', methods=['GET'])
+@jwt_required()
+def get_payments():
+    try:
+        current_user_id = int(get_jwt_identity())
+        query = StripePay.query\
+            .options(selectinload(StripePay.user), selectinload(StripePay.shipping_address))\
+            .filter(StripePay.user_id == current_user_id)\
+            .order_by(StripePay.created_at.desc(), StripePay.id.desc())
+
+        if wants_stream():
+            return ndjson_response(query, lambda payment: payment.serialize())
+        return jsonify([payment.serialize() for payment in query.all()]), 200
+
+    except Exception as e:
+        logger.error(f"Error en get_payments: {str(e)}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
@@ -0,0 +1,222 @@
+"""
+Índice de búsqueda de texto completo sobre productos y detalles técnicos.
+
+- PostgreSQL: tabla product_search con una columna tsvector y un índice GIN.
+- SQLite: tabla virtual FTS5 product_fts (rowid = product.id).
+
+El índice se mantiene de forma incremental desde api.changes: cada flush que
+toca productos o detalles técnicos reindexa solo esos productos dentro de la
+misma transacción. Las consultas van por api.database.replica.read_connection:
+en las vistas con @replica_reads se leen de la réplica.
+"""
+import logging
+import re
+from sqlalchemy import text, bindparam, column, Integer
+from api.database.db import db
+from api.database.replica import read_connection
+from api.changes import on_products_flushed
+
+logger = logging.getLogger(__name__)
+
+TS_CONFIG = 'spanish'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# engine url -> bool, para no inspeccionar el esquema en cada consulta
+_index_ready = {}
+
+# Columnas por las que se puede restringir match_condition. En PostgreSQL
+# el documento solo guarda el peso de cada palabra, así que se restringe por
+# peso: anime_series también encuentra palabras del nombre o del personaje.
+SEARCH_COLUMNS = {
+    'name': 'A',
+    'anime_series': 'A',
+    'character': 'A',
+    'manufacturer': 'B',
+    'collection': 'B',
+    'description': 'C',
+}
+
+
+_PG_DOCUMENT = f"""
+    setweight(to_tsvector('{TS_CONFIG}', coalesce(p.name, '')), 'A') ||
+    setweight(to_tsvector('{TS_CONFIG}', concat_ws(' ', d.anime_series, d.character)), 'A') ||
+    setweight(to_tsvector('{TS_CONFIG}', concat_ws(' ', d.manufacturer, d.collection)), 'B') ||
+    setweight(to_tsvector('{TS_CONFIG}', coalesce(p.description, '')), 'C')
+"""
+
+_SQL = {
+    'postgresql': {
+        'create': [
+            """CREATE TABLE IF NOT EXISTS product_search (
+                product_id INTEGER PRIMARY KEY REFERENCES product(id) ON DELETE CASCADE,
+                document TSVECTOR NOT NULL
+            )""",
+            "CREATE INDEX IF NOT EXISTS ix_product_search_document ON product_search USING GIN (document)",
+        ],
+        'exists': "SELECT to_regclass('product_search') IS NOT NULL",
+        'delete': "DELETE FROM product_search WHERE product_id IN :ids",
+        'clear': "DELETE FROM product_search",
+        'insert': f"""
+            INSERT INTO product_search (product_id, document)
+            SELECT p.id, {_PG_DOCUMENT}
+            FROM product p LEFT JOIN product_technical_details d ON d.product_id = p.id
+        """,
+        'match': "SELECT product_id FROM product_search WHERE document @@ to_tsquery(:config, :query)",
+        'search': """
+            SELECT s.product_id
+            FROM product_search s JOIN product p ON p.id = s.product_id
+            WHERE s.document @@ to_tsquery(:config, :query) AND p.status = true
+            ORDER BY ts_rank(s.document, to_tsquery(:config, :query)) DESC, s.product_id
+            LIMIT :limit OFFSET :offset
+        """,
+    },
+    'sqlite': {
+        'create': [
+            """CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5(
+                name, description, anime_series, character, manufacturer, collection,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )""",
+        ],
+        'exists': "SELECT count(*) FROM sqlite_master WHERE name = 'product_fts'",
+        'delete': "DELETE FROM product_fts WHERE rowid IN :ids",
+        'clear': "DELETE FROM product_fts",
+        'insert': """
+            INSERT INTO product_fts (rowid, name, description, anime_series, character, manufacturer, collection)
+            SELECT p.id, p.name, p.description, coalesce(d.anime_series, ''), coalesce(d.character, ''),
+                   coalesce(d.manufacturer, ''), coalesce(d.collection, '')
+            FROM product p LEFT JOIN product_technical_details d ON d.product_id = p.id
+        """,
+        'match': "SELECT rowid FROM product_fts WHERE product_fts MATCH :query",
+        # Pesos bm25 por columna: el nombre y la serie/personaje pesan más que la descripción
+        'search': """
+            SELECT f.rowid
+            FROM product_fts f JOIN product p ON p.id = f.rowid
+            WHERE product_fts MATCH :query AND p.status = 1
+            ORDER BY bm25(product_fts, 10.0, 1.0, 8.0, 8.0, 4.0, 4.0), f.rowid
+            LIMIT :limit OFFSET :offset
+        """,
+    },
+}
+
+
+def _dialect_sql(connection):
+    return _SQL.get(connection.dialect.name)
+
+
+def index_available(connection):
+    sql = _dialect_sql(connection)
+    if sql is None:
+        return False
+
+    key = str(connection.engine.url)
+    if key not in _index_ready:
+        _index_ready[key] = bool(connection.execute(text(sql['exists'])).scalar())
+    return _index_ready[key]
+
+
+def create_search_schema(connection):
+    sql = _dialect_sql(connection)
+    if sql is None:
+        raise RuntimeError(f'Búsqueda de texto no soportada en {connection.dialect.name}')
+    for statement in sql['create']:
+        connection.execute(text(statement))
+    _index_ready.pop(str(connection.engine.url), None)
+
+
+def reindex_products(connection, product_ids):
+    sql = _dialect_sql(connection)
+    ids = sorted(product_ids)
+    connection.execute(
+        text(sql['delete']).bindparams(bindparam('ids', expanding=True)),
+        {'ids': ids}
+    )
+    connection.execute(
+        text(sql['insert'] + ' WHERE p.id IN :ids').bindparams(bindparam('ids', expanding=True)),
+        {'ids': ids}
+    )
+
+
+def rebuild_index(connection):
+    sql = _dialect_sql(connection)
+    connection.execute(text(sql['clear']))
+    connection.execute(text(sql['insert']))
+
+
+def build_query(connection, q, columns=None):
+    """
+    Convierte el texto del usuario en una consulta del motor: todas las palabras
+    deben aparecer y cada una se trata como prefijo para poder buscar al teclear.
+    Con columns (claves de SEARCH_COLUMNS) las palabras solo se buscan en ellas.
+    """
+    tokens = _TOKEN_RE.findall(q.lower())
+    if not tokens:
+        return None
+    if connection.dialect.name == 'postgresql':
+        weights = ''.join(sorted({SEARCH_COLUMNS[name] for name in columns or ()}))
+        return ' & '.join(f"{token}:*{weights}" for token in tokens)
+    query = ' '.join(f'"{token}"*' for token in tokens)
+    if columns:
+        query = f"{{{' '.join(columns)}}} : ({query})"
+    return query
+
+
+def _params(connection, query):
+    params = {'query': query}
+    if connection.dialect.name == 'postgresql':
+        params['config'] = TS_CONFIG
+    return params
+
+
+def search_product_ids(q, limit, offset=0):
+    """
+    Devuelve los ids de productos activos ordenados por relevancia,
+    o None si el índice no está disponible en esta base de datos.
+    """
+    connection = read_connection(db.session)
+    if not index_available(connection):
+        return None
+
+    query = build_query(connection, q)
+    if query is None:
+        return []
+
+    rows = connection.execute(
+        text(_dialect_sql(connection)['search']),
+        {**_params(connection, query), 'limit': limit, 'offset': offset}
+    )
+    return [row[0] for row in rows]
+
+
+def match_condition(id_column, q, columns=None):
+    """
+    Condición "id IN (productos que coinciden con q)" para combinar con otros
+    filtros, o None si el índice no está disponible. columns restringe la
+    búsqueda a esas columnas (ver SEARCH_COLUMNS).
+    """
+    connection = read_connection(db.session)
+    if not index_available(connection):
+        return None
+
+    query = build_query(connection, q, columns)
+    if query is None:
+        return None
+
+    # Parámetros únicos: puede haber varias condiciones en la misma consulta
+    params = [bindparam(key, value, unique=True) for key, value in _params(connection, query).items()]
+    subquery = text(_dialect_sql(connection)['match'])\
+        .bindparams(*params)\
+        .columns(column('product_id', Integer))
+    return id_column.in_(subquery)
+
+
+@on_products_flushed
+def _reindex_changed_products(session, product_ids):
+    connection = session.connection()
+    if index_available(connection):
+        reindex_products(connection, product_ids)
+
+
+def include_in_autogenerate(object, name, type_, reflected, compare_to):
+    """ Alembic: las tablas del índice no están en los modelos, se gestionan a mano """
+    return not (type_ == 'table' and name.startswith(('product_fts', 'product_search')))
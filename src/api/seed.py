@@ -0,0 +1,333 @@
+"""
+Generador de datos sintéticos (flask insert-test-data).
+
+Con la misma semilla genera siempre el mismo conjunto de datos: usuarios con
+rol y direcciones, productos con detalles técnicos repartidos entre series con
+una distribución de popularidad realista, pagos y reseñas. Las fechas se
+calculan a partir de reference_date, así que los datos solo cambian si cambia
+la semilla, los tamaños o esa fecha.
+
+Todo se escribe con INSERT masivos por lotes (un commit por lote), de modo que
+un millón de productos tarda minutos y no horas.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+import bcrypt
+from sqlalchemy import insert, select, update, func
+from api.database.db import db
+from api.models.Rol import Rol, Role
+from api.models.User import User
+from api.models.Address import Address
+from api.models.Product import Product
+from api.models.ProductTechnicalDetails import ProductTechnicalDetails
+from api.models.StripePay import StripePay
+from api.models.Review import Review
+from api.changes import mark_products_changed
+
+# Contraseña de todos los usuarios generados, para poder hacer login con ellos
+PASSWORD = 'Kurisu123!'
+BCRYPT_ROUNDS = 4
+
+SELLER_RATIO = 0.05
+
+# (serie, peso de popularidad, personajes)
+SERIES = [
+    ('ONE PIECE', 18, ['MONKEY D. LUFFY', 'RORONOA ZORO', 'NAMI', 'SANJI', 'TONY TONY CHOPPER', 'NICO ROBIN']),
+    ('DRAGON BALL', 15, ['SON GOKU', 'VEGETA', 'SON GOHAN', 'PICCOLO', 'FREEZER', 'TRUNKS']),
+    ('NARUTO', 14, ['NARUTO UZUMAKI', 'SASUKE UCHIHA', 'KAKASHI HATAKE', 'ITACHI UCHIHA', 'SAKURA HARUNO']),
+    ('DEMON SLAYER', 10, ['TANJIRO KAMADO', 'NEZUKO KAMADO', 'ZENITSU AGATSUMA', 'KYOJURO RENGOKU']),
+    ('JUJUTSU KAISEN', 9, ['YUJI ITADORI', 'SATORU GOJO', 'MEGUMI FUSHIGURO', 'RYOMEN SUKUNA']),
+    ('ATTACK ON TITAN', 7, ['EREN JAEGER', 'MIKASA ACKERMAN', 'LEVI ACKERMAN', 'ARMIN ARLERT']),
+    ('MY HERO ACADEMIA', 6, ['IZUKU MIDORIYA', 'KATSUKI BAKUGO', 'SHOTO TODOROKI', 'ALL MIGHT']),
+    ('EVANGELION', 5, ['SHINJI IKARI', 'REI AYANAMI', 'ASUKA LANGLEY', 'MARI MAKINAMI']),
+    ('CHAINSAW MAN', 5, ['DENJI', 'POWER', 'MAKIMA', 'AKI HAYAKAWA']),
+    ('SPY X FAMILY', 4, ['ANYA FORGER', 'LOID FORGER', 'YOR FORGER']),
+    ('STEINS;GATE', 2, ['KURISU MAKISE', 'RINTARO OKABE', 'MAYURI SHIINA']),
+    ('SAILOR MOON', 2, ['USAGI TSUKINO', 'AMI MIZUNO', 'REI HINO']),
+    ('COWBOY BEBOP', 1, ['SPIKE SPIEGEL', 'FAYE VALENTINE', 'JET BLACK']),
+    ('FULLMETAL ALCHEMIST', 1, ['EDWARD ELRIC', 'ALPHONSE ELRIC', 'ROY MUSTANG']),
+]
+
+# (fabricante, peso, colecciones)
+MANUFACTURERS = [
+    ('BANDAI SPIRITS', 30, ['S.H.FIGUARTS', 'FIGUARTS ZERO', 'ICHIBANSHO']),
+    ('GOOD SMILE COMPANY', 25, ['NENDOROID', 'POP UP PARADE', 'FIGMA']),
+    ('BANPRESTO', 20, ['GRANDISTA', 'DXF', 'MASTERLISE']),
+    ('KOTOBUKIYA', 10, ['ARTFX J', 'ARTFX+']),
+    ('MEGAHOUSE', 8, ['PORTRAIT OF PIRATES', 'G.E.M.']),
+    ('ALTER', 4, ['ALTAIR', 'ESCALA 1/7']),
+    ('MAX FACTORY', 3, ['FIGMA', 'PLAMAX']),
+]
+
+FIGURE_TYPES = ['FIGURA', 'NENDOROID', 'ESTATUA', 'BUSTO', 'FIGURA ARTICULADA', 'LLAVERO']
+
+CITIES = [
+    ('Madrid', 'Madrid', '28'), ('Barcelona', 'Barcelona', '08'), ('Valencia', 'Valencia', '46'),
+    ('Sevilla', 'Sevilla', '41'), ('Zaragoza', 'Zaragoza', '50'), ('Málaga', 'Málaga', '29'),
+    ('Bilbao', 'Bizkaia', '48'), ('Murcia', 'Murcia', '30'), ('Palma', 'Illes Balears', '07'),
+    ('Valladolid', 'Valladolid', '47'), ('A Coruña', 'A Coruña', '15'), ('Granada', 'Granada', '18'),
+]
+STREETS = ['Calle Mayor', 'Avenida de la Constitución', 'Calle Real', 'Paseo de Gracia', 'Calle Alcalá',
+           'Gran Vía', 'Calle del Carmen', 'Avenida de América', 'Calle Serrano', 'Rambla Nova']
+FIRST_NAMES = ['Lucía', 'Hugo', 'Martina', 'Daniel', 'Sofía', 'Pablo', 'Julia', 'Álvaro', 'Paula', 'Mario',
+               'Valeria', 'Adrián', 'Sara', 'David', 'Carla', 'Javier', 'Noa', 'Diego', 'Alba', 'Marcos']
+LAST_NAMES = ['García', 'Rodríguez', 'González', 'Fernández', 'López', 'Martínez', 'Sánchez', 'Pérez',
+              'Gómez', 'Martín', 'Jiménez', 'Ruiz', 'Hernández', 'Díaz', 'Moreno', 'Álvarez']
+REVIEW_COMMENTS = {
+    1: ['Llegó rota y el embalaje era pésimo.', 'Nada que ver con las fotos.'],
+    2: ['La pintura tiene bastantes fallos.', 'Esperaba más calidad por el precio.'],
+    3: ['Correcta, sin más.', 'Está bien, aunque el envío tardó bastante.'],
+    4: ['Muy buena figura, bien pintada.', 'Buena relación calidad-precio.'],
+    5: ['¡Preciosa! Queda genial en la estantería.', 'Calidad excelente, repetiré seguro.'],
+}
+RATING_WEIGHTS = [3, 4, 10, 33, 50]
+
+
+class _Weighted:
+    """ random.choices con los pesos acumulados precalculados (mucho más rápido en bucles grandes) """
+
+    def __init__(self, values, weights):
+        self.values = values
+        self.cum_weights = list(accumulate(weights))
+
+    def pick(self, rng):
+        return rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(batch_size, total - start)
+
+
+def _insert_returning_ids(session, model, rows):
+    return list(session.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows))
+
+
+def _role_ids(session):
+    roles = {rol.type: rol.id for rol in session.query(Rol).all()}
+    for role in (Role.client, Role.seller):
+        if role not in roles:
+            rol = Rol(type=role)
+            session.add(rol)
+            session.flush()
+            roles[role] = rol.id
+    session.commit()
+    return roles
+
+
+class DatasetGenerator:
+
+    def __init__(self, seed=42, batch_size=5000, reference_date=None, log=print):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.reference_date = reference_date or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.log = log
+        self.session = db.session
+        self.series = _Weighted(SERIES, [weight for _, weight, _ in SERIES])
+        self.manufacturers = _Weighted(MANUFACTURERS, [weight for _, weight, _ in MANUFACTURERS])
+        self.ratings = _Weighted([1, 2, 3, 4, 5], RATING_WEIGHTS)
+
+    def _past(self, max_days):
+        return self.reference_date - timedelta(seconds=self.rng.randrange(max_days * 86400))
+
+    def _report(self, label, count, start):
+        elapsed = time.perf_counter() - start
+        self.log(f'{label}: {count} en {elapsed:.1f}s ({count / elapsed if elapsed else 0:,.0f}/s)')
+
+    # --- usuarios ------------------------------------------------------
+
+    def users(self, count):
+        """ Crea los usuarios con una dirección por defecto; devuelve (ids clientes, {id cliente: id dirección}, ids vendedores) """
+        start = time.perf_counter()
+        roles = _role_ids(self.session)
+        client_ids, seller_ids, address_ids = [], [], {}
+        # Sin restricción única en la contraseña basta un hash para todos
+        password = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
+
+        for offset, size in _batches(count, self.batch_size):
+            rows = []
+            for n in range(offset, offset + size):
+                first_name = self.rng.choice(FIRST_NAMES)
+                last_name = self.rng.choice(LAST_NAMES)
+                is_seller = self.rng.random() < SELLER_RATIO or n == 0
+                rows.append({
+                    'user_name': f'seed{self.seed}_user{n}',
+                    'first_name': first_name,
+                    'last_name': last_name,
+                    'email': f'seed{self.seed}_user{n}@example.com',
+                    'password': password,
+                    'rol_id': roles[Role.seller] if is_seller else roles[Role.client],
+                    'img': None,
+                })
+            user_ids = _insert_returning_ids(self.session, User, rows)
+
+            addresses = []
+            for user_id, row in zip(user_ids, rows):
+                city, province, postal_prefix = self.rng.choice(CITIES)
+                addresses.append({
+                    'user_id': user_id,
+                    'street': self.rng.choice(STREETS),
+                    'number': str(self.rng.randint(1, 200)),
+                    'apartment': f'{self.rng.randint(1, 9)}º {self.rng.choice("ABCD")}' if self.rng.random() < 0.6 else None,
+                    'city': city,
+                    'province': province,
+                    'postal_code': f'{postal_prefix}{self.rng.randint(0, 999):03d}',
+                    'country': 'España',
+                    'phone': f'6{self.rng.randint(0, 99999999):08d}',
+                    'is_default': True,
+                })
+            for user_id, address_id, row in zip(user_ids, _insert_returning_ids(self.session, Address, addresses), rows):
+                if row['rol_id'] == roles[Role.seller]:
+                    seller_ids.append(user_id)
+                else:
+                    client_ids.append(user_id)
+                    address_ids[user_id] = address_id
+            self.session.commit()
+
+        self._report('Usuarios', count, start)
+        return client_ids, address_ids, seller_ids
+
+    # --- productos -----------------------------------------------------
+
+    def _product(self, n, seller):
+        series, _, characters = self.series.pick(self.rng)
+        manufacturer, _, collections = self.manufacturers.pick(self.rng)
+        character = self.rng.choice(characters)
+        figure_type = self.rng.choice(FIGURE_TYPES)
+        # Precios con cola larga: muchas figuras baratas y pocas estatuas caras
+        price = round(min(max(self.rng.lognormvariate(3.6, 0.6), 4.99), 899.0), 2)
+        on_sale = self.rng.random() < 0.15
+        created_at = self._past(730)
+        product = {
+            'name': f'{figure_type} {character} {series} #{n}',
+            'description': f'{figure_type.capitalize()} de {character.title()} ({series.title()}) '
+                           f'fabricada por {manufacturer.title()}.',
+            'images': [f'https://picsum.photos/seed/kurisu{self.seed}-{n}-{i}/600/800'
+                       for i in range(self.rng.randint(1, 4))],
+            'price': round(price * 0.8, 2) if on_sale else price,
+            'original_price': price if on_sale else None,
+            'on_sale': on_sale,
+            'review': None,
+            'user_id': seller,
+            'status': self.rng.random() < 0.95,
+            'created_at': created_at,
+            'updated_at': created_at,
+            'sale_updated_at': self._past(60) if on_sale else None,
+        }
+        details = {
+            'manufacturer': manufacturer,
+            'collection': self.rng.choice(collections),
+            'anime_series': series,
+            'character': character,
+        }
+        return product, details
+
+    def products(self, count, seller_ids):
+        """ Devuelve [(id, precio)] de los productos activos, para generar pagos """
+        start = time.perf_counter()
+        # Pocos vendedores concentran la mayoría del catálogo
+        sellers = _Weighted(seller_ids, [1 / (rank + 1) for rank in range(len(seller_ids))])
+        active = []
+
+        for offset, size in _batches(count, self.batch_size):
+            generated = [self._product(n, sellers.pick(self.rng)) for n in range(offset, offset + size)]
+            product_ids = _insert_returning_ids(self.session, Product, [product for product, _ in generated])
+            self.session.execute(
+                insert(ProductTechnicalDetails),
+                [{**details, 'product_id': product_id} for product_id, (_, details) in zip(product_ids, generated)]
+            )
+            mark_products_changed(self.session, product_ids)
+            self.session.commit()
+
+            active += [(product_id, product['price'])
+                       for product_id, (product, _) in zip(product_ids, generated) if product['status']]
+            if size == self.batch_size:
+                self._report('  productos', offset + size, start)
+
+        self._report('Productos', count, start)
+        return active
+
+    # --- pagos y reseñas -----------------------------------------------
+
+    def payments(self, count, client_ids, address_ids, products):
+        """ Devuelve [(id pago, id cliente, ids de producto)] """
+        start = time.perf_counter()
+        # Los productos más populares se venden mucho más (distribución tipo Zipf)
+        popular = _Weighted(products, [1 / (rank + 1) ** 0.8 for rank in range(len(products))])
+        created = []
+
+        for offset, size in _batches(count, self.batch_size):
+            rows, bought = [], []
+            for n in range(offset, offset + size):
+                client_id = self.rng.choice(client_ids)
+                lines = {}
+                for _ in range(self.rng.choices([1, 2, 3, 4], weights=[55, 25, 12, 8])[0]):
+                    product_id, price = popular.pick(self.rng)
+                    quantity, _ = lines.get(product_id, (0, price))
+                    lines[product_id] = (quantity + 1, price)
+                rows.append({
+                    'stripe_payment_id': f'pi_seed{self.seed}_{n:08d}',
+                    'user_id': client_id,
+                    'shipping_address_id': address_ids.get(client_id),
+                    'product_ids': ','.join(str(product_id) for product_id in lines),
+                    'product_quantities': ','.join(str(quantity) for quantity, _ in lines.values()),
+                    'amount': round(sum(quantity * price for quantity, price in lines.values()), 2),
+                    'currency': 'eur',
+                    'created_at': self._past(365),
+                })
+                bought.append((client_id, list(lines)))
+            payment_ids = _insert_returning_ids(self.session, StripePay, rows)
+            self.session.commit()
+            created += [(payment_id, client_id, product_ids)
+                        for payment_id, (client_id, product_ids) in zip(payment_ids, bought)]
+
+        self._report('Pagos', count, start)
+        return created
+
+    def reviews(self, count, payments):
+        start = time.perf_counter()
+        # Solo se reseña lo que se ha comprado: cada reseña sale de un pago distinto
+        chosen = self.rng.sample(payments, min(count, len(payments)))
+
+        for offset, size in _batches(len(chosen), self.batch_size):
+            rows = []
+            for payment_id, client_id, product_ids in chosen[offset:offset + size]:
+                rate = self.ratings.pick(self.rng)
+                rows.append({
+                    'stripe_id': payment_id,
+                    'client_id': client_id,
+                    'product_id': self.rng.choice(product_ids),
+                    'client_rate': rate,
+                    'comment': self.rng.choice(REVIEW_COMMENTS[rate]),
+                    'created_at': self._past(300),
+                })
+            self.session.execute(insert(Review), rows)
+            self.session.commit()
+
+        # Nota media de cada producto reseñado
+        products = Product.__table__
+        reviews = Review.__table__
+        reviewed_ids = self.session.scalars(select(reviews.c.product_id).distinct()).all()
+        self.session.execute(
+            update(products)
+            .where(products.c.id.in_(select(reviews.c.product_id)))
+            .values(review=select(func.round(func.avg(reviews.c.client_rate), 2))
+                    .where(reviews.c.product_id == products.c.id)
+                    .scalar_subquery())
+        )
+        mark_products_changed(self.session, reviewed_ids)
+        self.session.commit()
+        self._report('Reseñas', len(chosen), start)
+
+    def run(self, users, products, payments, reviews):
+        start = time.perf_counter()
+        client_ids, address_ids, seller_ids = self.users(users)
+        if not client_ids or not seller_ids:
+            raise ValueError('Hacen falta al menos un cliente y un vendedor: aumenta el número de usuarios')
+        active = self.products(products, seller_ids)
+        created = self.payments(payments, client_ids, address_ids, active) if active else []
+        self.reviews(reviews, created)
+        self.log(f'Datos generados en {time.perf_counter() - start:.1f}s (semilla {self.seed})')
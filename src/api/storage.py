@@ -0,0 +1,433 @@
+"""
+Almacenamiento de imágenes (productos y avatares) detrás de una interfaz
+común, con subidas en paralelo.
+
+Backends (IMAGE_STORAGE_BACKEND):
+- cloudinary: Cloudinary (por defecto), con las credenciales CLOUDINARY_*.
+- local: ficheros en IMAGE_STORAGE_PATH servidos en IMAGE_STORAGE_URL
+  (/media por defecto). Para desarrollo y tests, sin red;
+  IMAGE_STORAGE_LATENCY_MS simula la latencia de un servicio remoto.
+
+Una imagen por subir llega como data URI base64 (cuerpo JSON) o como
+ImageFile, un fichero ya validado (partes multipart, ver api/uploads.py).
+
+upload_many() sube las imágenes nuevas de una lista en un pool de
+IMAGE_UPLOAD_WORKERS hilos compartido por el proceso. Cada subida tiene
+IMAGE_UPLOAD_TIMEOUT segundos contados desde que empieza en su hilo (no
+desde que se encola): lo aplica el propio backend en la petición y se
+comprueba al terminar. Si alguna falla o no termina a tiempo se borran las
+que sí se subieron y se lanza ImageUploadError con la posición de la imagen.
+
+Con IMAGE_UPLOAD_MODE=async las rutas no suben nada: encolan la subida para
+`flask worker` (api.image_jobs).
+
+Con IMAGE_DEDUP (activado por defecto) cada imagen nueva se identifica por
+el SHA-256 de su contenido: si ya está en la tabla image_asset se usa su URL
+sin subirla, y las repetidas dentro de una misma lista se suben una vez. Las
+que se suben se registran en db.session con sus dimensiones; las guarda el
+commit del llamador.
+"""
+import base64
+import binascii
+import glob
+import hashlib
+import logging
+import os
+import shutil
+import struct
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from io import BytesIO
+from flask import send_from_directory
+from sqlalchemy.dialects import postgresql, sqlite
+from api.database.db import db
+from api.models.ImageAsset import ImageAsset
+from api.timing import timed
+import cloudinary
+import cloudinary.api
+import cloudinary.uploader
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_IMAGES_FOLDER = 'kurisushop_products'
+USER_IMAGES_FOLDER = 'kurisushop_users'
+DATA_URI_PREFIX = 'data:image'
+EXTENSIONS = {'jpeg': 'jpg', 'svg+xml': 'svg'}
+# Bytes del principio del fichero con los que se sacan las dimensiones
+DIMENSIONS_BYTES = 64 * 1024
+HASH_CHUNK_BYTES = 1024 * 1024
+# Marcadores SOF de JPEG (los que llevan alto y ancho)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Límites de la Admin API de Cloudinary por llamada
+LIST_PAGE_SIZE = 500
+DESTROY_BATCH_SIZE = 100
+
+
+class ImageUploadError(Exception):
+
+    def __init__(self, index, cause):
+        super().__init__(f'Error subiendo la imagen {index}: {cause}')
+        self.index = index
+        self.cause = cause
+
+
+def decode_data_uri(data):
+    """ 'data:image/png;base64,...' -> (bytes, extensión) """
+    header, _, payload = data.partition(',')
+    if not header.startswith(DATA_URI_PREFIX + '/') or not header.endswith(';base64'):
+        raise ValueError('La imagen no es un data URI base64')
+    subtype = header[len(DATA_URI_PREFIX) + 1:-len(';base64')]
+    try:
+        content = base64.b64decode(payload, validate=True)
+    except binascii.Error:
+        raise ValueError('Base64 no válido')
+    return content, EXTENSIONS.get(subtype, subtype)
+
+
+class ImageFile:
+    """ Imagen en un fichero abierto (p. ej. el SpooledTemporaryFile de una parte multipart) """
+
+    def __init__(self, stream, mimetype, filename=None):
+        self.stream = stream
+        self.mimetype = mimetype
+        self.filename = filename
+
+    @property
+    def extension(self):
+        subtype = self.mimetype.partition('/')[2]
+        return EXTENSIONS.get(subtype, subtype)
+
+    def open(self):
+        """ El fichero desde el principio """
+        self.stream.seek(0)
+        return self.stream
+
+    def to_data_uri(self):
+        return f'data:{self.mimetype};base64,' + base64.b64encode(self.open().read()).decode()
+
+
+def is_new_image(image):
+    """ ImageFile o data URI; el resto (URLs) son imágenes ya subidas """
+    return isinstance(image, ImageFile) or image.startswith(DATA_URI_PREFIX)
+
+
+def is_image_url(image):
+    """ URL de una imagen ya subida: absoluta o, con el backend local, una ruta como /media/... """
+    return not is_new_image(image) and image.startswith(('http', '/'))
+
+
+def image_digest(image):
+    """ (SHA-256 del contenido, tamaño en bytes) de un ImageFile o data URI """
+    if isinstance(image, ImageFile):
+        digest, size = hashlib.sha256(), 0
+        stream = image.open()
+        for chunk in iter(lambda: stream.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+            size += len(chunk)
+        return digest.hexdigest(), size
+    content, _ = decode_data_uri(image)
+    return hashlib.sha256(content).hexdigest(), len(content)
+
+
+def image_dimensions(head):
+    """ (ancho, alto) a partir de los primeros bytes de un PNG, GIF, WebP o JPEG; (None, None) si no se sabe """
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and len(head) >= 24:
+        return struct.unpack('>II', head[16:24])
+    if head[:6] in (b'GIF87a', b'GIF89a') and len(head) >= 10:
+        return struct.unpack('<HH', head[6:10])
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP' and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(head[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            return int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1
+    if head[:2] == b'\xff\xd8':
+        index = 2
+        while index + 9 <= len(head) and head[index] == 0xFF:
+            marker = head[index + 1]
+            if marker == 0xFF:
+                index += 1
+            elif marker in JPEG_SOF_MARKERS:
+                height, width = struct.unpack('>HH', head[index + 5:index + 9])
+                return width, height
+            else:
+                index += 2 + struct.unpack('>H', head[index + 2:index + 4])[0]
+    return None, None
+
+
+class CloudinaryStorage:
+    name = 'cloudinary'
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        cloudinary.config(
+            cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
+            api_key=os.getenv('CLOUDINARY_API_KEY'),
+            api_secret=os.getenv('CLOUDINARY_API_SECRET')
+        )
+
+    def upload(self, data, folder):
+        if isinstance(data, ImageFile):
+            # El SDK lee el fichero al enviarlo; filename solo sirve para que no se llame "stream"
+            result = cloudinary.uploader.upload(data.open(), folder=folder, timeout=self.timeout,
+                                                filename=data.filename or f'image.{data.extension}')
+        else:
+            result = cloudinary.uploader.upload(data, folder=folder, timeout=self.timeout)
+        return {'url': result.get('secure_url'), 'public_id': result.get('public_id'),
+                'width': result.get('width'), 'height': result.get('height')}
+
+    def destroy(self, public_id):
+        cloudinary.uploader.destroy(public_id, timeout=self.timeout)
+
+    def list_images(self, folder):
+        """ Imágenes de la carpeta (Admin API, páginas de LIST_PAGE_SIZE) """
+        options = {'type': 'upload', 'prefix': f'{folder}/', 'max_results': LIST_PAGE_SIZE}
+        while True:
+            page = cloudinary.api.resources(timeout=self.timeout, **options)
+            for resource in page.get('resources', []):
+                yield {'public_id': resource['public_id'], 'url': resource.get('secure_url'),
+                       'created_at': datetime.strptime(resource['created_at'], '%Y-%m-%dT%H:%M:%SZ')}
+            if not page.get('next_cursor'):
+                return
+            options['next_cursor'] = page['next_cursor']
+
+    def destroy_many(self, public_ids):
+        """ Borra hasta DESTROY_BATCH_SIZE imágenes en una llamada y devuelve las borradas """
+        result = cloudinary.api.delete_resources(list(public_ids), timeout=self.timeout)
+        return [public_id for public_id, status in result.get('deleted', {}).items() if status == 'deleted']
+
+
+class LocalStorage:
+    """ Ficheros en disco con la misma interfaz que Cloudinary """
+    name = 'local'
+
+    def __init__(self, path, base_url, latency=0.0, timeout=None):
+        self.path = path
+        self.base_url = base_url.rstrip('/')
+        self.latency = latency
+        self.timeout = timeout
+
+    def upload(self, data, folder):
+        if isinstance(data, ImageFile):
+            source, extension = data.open(), data.extension
+        else:
+            content, extension = decode_data_uri(data)
+            source = BytesIO(content)
+        if self.latency:
+            # Como el timeout de una petición HTTP: se corta a los timeout segundos
+            if self.timeout and self.latency > self.timeout:
+                time.sleep(self.timeout)
+                raise TimeoutError('tiempo de espera agotado')
+            time.sleep(self.latency)
+        public_id = f'{folder}/{uuid.uuid4().hex}'
+        filename = f'{public_id}.{extension}'
+        width, height = image_dimensions(source.read(DIMENSIONS_BYTES))
+        source.seek(0)
+        os.makedirs(os.path.join(self.path, folder), exist_ok=True)
+        with open(os.path.join(self.path, filename), 'wb') as image_file:
+            shutil.copyfileobj(source, image_file)
+        return {'url': f'{self.base_url}/{filename}', 'public_id': public_id, 'width': width, 'height': height}
+
+    def destroy(self, public_id):
+        if self.latency:
+            time.sleep(self.latency)
+        for filename in glob.glob(os.path.join(self.path, glob.escape(public_id)) + '.*'):
+            os.remove(filename)
+
+    def list_images(self, folder):
+        try:
+            entries = list(os.scandir(os.path.join(self.path, folder)))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_file():
+                yield {'public_id': f'{folder}/{os.path.splitext(entry.name)[0]}',
+                       'url': f'{self.base_url}/{folder}/{entry.name}',
+                       'created_at': datetime.utcfromtimestamp(entry.stat().st_mtime)}
+
+    def destroy_many(self, public_ids):
+        # Una llamada por lote, como la Admin API
+        if self.latency:
+            time.sleep(self.latency)
+        deleted = []
+        for public_id in public_ids:
+            filenames = glob.glob(os.path.join(self.path, glob.escape(public_id)) + '.*')
+            for filename in filenames:
+                os.remove(filename)
+            if filenames:
+                deleted.append(public_id)
+        return deleted
+
+
+IMAGE_UPLOAD_MODES = ('sync', 'async')
+
+
+class ImageStorage:
+
+    def __init__(self):
+        self.backend = None
+        self.async_uploads = False
+        self.dedup = True
+        self.workers = 4
+        self.timeout = 30
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        backend = app.config.setdefault(
+            'IMAGE_STORAGE_BACKEND', os.getenv('IMAGE_STORAGE_BACKEND', 'cloudinary'))
+        self.workers = app.config.setdefault(
+            'IMAGE_UPLOAD_WORKERS', int(os.getenv('IMAGE_UPLOAD_WORKERS', 4)))
+        self.timeout = app.config.setdefault(
+            'IMAGE_UPLOAD_TIMEOUT', float(os.getenv('IMAGE_UPLOAD_TIMEOUT', 30)))
+        mode = app.config.setdefault('IMAGE_UPLOAD_MODE', os.getenv('IMAGE_UPLOAD_MODE', 'sync'))
+        if mode not in IMAGE_UPLOAD_MODES:
+            raise RuntimeError(f"IMAGE_UPLOAD_MODE no válido: {mode} (opciones: {', '.join(IMAGE_UPLOAD_MODES)})")
+        self.async_uploads = mode == 'async'
+        self.dedup = app.config.setdefault(
+            'IMAGE_DEDUP', os.getenv('IMAGE_DEDUP', '1').lower() in ('1', 'true', 'yes'))
+
+        if backend == 'cloudinary':
+            self.backend = CloudinaryStorage(self.timeout)
+        elif backend == 'local':
+            path = app.config.setdefault(
+                'IMAGE_STORAGE_PATH', os.getenv('IMAGE_STORAGE_PATH', '/tmp/kurisu_media'))
+            base_url = app.config.setdefault('IMAGE_STORAGE_URL', os.getenv('IMAGE_STORAGE_URL', '/media'))
+            latency = app.config.setdefault(
+                'IMAGE_STORAGE_LATENCY_MS', int(os.getenv('IMAGE_STORAGE_LATENCY_MS', 0)))
+            self.backend = LocalStorage(path, base_url, latency / 1000, self.timeout)
+            if base_url.startswith('/'):
+                def media(filename):
+                    return send_from_directory(path, filename)
+                app.add_url_rule(f"{base_url.rstrip('/')}/<path:filename>", 'media', media)
+        else:
+            raise RuntimeError(f"IMAGE_STORAGE_BACKEND no válido: {backend}")
+
+    @property
+    def executor(self):
+        # Se crea al usarse: con gunicorn, ya dentro de cada worker
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='image-upload')
+        return self._executor
+
+    def upload(self, data, folder):
+        """ Sube una imagen (data URI o ImageFile) y devuelve {'url', 'public_id'} """
+        with timed('storage'):
+            if not self.dedup:
+                return self.backend.upload(data, folder)
+            digest, size = image_digest(data)
+            asset = db.session.get(ImageAsset, digest)
+            if asset is not None:
+                return {'url': asset.url, 'public_id': asset.public_id}
+            result = self.backend.upload(data, folder)
+            self._register(digest, size, result)
+            return result
+
+    def _known(self, digests):
+        """ {sha256: url} de las imágenes ya registradas """
+        if not digests:
+            return {}
+        return dict(db.session.query(ImageAsset.sha256, ImageAsset.url).filter(ImageAsset.sha256.in_(digests)))
+
+    def _register(self, digest, size, result):
+        values = {'sha256': digest, 'url': result['url'], 'public_id': result['public_id'],
+                  'width': result.get('width'), 'height': result.get('height'), 'size': size,
+                  'created_at': datetime.utcnow()}
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            # Otra petición puede haber registrado la misma imagen a la vez: se queda la primera
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            db.session.execute(insert(ImageAsset).values(**values).on_conflict_do_nothing(index_elements=['sha256']))
+        else:
+            db.session.merge(ImageAsset(**values))
+
+    def destroy(self, public_id):
+        with timed('storage'):
+            self.backend.destroy(public_id)
+
+    def list_images(self, folder):
+        """ {'public_id', 'url', 'created_at'} de cada imagen guardada en la carpeta """
+        return self.backend.list_images(folder)
+
+    def destroy_many(self, public_ids):
+        with timed('storage'):
+            return self.backend.destroy_many(public_ids)
+
+    def _destroy_quietly(self, public_id):
+        try:
+            self.backend.destroy(public_id)
+        except Exception as exc:
+            logger.warning('No se pudo borrar la imagen %s: %s', public_id, exc)
+
+    def _upload_with_timeout(self, data, folder):
+        """ Subida en un hilo del pool: el plazo cuenta desde aquí, no desde que se encoló """
+        started = time.monotonic()
+        result = self.backend.upload(data, folder)
+        # El timeout del backend es por operación de red: una subida lenta pero constante puede pasarse
+        if time.monotonic() - started > self.timeout:
+            self._destroy_quietly(result['public_id'])
+            raise TimeoutError('tiempo de espera agotado')
+        return result
+
+    def upload_many(self, images, folder):
+        """
+        Sube en paralelo las imágenes nuevas de la lista y devuelve la
+        lista de URLs en el mismo orden; el resto de elementos se devuelven
+        tal cual. Si falla alguna no queda ninguna subida.
+        """
+        new_images = [index for index, data in enumerate(images) if is_new_image(data)]
+        if not new_images:
+            return list(images)
+
+        with timed('storage'):
+            # Clave de cada imagen: el SHA-256 con IMAGE_DEDUP, su posición sin él
+            keys, sizes = {}, {}
+            for index in new_images:
+                if not self.dedup:
+                    keys[index] = index
+                    continue
+                try:
+                    keys[index], sizes[keys[index]] = image_digest(images[index])
+                except ValueError as exc:
+                    raise ImageUploadError(index, exc)
+            urls = self._known(set(keys.values())) if self.dedup else {}
+
+            pending = {}
+            for index in new_images:
+                if keys[index] not in urls and keys[index] not in pending:
+                    pending[keys[index]] = (index, self.executor.submit(self._upload_with_timeout, images[index], folder))
+            # Sin plazo conjunto: cada subida tiene el suyo dentro de su hilo
+            wait([future for _, future in pending.values()])
+
+            failed = None
+            uploaded = {}
+            for key, (index, future) in pending.items():
+                if future.exception() is not None:
+                    failed = failed or ImageUploadError(index, future.exception())
+                else:
+                    uploaded[key] = future.result()
+
+            if failed is not None:
+                # Como antes: si falla alguna imagen, eliminar las ya subidas
+                wait([self.executor.submit(self._destroy_quietly, result['public_id'])
+                      for result in uploaded.values()])
+                raise failed
+
+            for key, result in uploaded.items():
+                urls[key] = result['url']
+                if self.dedup:
+                    self._register(key, sizes[key], result)
+
+        return [urls[keys[index]] if index in keys else data for index, data in enumerate(images)]
+
+
+image_storage = ImageStorage()
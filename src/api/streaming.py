@@ -0,0 +1,33 @@
+"""
+Exportación en streaming (NDJSON: un objeto JSON por línea).
+
+Se activa con ?stream=1 o con "Accept: application/x-ndjson". La consulta se
+recorre con yield_per, que en PostgreSQL usa un cursor del lado del servidor,
+y cada fila se serializa y se envía en cuanto se lee: la memoria no crece con
+el tamaño de la tabla y el primer byte sale antes de leer la última fila.
+"""
+from flask import current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+STREAM_BATCH_SIZE = 500
+
+
+def wants_stream():
+    if request.args.get('stream') in ('1', 'true'):
+        return True
+    # Con "Accept: */*" gana JSON: solo se hace streaming si se pide NDJSON explícitamente
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_response(query, serialize, batch_size=STREAM_BATCH_SIZE):
+    """ Respuesta en streaming: serialize(fila) por cada fila de la consulta """
+    json = current_app.json
+
+    def generate():
+        for row in query.yield_per(batch_size):
+            yield json.dumps(serialize(row)) + '\n'
+
+    response = current_app.response_class(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,320 @@
+"""
+Autocompletado tolerante a errores para palabras de los nombres de producto,
+series, personajes, fabricantes y colecciones.
+
+El índice vive en memoria de cada proceso y solo guarda términos distintos:
+cada valor de las facetas (series, personaje...) y cada palabra de los
+nombres de producto, con el número de productos activos que lo usan. Por
+término hay un trie de prefijos (desde el principio y desde cada palabra) con
+los MAX_SUGGESTIONS mejores términos precalculados en cada nodo, y listas de
+trigramas para sugerir aunque el usuario se equivoque al escribir.
+
+Las peticiones solo leen un _Snapshot inmutable. Lo construye un hilo del
+proceso fuera de las peticiones y lo sustituye de golpe: entero cada
+SUGGEST_REBUILD_SECONDS (recoge cambios de otros procesos) y, entre medias,
+aplicando los productos que cambian en este proceso (api.changes).
+"""
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import chain
+from flask import current_app
+from sqlalchemy import select
+from api.database.db import db
+from api.models.Product import Product
+from api.models.ProductTechnicalDetails import ProductTechnicalDetails
+from api.changes import on_products_committed
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_FIELDS = {
+    'product': Product.name,
+    'series': ProductTechnicalDetails.anime_series,
+    'character': ProductTechnicalDetails.character,
+    'manufacturer': ProductTechnicalDetails.manufacturer,
+    'collection': ProductTechnicalDetails.collection,
+}
+
+# Tope de limit en GET /suggest: lo que se precalcula en cada nodo del trie
+MAX_SUGGESTIONS = 20
+MIN_SIMILARITY = 0.3
+# Términos que se puntúan como mucho en la búsqueda aproximada
+MAX_FUZZY_CANDIDATES = 200
+# Las palabras más cortas de los nombres no se sugieren (y sin letras tampoco: "#1495")
+MIN_TOKEN_LENGTH = 3
+TOKEN_PUNCTUATION = '#.,;:()[]"\'!?¡¿/'
+# Espera mínima entre dos actualizaciones del índice por productos cambiados
+REFRESH_INTERVAL_SECONDS = 1.0
+# La primera petición del proceso espera como mucho esto a que esté el índice
+FIRST_BUILD_WAIT_SECONDS = 5.0
+
+
+@lru_cache(maxsize=65536)
+def normalize(value):
+    """ Mayúsculas, sin tildes y con espacios simples: 'Évangelion ' -> 'EVANGELION' """
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.upper().split())
+
+
+def trigrams(value):
+    padded = f'  {value} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def name_tokens(name):
+    """ {palabra normalizada: palabra original} de un nombre de producto """
+    tokens = {}
+    # normalize() no cambia el número de palabras: se normaliza el nombre entero una vez
+    for word, token in zip(name.split(), normalize(name).split()):
+        token = token.strip(TOKEN_PUNCTUATION)
+        if len(token) >= MIN_TOKEN_LENGTH and any(char.isalpha() for char in token):
+            tokens.setdefault(token, word.strip(TOKEN_PUNCTUATION))
+    return tokens
+
+
+def _word_starts(text):
+    return [i + 1 for i, char in enumerate(text) if char == ' ']
+
+
+class _TrieNode:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        # Ids de los mejores términos bajo este nodo, ya ordenados
+        self.top = []
+
+
+class _Snapshot:
+    """ Índice inmutable de unos conteos {(tipo, texto normalizado): productos} """
+
+    def __init__(self, counts, display):
+        # Una palabra de los nombres que además es valor de una faceta ("NARUTO") se sugiere una vez, como faceta
+        facet_texts = {text for kind, text in counts if kind != 'product'}
+        keys = [key for key in counts if key[0] != 'product' or key[1] not in facet_texts]
+        # Los ids siguen el orden de relevancia: al insertar en ese orden, los
+        # primeros MAX_SUGGESTIONS de cada nodo ya son los mejores
+        self.keys = sorted(keys, key=lambda key: (-counts[key], key[1]))
+        self.counts = [counts[key] for key in self.keys]
+        self.display = [display[key] for key in self.keys]
+        self.gram_counts = []
+        self._starts = _TrieNode()
+        self._words = _TrieNode()
+        self._grams = defaultdict(list)
+
+        for key_id, (_, text) in enumerate(self.keys):
+            self._insert(self._starts, text, key_id)
+            # Cada palabra interior es otro punto de entrada: "PIE" encuentra "ONE PIECE"
+            for start in _word_starts(text):
+                self._insert(self._words, text[start:], key_id)
+            grams = trigrams(text)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self._grams[gram].append(key_id)
+
+    @staticmethod
+    def _insert(root, text, key_id):
+        node = root
+        for char in text:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+            if len(node.top) < MAX_SUGGESTIONS and (not node.top or node.top[-1] != key_id):
+                node.top.append(key_id)
+
+    @staticmethod
+    def _top(root, query):
+        node = root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.top
+
+    def prefix_matches(self, query, limit):
+        """ Primero los términos que empiezan por query y después los que tienen una palabra que empieza por query """
+        found = self._top(self._starts, query)[:limit]
+        if len(found) < limit:
+            seen = set(found)
+            found += [key_id for key_id in self._top(self._words, query) if key_id not in seen][:limit - len(found)]
+        return found
+
+    def fuzzy_matches(self, query, exclude, limit):
+        query_grams = trigrams(query)
+        postings = [self._grams[gram] for gram in query_grams if gram in self._grams]
+        shared = Counter(chain.from_iterable(postings))
+        # Con Jaccard >= MIN_SIMILARITY hay que compartir al menos MIN_SIMILARITY * |trigramas de la consulta|
+        min_common = math.ceil(MIN_SIMILARITY * len(query_grams))
+
+        scored = []
+        for key_id, common in shared.most_common(MAX_FUZZY_CANDIDATES):
+            if common < min_common:
+                break
+            if key_id in exclude:
+                continue
+            similarity = common / (len(query_grams) + self.gram_counts[key_id] - common)
+            if similarity >= MIN_SIMILARITY:
+                scored.append((similarity, self.counts[key_id], -key_id))
+        return [-key_id for _, _, key_id in heapq.nlargest(limit, scored)]
+
+
+class SuggestIndex:
+
+    def __init__(self, rebuild_seconds=300):
+        self.rebuild_seconds = rebuild_seconds
+        self._snapshot = None
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._thread = None
+        self._thread_pid = None
+        # Conteos a partir de los que se construyen los snapshots; solo los
+        # toca quien tiene _build_lock (el hilo del índice o rebuild())
+        self._build_lock = threading.Lock()
+        self._counts = Counter()
+        self._display = {}
+        self._product_keys = {}
+        self._built_at = None
+
+    # --- mantenimiento -------------------------------------------------
+
+    def mark_dirty(self, product_ids):
+        with self._lock:
+            self._dirty.update(product_ids)
+        self._wake.set()
+
+    def _rows(self, product_ids=None):
+        stmt = select(Product.id, *SUGGEST_FIELDS.values())\
+            .outerjoin(ProductTechnicalDetails)\
+            .where(Product.status == True)
+        if product_ids is not None:
+            stmt = stmt.where(Product.id.in_(product_ids))
+        return db.session.execute(stmt).all()
+
+    def _product_terms(self, row):
+        terms = {}
+        name, *facets = row[1:]
+        if name:
+            terms.update((('product', token), word) for token, word in name_tokens(name).items())
+        for kind, value in zip(list(SUGGEST_FIELDS)[1:], facets):
+            if value and normalize(value):
+                terms.setdefault((kind, normalize(value)), value.strip())
+        return terms
+
+    def _set_product(self, product_id, terms):
+        old_keys = self._product_keys.pop(product_id, set())
+        keys = set(terms)
+        for key in old_keys - keys:
+            self._counts[key] -= 1
+            if self._counts[key] <= 0:
+                del self._counts[key]
+                self._display.pop(key, None)
+        for key in keys - old_keys:
+            self._counts[key] += 1
+            self._display.setdefault(key, terms[key])
+        if keys:
+            self._product_keys[product_id] = keys
+
+    def _publish(self):
+        self._snapshot = _Snapshot(self._counts, self._display)
+        self._ready.set()
+
+    def rebuild(self):
+        """ Relee todos los productos activos y publica un índice nuevo (necesita contexto de app) """
+        with self._build_lock:
+            with self._lock:
+                self._dirty.clear()
+            self._counts, self._display, self._product_keys = Counter(), {}, {}
+            for row in self._rows():
+                self._set_product(row[0], self._product_terms(row))
+            self._publish()
+            self._built_at = time.monotonic()
+
+    def _apply_dirty(self):
+        with self._lock:
+            product_ids, self._dirty = self._dirty, set()
+        if not product_ids:
+            return
+        with self._build_lock:
+            rows = {row[0]: row for row in self._rows(product_ids)}
+            for product_id in product_ids:
+                row = rows.get(product_id)
+                # Productos borrados o desactivados desaparecen de las sugerencias
+                self._set_product(product_id, self._product_terms(row) if row else {})
+            self._publish()
+
+    def _run(self, app):
+        with app.app_context():
+            while True:
+                try:
+                    if self._built_at is None or time.monotonic() - self._built_at >= self.rebuild_seconds:
+                        self.rebuild()
+                    else:
+                        self._apply_dirty()
+                except Exception:
+                    logger.exception('Error actualizando el índice de sugerencias')
+                finally:
+                    db.session.remove()
+
+                next_rebuild = self.rebuild_seconds - (time.monotonic() - (self._built_at or time.monotonic()))
+                self._wake.wait(timeout=max(next_rebuild, REFRESH_INTERVAL_SECONDS))
+                self._wake.clear()
+                # Varios commits seguidos se aplican juntos
+                time.sleep(REFRESH_INTERVAL_SECONDS)
+
+    def _ensure_thread(self):
+        # Tras un fork (gunicorn) el hilo del padre no existe en el hijo
+        if self._thread is not None and self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(
+                target=self._run, args=(current_app._get_current_object(),),
+                name='suggest-index', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    # --- consultas -----------------------------------------------------
+
+    def suggest(self, q, limit=8):
+        query = normalize(q)
+        if not query:
+            return []
+
+        self._ensure_thread()
+        snapshot = self._snapshot
+        if snapshot is None:
+            self._ready.wait(FIRST_BUILD_WAIT_SECONDS)
+            snapshot = self._snapshot
+            if snapshot is None:
+                return []
+
+        limit = min(limit, MAX_SUGGESTIONS)
+        best = snapshot.prefix_matches(query, limit)
+        if len(best) < limit:
+            best += snapshot.fuzzy_matches(query, set(best), limit - len(best))
+
+        return [
+            {'value': snapshot.display[key_id], 'type': snapshot.keys[key_id][0], 'count': snapshot.counts[key_id]}
+            for key_id in best
+        ]
+
+
+suggest_index = SuggestIndex(
+    rebuild_seconds=int(os.getenv('SUGGEST_REBUILD_SECONDS', 300))
+)
+
+
+@on_products_committed
+def _mark_changed_products(product_ids):
+    suggest_index.mark_dirty(product_ids)
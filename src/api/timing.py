@@ -0,0 +1,173 @@
+"""
+Tiempos de cada petición: SQL, serialización, JSON y llamadas externas
+(bcrypt, Cloudinary...).
+
+- SQL: número de sentencias y tiempo acumulado, con eventos del engine (de
+  todos los binds, réplica incluida).
+- El resto se mide con `with timed('nombre'):` o envolviendo una función con
+  timed_calls(); projections.project() ya envuelve sus serializadores.
+
+Cada respuesta lleva una cabecera Server-Timing (si SERVER_TIMING=1; por
+defecto solo en modo debug) y las peticiones que superan SLOW_REQUEST_MS se
+registran como JSON con las SLOW_REQUEST_TOP_STATEMENTS sentencias más lentas.
+Las fases pueden solaparse: una carga perezosa dentro de serialize() cuenta
+en db y en serialize.
+"""
+import heapq
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_G_KEY = '_request_timings'
+MAX_STATEMENT_LENGTH = 500
+
+
+class RequestTimings:
+    """ Tiempos acumulados de una petición """
+
+    def __init__(self, top_statements):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.top_statements = top_statements
+        self._statements = []
+        self._counter = 0
+
+    def add(self, name, seconds, count=1):
+        phase = self.phases.get(name)
+        if phase is None:
+            self.phases[name] = [count, seconds]
+        else:
+            phase[0] += count
+            phase[1] += seconds
+
+    def add_statement(self, statement, seconds):
+        self.add('db', seconds)
+        # Montículo de tamaño fijo con las más lentas (el contador desempata)
+        self._counter += 1
+        entry = (seconds, self._counter, statement)
+        if len(self._statements) < self.top_statements:
+            heapq.heappush(self._statements, entry)
+        elif self._statements and seconds > self._statements[0][0]:
+            heapq.heapreplace(self._statements, entry)
+
+    def slowest_statements(self):
+        return [
+            {'ms': round(seconds * 1000, 2), 'statement': ' '.join(statement.split())[:MAX_STATEMENT_LENGTH]}
+            for seconds, _, statement in sorted(self._statements, reverse=True)
+        ]
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+def current_timings():
+    if not has_request_context():
+        return None
+    return g.get(_G_KEY)
+
+
+@contextmanager
+def timed(name):
+    """ Suma la duración del bloque a la fase `name` de la petición en curso """
+    timings = current_timings()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def timed_calls(name, fn):
+    """ Envuelve fn para sumar cada llamada a la fase `name` (pensado para llamadas por fila) """
+    timings = current_timings()
+    if timings is None:
+        return fn
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings.add(name, time.perf_counter() - start)
+    return wrapper
+
+
+class RequestTiming:
+
+    def __init__(self):
+        self.server_timing = False
+        self.slow_request_ms = 1000
+        self.top_statements = 5
+
+    def init_app(self, app, db):
+        """ Después de db.init_app() """
+        self.server_timing = app.config.setdefault(
+            'SERVER_TIMING', os.getenv('SERVER_TIMING', '1' if app.debug else '0') == '1')
+        self.slow_request_ms = app.config.setdefault(
+            'SLOW_REQUEST_MS', int(os.getenv('SLOW_REQUEST_MS', 1000)))
+        self.top_statements = app.config.setdefault(
+            'SLOW_REQUEST_TOP_STATEMENTS', int(os.getenv('SLOW_REQUEST_TOP_STATEMENTS', 5)))
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._timing_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_timing_start', None)
+        timings = current_timings()
+        if start is not None and timings is not None:
+            timings.add_statement(statement, time.perf_counter() - start)
+
+    def _start(self):
+        setattr(g, _G_KEY, RequestTimings(self.top_statements))
+
+    def _finish(self, response):
+        timings = current_timings()
+        if timings is None:
+            return response
+        elapsed = timings.elapsed()
+
+        if self.server_timing:
+            metrics = []
+            for name, (count, seconds) in timings.phases.items():
+                description = f';desc="{count} queries"' if name == 'db' else ''
+                metrics.append(f'{name};dur={seconds * 1000:.2f}{description}')
+            metrics.append(f'total;dur={elapsed * 1000:.2f}')
+            response.headers['Server-Timing'] = ', '.join(metrics)
+
+        if elapsed * 1000 >= self.slow_request_ms:
+            record = {
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'ms': round(elapsed * 1000, 2),
+                'phases': {
+                    name: {'count': count, 'ms': round(seconds * 1000, 2)}
+                    for name, (count, seconds) in timings.phases.items()
+                },
+                'slowest_statements': timings.slowest_statements(),
+            }
+            logger.warning('slow_request %s', json.dumps(record, ensure_ascii=False))
+        return response
+
+
+request_timing = RequestTiming()
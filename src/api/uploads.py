@@ -0,0 +1,159 @@
+"""
+Subida de imágenes en multipart/form-data, además del cuerpo JSON con data
+URIs base64 de siempre.
+
+Con multipart los ficheros no pasan por memoria como un único bloque:
+werkzeug escribe cada parte en un SpooledTemporaryFile que se queda en
+memoria hasta IMAGE_UPLOAD_SPOOL_BYTES y pasa a disco a partir de ahí, y la
+parte se corta (413) en cuanto supera IMAGE_UPLOAD_MAX_BYTES. El tipo se
+comprueba con python-magic sobre los primeros bytes, no con el Content-Type
+que manda el cliente: solo se aceptan IMAGE_UPLOAD_TYPES.
+
+    curl -H "Authorization: Bearer ..." -F name=Figura -F description=... \\
+         -F price=25 -F images=@front.jpg -F images=@back.png .../api/product/create
+
+Los campos de texto llevan los mismos nombres que en JSON. En las rutas con
+varias imágenes se pueden repetir campos "images" de texto con URLs ya
+subidas: quedan primero, en su orden, y detrás los ficheros.
+"""
+import os
+from tempfile import SpooledTemporaryFile
+from flask import Request, request
+from werkzeug.exceptions import RequestEntityTooLarge
+from api.storage import ImageFile
+
+try:
+    import magic
+except ImportError:
+    # python-magic necesita libmagic instalada en el sistema
+    magic = None
+
+DEFAULT_TYPES = 'image/jpeg,image/png,image/webp,image/gif'
+# Lo que se lee de cada fichero para averiguar su tipo
+SNIFF_BYTES = 2048
+# Margen para los campos de texto en el límite de la petición entera
+FORM_FIELDS_BYTES = 64 * 1024
+TRUE_VALUES = ('1', 'true', 'on', 'yes')
+
+# Si no hay libmagic, las firmas de los tipos habituales
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+class ImageRejected(Exception):
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def form_bool(value):
+    return value.lower() in TRUE_VALUES
+
+
+def form_float(value):
+    return float(value) if value else None
+
+
+def sniff_mimetype(head):
+    if magic is not None:
+        return magic.from_buffer(head, mime=True)
+    for signature, mimetype in _SIGNATURES:
+        if head.startswith(signature):
+            return mimetype
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+class LimitedSpooledFile(SpooledTemporaryFile):
+    """ En memoria hasta max_size y en disco después; pasado limit corta la petición """
+
+    def __init__(self, max_size, limit):
+        super().__init__(max_size=max_size, mode='w+b')
+        self.limit = limit
+        self.written = 0
+
+    def write(self, data):
+        self.written += len(data)
+        if self.written > self.limit:
+            raise RequestEntityTooLarge()
+        return super().write(data)
+
+
+class UploadRequest(Request):
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return LimitedSpooledFile(image_uploads.spool_bytes, image_uploads.max_bytes)
+
+
+class ImageUploads:
+
+    def __init__(self):
+        self.max_bytes = 10 * 1024 * 1024
+        self.spool_bytes = 512 * 1024
+        self.allowed_types = frozenset(DEFAULT_TYPES.split(','))
+
+    def init_app(self, app):
+        self.max_bytes = app.config.setdefault(
+            'IMAGE_UPLOAD_MAX_BYTES', int(os.getenv('IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)))
+        self.spool_bytes = app.config.setdefault(
+            'IMAGE_UPLOAD_SPOOL_BYTES', int(os.getenv('IMAGE_UPLOAD_SPOOL_BYTES', 512 * 1024)))
+        types = app.config.setdefault('IMAGE_UPLOAD_TYPES', os.getenv('IMAGE_UPLOAD_TYPES', DEFAULT_TYPES))
+        self.allowed_types = frozenset(value.strip() for value in types.split(',') if value.strip())
+        app.request_class = UploadRequest
+
+    def parse(self, field, max_files, converters=None):
+        """
+        Cuerpo de la petición como dict, venga en JSON o en multipart. En
+        multipart `field` es la lista de URLs de texto seguidas de los
+        ficheros (ImageFile), o con max_files=1 una sola imagen, y
+        converters ({campo: función}) da a los campos de texto el tipo que
+        tendrían en JSON. Lanza ImageRejected si algún fichero no vale.
+        """
+        if request.mimetype != 'multipart/form-data':
+            return request.get_json()
+
+        # Tope de la petición entera: max_files imágenes y los campos de texto
+        request.max_content_length = max_files * self.max_bytes + FORM_FIELDS_BYTES
+        try:
+            form, parts = request.form, request.files.getlist(field)
+        except RequestEntityTooLarge:
+            raise ImageRejected(
+                f'Cada imagen puede ocupar como mucho {self.max_bytes // (1024 * 1024)} MB', 413)
+
+        converters = converters or {}
+        body = {
+            key: converters[key](value) if key in converters else value
+            for key, value in form.items() if key != field
+        }
+        images = form.getlist(field) + self._image_files(parts)
+        if len(images) > max_files:
+            raise ImageRejected(f'Máximo {max_files} imágenes permitidas')
+        if max_files == 1:
+            if images:
+                body[field] = images[0]
+        elif images or field in form:
+            body[field] = images
+        return body
+
+    def _image_files(self, parts):
+        images = []
+        for index, part in enumerate(parts):
+            # Un <input type="file"> vacío llega como parte sin nombre ni contenido
+            if not part.filename:
+                continue
+            head = part.stream.read(SNIFF_BYTES)
+            part.stream.seek(0)
+            mimetype = sniff_mimetype(head)
+            if mimetype not in self.allowed_types:
+                raise ImageRejected(f'La imagen {index + 1} no es de un tipo permitido ({mimetype})', 415)
+            images.append(ImageFile(part.stream, mimetype, part.filename))
+        return images
+
+
+image_uploads = ImageUploads()
@@ -39,3 +39,83 @@ def generate_sitemap(app):
         <p>Start working on your project by following the <a href="https://start.4geeksacademy.com/starters/full-stack" target="_blank">Quick Start</a></p>
         <p>Remember to specify a real endpoint path like: </p>
         <ul style="text-align: left;">"""+links_html+"</ul></div>"
+
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 200
+
+
+def parse_keyset_args(args):
+    """
+    Lee los parámetros de paginación por cursor (?after=<id>&limit=<n>).
+    Devuelve (after, limit) o (None, None) si la petición no pide paginación.
+    """
+    if 'after' not in args and 'limit' not in args:
+        return None, None
+
+    try:
+        after = int(args.get('after', 0))
+        limit = int(args.get('limit', DEFAULT_PAGE_LIMIT))
+    except ValueError:
+        raise APIException('Los parámetros after y limit deben ser números enteros', 400)
+
+    if after < 0 or limit < 1:
+        raise APIException('Los parámetros after y limit deben ser positivos', 400)
+
+    return after, min(limit, MAX_PAGE_LIMIT)
+
+
+def parse_page_args(args, default_limit=DEFAULT_PAGE_LIMIT, max_limit=MAX_PAGE_LIMIT):
+    """
+    Lee los parámetros de paginación por páginas (?page=<n>&limit=<n>).
+    Devuelve (page, limit).
+    """
+    try:
+        page = int(args.get('page', 1))
+        limit = int(args.get('limit', default_limit))
+    except ValueError:
+        raise APIException('Los parámetros page y limit deben ser números enteros', 400)
+
+    if page < 1 or limit < 1:
+        raise APIException('Los parámetros page y limit deben ser positivos', 400)
+
+    return page, min(limit, max_limit)
+
+
+def parse_id_list(values, max_ids):
+    """
+    Convierte ids recibidos como "1,2,3" o como lista a una lista de enteros
+    sin duplicados y en el orden pedido.
+    """
+    if isinstance(values, str):
+        values = [value for value in values.split(',') if value.strip()]
+    if not isinstance(values, list) or not values:
+        raise APIException('Debes indicar al menos un id', 400)
+
+    try:
+        ids = list(dict.fromkeys(int(value) for value in values))
+    except (TypeError, ValueError):
+        raise APIException('Los ids deben ser números enteros', 400)
+
+    if len(ids) > max_ids:
+        raise APIException(f'Máximo {max_ids} ids por petición', 400)
+
+    return ids
+
+
+def keyset_paginate(query, id_column, after, limit):
+    """
+    Aplica paginación por cursor sobre una columna creciente (normalmente el id).
+    Devuelve (items, next_cursor); next_cursor es None en la última página.
+    """
+    items = query.filter(id_column > after)\
+        .order_by(id_column)\
+        .limit(limit + 1)\
+        .all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = getattr(items[-1], id_column.key)
+
+    return items, next_cursor
@@ -9,6 +9,8 @@ from flask_migrate import Migrate
 from flask_swagger import swagger
 from api.utils import APIException, generate_sitemap
 from api.database.db import db
+from api.database.pool import configure_engine_options, pool_metrics
+from api.database.replica import configure_replica
 from api.models import *
 from flask_cors import CORS
 from api.admin import setup_admin
@@ -18,7 +20,18 @@ from api.routes.user import api as user_api
 from api.routes.product import api as product_api
 from api.routes.address import api as address_api
 from api.routes.productTechnicalDetails import api as product_technical_details_api
+from api.routes.ops import api as ops_api
+from api.routes.jobs import api as jobs_api
 from api.limiter import limiter
+from api.search import include_in_autogenerate
+from api.cache import response_cache
+from api.storage import image_storage
+from api.uploads import image_uploads
+from api.jobs import job_queue
+from api.json_provider import FastJSONProvider
+from api.timing import request_timing
+from api.metrics import metrics
+from api.query_budget import query_budget_checker
 from dotenv import load_dotenv
 
 logging.basicConfig(
@@ -35,6 +48,9 @@ static_file_dir = os.path.join(os.path.dirname(
     os.path.realpath(__file__)), '../dist/')
 app = Flask(__name__)
 
+# JSON rápido (orjson) con fallback a la librería estándar
+app.json = FastJSONProvider(app)
+
 # Validate JWT_SECRET_KEY
 jwt_secret = os.environ.get('JWT_SECRET_KEY')
 if not jwt_secret:
@@ -51,6 +67,17 @@ jwt = JWTManager(app)
 # Rate limiting
 limiter.init_app(app)
 
+# Server-side response cache for the public catalog endpoints
+response_cache.init_app(app)
+
+# Imágenes (Cloudinary o disco local) con subidas en paralelo: ver api/storage.py
+image_storage.init_app(app)
+# Imágenes en multipart/form-data con límites de tamaño y tipo: ver api/uploads.py
+image_uploads.init_app(app)
+
+# Cola de tareas en la base de datos (`flask worker`): ver api/jobs.py
+job_queue.init_app(app)
+
 # Security headers (only in production)
 if ENV != "development":
     from flask_talisman import Talisman
@@ -73,8 +100,20 @@ else:
     app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-MIGRATE = Migrate(app, db, compare_type=True)
+# Pool de conexiones (DB_POOL_MODE, DB_POOL_SIZE...): ver api/database/pool.py
+configure_engine_options(app)
+# Réplica de lectura opcional (DATABASE_REPLICA_URL): ver api/database/replica.py
+configure_replica(app)
+MIGRATE = Migrate(app, db, compare_type=True,
+                  include_object=include_in_autogenerate)
 db.init_app(app)
+pool_metrics.init_app(app, db)
+# Server-Timing y registro de peticiones lentas: ver api/timing.py
+request_timing.init_app(app, db)
+# Detector de N+1 y presupuesto de consultas (QUERY_BUDGET): ver api/query_budget.py
+query_budget_checker.init_app(app, db)
+# Métricas Prometheus en /metrics: ver api/metrics.py
+metrics.init_app(app)
 
 # add the admin
 setup_admin(app)
@@ -88,6 +127,8 @@ app.register_blueprint(product_api, url_prefix='/api/product')
 app.register_blueprint(address_api, url_prefix='/api/address')
 app.register_blueprint(product_technical_details_api,
                        url_prefix='/api/product_technical_details')
+app.register_blueprint(ops_api, url_prefix='/api/ops')
+app.register_blueprint(jobs_api, url_prefix='/api/jobs')
 
 # Handle/serialize errors like a JSON object
 
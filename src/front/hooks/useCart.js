@@ -1,5 +1,6 @@
 import { useCallback } from 'react';
 import useGlobalReducer from './useGlobalReducer';
+import { productService } from '../services/APIProduct';
 
 export const useCart = () => {
   const { store, dispatch } = useGlobalReducer();
@@ -30,6 +31,18 @@ export const useCart = () => {
     });
   }, [dispatch]);
 
+  // Una sola petición para todo el carrito; devuelve cuántos productos se han retirado
+  const refreshCart = useCallback(async () => {
+    const items = store?.cart?.items || [];
+    if (items.length === 0) return 0;
+
+    const data = await productService.getProductsBatch(items.map(item => item.id));
+    if (!data) return 0;
+
+    dispatch({ type: 'REFRESH_CART', payload: data.products });
+    return data.missing.length + data.inactive.length;
+  }, [store, dispatch]);
+
   const clearCart = useCallback(() => {
     dispatch({ type: 'CLEAR_CART' });
   }, [dispatch]);
@@ -46,5 +59,6 @@ export const useCart = () => {
     removeFromCart,
     updateQuantity,
     clearCart,
+    refreshCart,
   };
 };
\ No newline at end of file
@@ -1,13 +1,23 @@
-import React from 'react';
+import React, { useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { useCart } from '../hooks/useCart';
 import { useToast } from '../hooks/useToast';
 import { Spinner } from '../components/Spinner';
 
 export const Cart = () => {
-  const { cartItems, cartTotal, cartItemCount, removeFromCart, updateQuantity, clearCart } = useCart();
+  const { cartItems, cartTotal, cartItemCount, removeFromCart, updateQuantity, clearCart, refreshCart } = useCart();
   const toast = useToast();
 
+  // Al abrir el carrito se actualizan precios y disponibilidad con una sola petición
+  useEffect(() => {
+    refreshCart().then(removed => {
+      if (removed > 0) {
+        toast.showInfo(`${removed} ${removed === 1 ? 'producto ya no está disponible y se ha' : 'productos ya no están disponibles y se han'} retirado del carrito`);
+      }
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
+
   const shippingCost = cartTotal > 50 ? 0 : 4.99;
   const total = cartTotal + shippingCost;
 
@@ -1,14 +1,25 @@
-import React, { useState, useEffect, useMemo, useCallback } from "react";
+import React, { useState, useEffect, useCallback } from "react";
 import { productService } from "../services/APIProduct";
-import { technicalDetailsService } from "../services/APIProductDetails";
 import { CardProduct } from "../components/CardProduct";
 import { Spinner } from "../components/Spinner";
 
+const PAGE_SIZE = 24;
+
+// Clave del estado de filtros -> parámetro / faceta de /api/product/catalog
+const FACET_PARAMS = {
+    series: "series",
+    characters: "character",
+    manufacturers: "manufacturer",
+    collections: "collection"
+};
+
 export const Catalog = () => {
-    const [allProducts, setAllProducts] = useState([]);
-    const [productsWithDetails, setProductsWithDetails] = useState([]);
+    const [filteredProducts, setFilteredProducts] = useState([]);
+    const [total, setTotal] = useState(0);
+    const [page, setPage] = useState(1);
     const [loading, setLoading] = useState(true);
     const [filteringLoading, setFilteringLoading] = useState(false);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [error, setError] = useState("");
     const [searchTerm, setSearchTerm] = useState("");
     const [debouncedSearch, setDebouncedSearch] = useState("");
@@ -40,86 +51,65 @@ export const Catalog = () => {
         return () => clearTimeout(timer);
     }, [searchTerm]);
 
-    useEffect(() => {
-        fetchAllProducts();
-    }, []);
-
-    const fetchAllProducts = async () => {
-        try {
-            setLoading(true);
-            const response = await productService.getActivesProducts();
-
-            if (response) {
-                setAllProducts(response);
-                await fetchAllTechnicalDetails(response);
-            }
+    // El servidor filtra, ordena, pagina y calcula las facetas en una sola petición
+    const fetchCatalog = useCallback(async (pageToLoad) => {
+        const params = new URLSearchParams();
+        if (debouncedSearch.trim()) params.append("q", debouncedSearch.trim());
+        params.append("sort", sortOrder);
+        params.append("page", pageToLoad);
+        params.append("limit", PAGE_SIZE);
+        // Las tarjetas solo necesitan la proyección "card" (sin vendedor ni detalles técnicos)
+        params.append("view", "card");
+        Object.entries(FACET_PARAMS).forEach(([filterType, param]) => {
+            selectedFilters[filterType].forEach(value => params.append(param, value));
+        });
 
-            setLoading(false);
-        } catch (error) {
-            console.error("Error fetching products:", error);
-            setError("Error al cargar los productos");
-            setLoading(false);
+        const response = await productService.getCatalog(params);
+        if (!response) {
+            throw new Error("Error al cargar los productos");
         }
-    };
 
-    const fetchAllTechnicalDetails = async (products) => {
-        try {
-            const detailsPromises = products.map(async (product) => {
-                try {
-                    const response = await technicalDetailsService.getTechnicalDetails(product.id);
-                    return {
-                        productId: product.id,
-                        details: response && response.success ? response.data : null
-                    };
-                } catch (error) {
-                    return { productId: product.id, details: null };
-                }
-            });
-
-            const allDetails = await Promise.all(detailsPromises);
-            const detailsMap = {};
-            allDetails.forEach(item => {
-                detailsMap[item.productId] = item.details;
-            });
+        setFilteredProducts(prev =>
+            pageToLoad === 1 ? response.products : [...prev, ...response.products]
+        );
+        setTotal(response.total);
+        setPage(pageToLoad);
+        setAvailableFilters({
+            series: response.facets.series.map(facet => facet.value),
+            characters: response.facets.character.map(facet => facet.value),
+            manufacturers: response.facets.manufacturer.map(facet => facet.value),
+            collections: response.facets.collection.map(facet => facet.value)
+        });
+    }, [debouncedSearch, selectedFilters, sortOrder]);
 
-            const combined = products.map(product => ({
-                ...product,
-                technicalDetails: detailsMap[product.id]
-            }));
+    useEffect(() => {
+        const loadFirstPage = async () => {
+            try {
+                setFilteringLoading(true);
+                await fetchCatalog(1);
+            } catch (error) {
+                console.error("Error fetching products:", error);
+                setError("Error al cargar los productos");
+            } finally {
+                setFilteringLoading(false);
+                setLoading(false);
+            }
+        };
+        loadFirstPage();
+    }, [fetchCatalog]);
 
-            setProductsWithDetails(combined);
-            extractFiltersFromDetails(combined);
+    const loadMore = async () => {
+        try {
+            setLoadingMore(true);
+            await fetchCatalog(page + 1);
         } catch (error) {
-            console.error("Error fetching technical details:", error);
+            console.error("Error fetching products:", error);
+        } finally {
+            setLoadingMore(false);
         }
     };
 
-    const extractFiltersFromDetails = (productsWithDetails) => {
-        const series = new Set();
-        const characters = new Set();
-        const manufacturers = new Set();
-        const collections = new Set();
-
-        productsWithDetails.forEach(product => {
-            const details = product.technicalDetails;
-            if (details) {
-                if (details.anime_series) series.add(details.anime_series);
-                if (details.character) characters.add(details.character);
-                if (details.manufacturer) manufacturers.add(details.manufacturer);
-                if (details.collection) collections.add(details.collection);
-            }
-        });
-
-        setAvailableFilters({
-            series: Array.from(series).sort(),
-            characters: Array.from(characters).sort(),
-            manufacturers: Array.from(manufacturers).sort(),
-            collections: Array.from(collections).sort()
-        });
-    };
-
     const handleFilterChange = (filterType, value) => {
-        setFilteringLoading(true);
         setSelectedFilters(prev => {
             const currentFilters = prev[filterType];
             const newFilters = currentFilters.includes(value)
@@ -127,7 +117,6 @@ export const Catalog = () => {
                 : [...currentFilters, value];
             return { ...prev, [filterType]: newFilters };
         });
-        setTimeout(() => setFilteringLoading(false), 300);
     };
 
     const clearAllFilters = () => {
@@ -149,70 +138,6 @@ export const Catalog = () => {
         );
     };
 
-    // Filtered + searched + sorted products
-    const filteredProducts = useMemo(() => {
-        let products = allProducts;
-
-        // Search filter
-        if (debouncedSearch.trim()) {
-            const term = debouncedSearch.toLowerCase();
-            products = products.filter(p =>
-                p.name.toLowerCase().includes(term) ||
-                (p.description && p.description.toLowerCase().includes(term))
-            );
-        }
-
-        // Category filters
-        const hasActiveFilters =
-            selectedFilters.series.length > 0 ||
-            selectedFilters.characters.length > 0 ||
-            selectedFilters.manufacturers.length > 0 ||
-            selectedFilters.collections.length > 0;
-
-        if (hasActiveFilters) {
-            const detailMap = {};
-            productsWithDetails.forEach(p => {
-                detailMap[p.id] = p.technicalDetails;
-            });
-
-            products = products.filter(product => {
-                const details = detailMap[product.id];
-                if (!details) return false;
-
-                const matchesSeries = selectedFilters.series.length === 0 ||
-                    selectedFilters.series.includes(details.anime_series);
-                const matchesCharacter = selectedFilters.characters.length === 0 ||
-                    selectedFilters.characters.includes(details.character);
-                const matchesManufacturer = selectedFilters.manufacturers.length === 0 ||
-                    selectedFilters.manufacturers.includes(details.manufacturer);
-                const matchesCollection = selectedFilters.collections.length === 0 ||
-                    selectedFilters.collections.includes(details.collection);
-
-                return matchesSeries && matchesCharacter && matchesManufacturer && matchesCollection;
-            });
-        }
-
-        // Sort
-        switch (sortOrder) {
-            case "price-asc":
-                products = [...products].sort((a, b) => a.price - b.price);
-                break;
-            case "price-desc":
-                products = [...products].sort((a, b) => b.price - a.price);
-                break;
-            case "name-asc":
-                products = [...products].sort((a, b) => a.name.localeCompare(b.name));
-                break;
-            case "name-desc":
-                products = [...products].sort((a, b) => b.name.localeCompare(a.name));
-                break;
-            default:
-                break;
-        }
-
-        return products;
-    }, [allProducts, productsWithDetails, debouncedSearch, selectedFilters, sortOrder]);
-
     // Highlight search term in text
     const highlightText = (text, term) => {
         if (!term.trim() || !text) return text;
@@ -252,7 +177,7 @@ export const Catalog = () => {
                     Catálogo Completo
                 </h1>
                 <p className="text-[var(--text-secondary)] font-body">
-                    {filteredProducts.length} {filteredProducts.length === 1 ? 'producto encontrado' : 'productos encontrados'}
+                    {total} {total === 1 ? 'producto encontrado' : 'productos encontrados'}
                     {debouncedSearch && (
                         <span className="text-[var(--accent-primary)]"> para "{debouncedSearch}"</span>
                     )}
@@ -477,6 +402,19 @@ export const Catalog = () => {
                             ))}
                         </div>
                     )}
+
+                    {!filteringLoading && filteredProducts.length < total && (
+                        <div className="flex justify-center mt-8">
+                            <button
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                                className="px-6 py-2 rounded-lg font-semibold text-[var(--bg-primary)] disabled:opacity-60"
+                                style={{ backgroundColor: 'var(--accent-primary)' }}
+                            >
+                                {loadingMore ? 'Cargando...' : 'Cargar más'}
+                            </button>
+                        </div>
+                    )}
                 </div>
             </div>
         </div>
@@ -5,6 +5,7 @@ const getAllAddresses = async () => {
     const token = sessionStorage.getItem("token");
     const response = await fetch(`${backendUrl}api/address/addresses`, {
       method: "GET",
+      credentials: "include",
       headers: {
         "Content-Type": "application/json",
         Authorization: `Bearer ${token.trim()}`,
@@ -37,6 +38,7 @@ const getAddressById = async (addressId) => {
       `${backendUrl}api/address/addresses/${addressId}`,
       {
         method: "GET",
+        credentials: "include",
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token.trim()}`,
@@ -68,6 +70,7 @@ const getDefaultAddress = async () => {
     const token = sessionStorage.getItem("token");
     const response = await fetch(`${backendUrl}api/address/addresses/default`, {
       method: "GET",
+      credentials: "include",
       headers: {
         "Content-Type": "application/json",
         Authorization: `Bearer ${token.trim()}`,
@@ -98,6 +101,7 @@ const createAddress = async (addressData) => {
     const token = sessionStorage.getItem("token");
     const response = await fetch(`${backendUrl}api/address/addresses`, {
       method: "POST",
+      credentials: "include",
       headers: {
         "Content-Type": "application/json",
         Authorization: `Bearer ${token.trim()}`,
@@ -131,6 +135,7 @@ const updateAddress = async (addressId, addressData) => {
       `${backendUrl}api/address/addresses/${addressId}`,
       {
         method: "PUT",
+        credentials: "include",
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token.trim()}`,
@@ -165,6 +170,7 @@ const deleteAddress = async (addressId) => {
       `${backendUrl}api/address/addresses/${addressId}`,
       {
         method: "DELETE",
+        credentials: "include",
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token.trim()}`,
@@ -198,6 +204,7 @@ const setDefaultAddress = async (addressId) => {
       `${backendUrl}api/address/addresses/${addressId}/set-default`,
       {
         method: "PUT",
+        credentials: "include",
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token.trim()}`,
@@ -16,7 +16,7 @@ const handleApiError = (response) => {
 
 const getProducts = async () => {
   try {
-    const response = await fetch(`${URL}api/product/products`);
+    const response = await fetch(`${URL}api/product/products`, { credentials: "include" });
 
     if (!response.ok) {
       throw new Error("Error al obtener los productos");
@@ -31,7 +31,7 @@ const getProducts = async () => {
 
 const getActivesProducts = async () => {
   try {
-    const response = await fetch(`${URL}api/product/products/actives`);
+    const response = await fetch(`${URL}api/product/products/actives`, { credentials: "include" });
 
     if (!response.ok) {
       throw new Error("Error al obtener los productos activos");
@@ -44,9 +44,24 @@ const getActivesProducts = async () => {
   }
 };
 
+const getCatalog = async (params) => {
+  try {
+    const response = await fetch(`${URL}api/product/catalog?${params.toString()}`, { credentials: "include" });
+
+    if (!response.ok) {
+      throw new Error("Error al obtener el catálogo");
+    }
+
+    const data = await response.json();
+    return data;
+  } catch (error) {
+    console.error(`Error fetching catalog: ${error}`);
+  }
+};
+
 const getProductById = async (productId) => {
   try {
-    const response = await fetch(`${URL}api/product/products/${productId}`);
+    const response = await fetch(`${URL}api/product/products/${productId}`, { credentials: "include" });
 
     if (!response.ok) {
       throw new Error("Error al obtener el producto por ID");
@@ -59,6 +74,22 @@ const getProductById = async (productId) => {
   }
 };
 
+const getProductsBatch = async (ids) => {
+  try {
+    const params = new URLSearchParams({ ids: ids.join(","), view: "card" });
+    const response = await fetch(`${URL}api/product/products/batch?${params.toString()}`, { credentials: "include" });
+
+    if (!response.ok) {
+      throw new Error("Error al obtener los productos");
+    }
+
+    const data = await response.json();
+    return data;
+  } catch (error) {
+    console.error(`Error fetching products batch: ${error}`);
+  }
+};
+
 const createProduct = async (productData) => {
   try {
     const token = sessionStorage.getItem("token");
@@ -72,6 +103,7 @@ const createProduct = async (productData) => {
 
     const response = await fetch(`${URL}api/product/create`, {
       method: "POST",
+      credentials: "include",
       headers: {
         "Content-Type": "application/json",
         Authorization: `Bearer ${token.trim()}`,
@@ -111,6 +143,7 @@ const checkProductStatus = async (productId, newStatus) => {
       `${URL}api/product/selectproducttomodify/${productId}/status`,
       {
         method: "PATCH",
+        credentials: "include",
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token.trim()}`,
@@ -149,6 +182,7 @@ const getCurrentProduct = async (id) => {
     }
     const response = await fetch(url, {
       method: "GET",
+      credentials: "include",
       headers: {
         Authorization: `Bearer ${token.trim()}`,
       },
@@ -183,6 +217,7 @@ const updateProduct = async (id, productData) => {
     }
     const response = await fetch(url, {
       method: "PUT",
+      credentials: "include",
       headers: {
         "Content-Type": "application/json",
         Authorization: `Bearer ${token.trim()}`,
@@ -216,7 +251,9 @@ const updateProduct = async (id, productData) => {
 export const productService = {
   getProducts,
   getActivesProducts,
+  getCatalog,
   getProductById,
+  getProductsBatch,
   createProduct,
   checkProductStatus,
   getCurrentProduct,
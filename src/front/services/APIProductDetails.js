@@ -14,6 +14,7 @@ const getTechnicalDetails = async (productId) => {
       `${backendUrl}api/product_technical_details/product/${productId}/technical-details`,
       {
         method: "GET",
+        credentials: "include",
         headers: {
           "Content-Type": "application/json",
         },
@@ -46,6 +47,7 @@ const createTechnicalDetails = async (productId, technicalData) => {
       `${backendUrl}api/product_technical_details/product/${productId}/technical-details`,
       {
         method: "POST",
+        credentials: "include",
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token.trim()}`,
@@ -80,6 +82,7 @@ const updateTechnicalDetails = async (productId, technicalData) => {
       `${backendUrl}api/product_technical_details/product/${productId}/technical-details`,
       {
         method: "PUT",
+        credentials: "include",
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token.trim()}`,
@@ -122,6 +125,7 @@ const searchByTechnicalDetails = async (filters) => {
       `${backendUrl}api/product_technical_details/technical-details/search?${params.toString()}`,
       {
         method: "GET",
+        credentials: "include",
         headers: {
           "Content-Type": "application/json",
         },
@@ -153,6 +157,7 @@ const getAllAnimeSeries = async () => {
       `${backendUrl}api/product_technical_details/anime-series`,
       {
         method: "GET",
+        credentials: "include",
         headers: {
           "Content-Type": "application/json",
         },
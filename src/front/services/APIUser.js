@@ -26,6 +26,7 @@ const SignupUser = async (body, rolType) => {
   try {
     const response = await fetch(`${backendUrl}api/user/signup/${rolType}`, {
       method: "POST",
+      credentials: "include",
       headers: {
         "Content-Type": "application/json",
       },
@@ -55,6 +56,7 @@ const LoginUser = async (body) => {
   try {
     const response = await fetch(`${backendUrl}api/user/login`, {
       method: "POST",
+      credentials: "include",
       headers: {
         "Content-Type": "application/json",
       },
@@ -101,6 +103,7 @@ const getCurrentUser = async () => {
     }
     const response = await fetch(url, {
       method: "GET",
+      credentials: "include",
       headers: {
         "Content-Type": "application/json",
         Authorization: `Bearer ${token.trim()}`,
@@ -130,6 +133,7 @@ const updateUser = async (userData) => {
     }
     const response = await fetch(url, {
       method: "PUT",
+      credentials: "include",
       headers: {
         "Content-Type": "application/json",
         Authorization: `Bearer ${token.trim()}`,
@@ -97,6 +97,34 @@ export default function storeReducer(store, action = {}) {
       };
     }
 
+    case 'REFRESH_CART': {
+      // Precios y ofertas actuales; se quitan los productos que ya no existen o están inactivos
+      const fresh = new Map(action.payload.map(product => [product.id, product]));
+      const newItems = store.cart.items
+        .filter(item => fresh.has(item.id))
+        .map(item => {
+          const product = fresh.get(item.id);
+          return {
+            ...item,
+            name: product.name,
+            price: product.price,
+            image: product.images && product.images.length > 0 ? product.images[0] : item.image,
+            on_sale: product.on_sale || false,
+            original_price: product.original_price || null,
+          };
+        });
+      const total = newItems.reduce((sum, item) => sum + item.price * item.quantity, 0);
+      const itemCount = newItems.reduce((sum, item) => sum + item.quantity, 0);
+
+      localStorage.setItem('cart', JSON.stringify(newItems));
+      window.dispatchEvent(new Event('cartChanged'));
+
+      return {
+        ...store,
+        cart: { items: newItems, total, itemCount },
+      };
+    }
+
     case 'CLEAR_CART': {
       localStorage.removeItem('cart');
       window.dispatchEvent(new Event('cartChanged'));